@@ -2,6 +2,7 @@
 # All ways to run pyros and all Manager commands
 # should be defined here for consistency
 from __future__ import absolute_import
+import contextlib
 import os
 import sys
 
@@ -13,54 +14,69 @@ import click
 # only used from command line
 
 import logging
-import logging.config
-# Setting up logging for this test
-logging.config.dictConfig(
-    {
-        'version': 1,
-        'formatters': {
-            'verbose': {
-                'format': '%(levelname)s %(asctime)s %(module)s %(process)d %(thread)d %(message)s'
-            },
-            'simple': {
-                'format': '%(levelname)s %(name)s:%(message)s'
-            },
-        },
-        'handlers': {
-            'null': {
-                'level': 'DEBUG',
-                'class': 'logging.NullHandler',
-            },
-            'console': {
-                'level': 'DEBUG',
-                'class': 'logging.StreamHandler',
-                'formatter': 'simple'
-            },
-        },
-        'loggers': {
-            'pyros_config': {
-                'handlers': ['console'],
-                'level': 'INFO',
-                'propagate': False,
+
+
+def _configure_logging(queued=False, debug_rate=None):
+    # Not done at import time : importing logging.config and configuring handlers is not free,
+    # and only needed when running from command line.
+    import logging.config
+    logging.config.dictConfig(
+        {
+            'version': 1,
+            'formatters': {
+                'verbose': {
+                    'format': '%(levelname)s %(asctime)s %(module)s %(process)d %(thread)d %(message)s'
+                },
+                'simple': {
+                    'format': '%(levelname)s %(name)s:%(message)s'
+                },
             },
-            'pyros_setup': {
-                'handlers': ['console'],
-                'level': 'INFO',
+            'handlers': {
+                'null': {
+                    'level': 'DEBUG',
+                    'class': 'logging.NullHandler',
+                },
+                'console': {
+                    'level': 'DEBUG',
+                    'class': 'logging.StreamHandler',
+                    'formatter': 'simple'
+                },
             },
-            'pyros': {
-                'handlers': ['console'],
-                'level': 'INFO',
+            'loggers': {
+                'pyros_config': {
+                    'handlers': ['console'],
+                    'level': 'INFO',
+                    'propagate': False,
+                },
+                'pyros_setup': {
+                    'handlers': ['console'],
+                    'level': 'INFO',
+                },
+                'pyros': {
+                    'handlers': ['console'],
+                    'level': 'INFO',
+                }
             }
         }
-    }
-)
+    )
+    if queued:
+        # the node process, forked later, inherits the queue handlers : its hot loop never waits on the console
+        import atexit
+        from pyros.log import QueueLogging
+        queue_logging = QueueLogging(['pyros_config', 'pyros_setup', 'pyros'], debug_rate=debug_rate).start()
+        atexit.register(_stop_queue_logging, queue_logging)
 
 
-import nose
-import pkg_resources
+def _stop_queue_logging(queue_logging):
+    # the node process logs through this process until it exits
+    import multiprocessing
+    for child in multiprocessing.active_children():
+        child.join()
+    queue_logging.stop()
 
-_path = pkg_resources.resource_filename("pyros", "__main__.py")
-_parent = os.path.normpath(os.path.join(os.path.dirname(_path), ".."))
+
+# Not using pkg_resources here : it scans all installed distributions on import, which slows down startup.
+_parent = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
 
 
 # importing current package if needed ( solving relative package import from __main__ problem )
@@ -74,6 +90,7 @@ _parent = os.path.normpath(os.path.join(os.path.dirname(_path), ".."))
 
 
 def nosemain():
+    import nose  # only needed to run tests, not to run a node
     args = sys.argv + [opt for opt in (
         # "--exe",  # DO NOT look in exe (maybe old rostests ?)
         # "--all-modules",  # DO NOT look in all modules
@@ -183,8 +200,10 @@ def pyros_start(config, ros_args='', pyros_ctx_impl=None):
 # TODO : handle ros arguments here
 # http://click.pocoo.org/5/commands/#group-invocation-without-command
 @click.group()
-def cli():
-    pass
+@click.option('--log-queue', is_flag=True, default=False)  # logging through a queue, written by a background thread.
+@click.option('--log-debug-rate', default=None, type=float)  # logs debug records, this many per second from each line of code, through the queue. 0 for all.
+def cli(log_queue, log_debug_rate):
+    _configure_logging(queued=log_queue or log_debug_rate is not None, debug_rate=log_debug_rate)
 
 
 @cli.command()
@@ -204,13 +223,15 @@ def test():
 @click.option('-c', '--config', default=None)  # this is the last possible config override, and has to be explicit.
 @click.option('-l', '--logfile', default=None)  # this is the last possible logfile override, and has to be explicit.
 @click.option('ros_args', '-r', '--ros-arg', multiple=True, default='')
-def run(interface, config, logfile, ros_args):
+@click.option('-s', '--scenario', default=None)  # the scenario file simulated by the ros_mock interface.
+def run(interface, config, logfile, ros_args, scenario):
     """
     Start a pyros node.
     :param interface: the interface implementation (ROS, Mock, ZMP, etc.)
     :param config: the config file path, absolute, or relative to working directory
     :param logfile: the logfile path, absolute, or relative to working directory
     :param ros_args: the ros arguments (useful to absorb additional args when launched with roslaunch)
+    :param scenario: the JSON scenario file describing topics, services and params simulated by the ros_mock interface
     """
     logging.info(
         'pyros started with : interface {interface} config {config} logfile {logfile} ros_args {ros_args}'.format(
@@ -219,7 +240,11 @@ def run(interface, config, logfile, ros_args):
     if interface == 'ros':
         node_proc = pyros_rosinterface_launch(node_name='pyros_rosinterface', pyros_config=config, ros_argv=ros_args)
     else:
-        node_proc = None  # NOT IMPLEMENTED
+        # imported here, to not slow down the start of other interfaces
+        from pyros.server.scenario_mock import PyrosScenarioMock, load_scenario
+        node_proc = PyrosScenarioMock(
+            'pyros_mock', ros_args, scenario=load_scenario(scenario) if scenario else None
+        ).configure(config)
 
     # node_proc.daemon = True  # we do NOT want a daemon(would stop when this main process exits...)
     client_conn = node_proc.start()  # in a sub process
@@ -228,5 +253,87 @@ def run(interface, config, logfile, ros_args):
     # client_conn = node_proc.run()  # in same process
 
 
+@contextlib.contextmanager
+def _scenario_node(node, scenario):
+    """
+    pyzmp only discovers nodes started from this process tree : a node started by another `pyros run` is not reachable.
+    With a scenario, a mock node simulating it is started here, for the duration of the command.
+    :return: the name of the node to target
+    """
+    if scenario is None:
+        yield node
+        return
+    from pyros.server.scenario_mock import PyrosScenarioMock, load_scenario
+    node_proc = PyrosScenarioMock(node or 'pyros_mock', scenario=load_scenario(scenario))
+    node_proc.start()
+    try:
+        yield node_proc.name
+    finally:
+        node_proc.shutdown()
+
+
+@cli.command()
+@click.option('-n', '--node', default=None)  # the name of the node to load. Any node providing the services by default.
+@click.option('-s', '--scenario', default=None)  # the scenario file of a ros_mock node to start and load.
+@click.option('-c', '--clients', default=4)
+@click.option('-d', '--duration', default=10.0)
+@click.option('-m', '--mix', multiple=True)  # operation=weight, repeated. Defaults to a mix of topic, service and param calls.
+@click.option('--payload-size', default=64)
+@click.option('--processes', is_flag=True, default=False)
+@click.option('--node-pid', default=None, type=int)
+@click.option('-o', '--output', default=None)
+def loadgen(node, scenario, clients, duration, mix, payload_size, processes, node_pid, output):
+    """
+    Load test a pyros node, and report throughput, latency percentiles, error and timeout rates,
+    and node memory usage over time, as JSON.
+    :param node: the name of the node to load
+    :param scenario: the JSON scenario file of a ros_mock node, started by this command and loaded
+    :param clients: the number of concurrent clients
+    :param duration: the duration of the test, in seconds
+    :param mix: the relative weights of operations, like topic_extract=4 service_call=1
+    :param payload_size: the size of injected messages, service requests and param values, in bytes
+    :param processes: run each client in its own process, instead of its own thread
+    :param node_pid: the pid of the node, to sample its memory usage. Defaults to the pid in its heartbeat.
+    :param output: the report file path. Defaults to standard output.
+    """
+    # imported here, to not slow down the start of other commands
+    from pyros import loadgen as lg
+    with _scenario_node(node, scenario) as node_name:
+        report = lg.run_load(
+            node_name=node_name, clients=clients, duration=duration, mix=lg.parse_mix(mix) if mix else None,
+            payload_size=payload_size, processes=processes, node_pid=node_pid,
+        )
+    lg.write_report(report, output)
+
+
+@cli.command()
+@click.argument('capture')
+@click.option('-n', '--node', default=None)  # the name of the node to replay against.
+@click.option('-s', '--scenario', default=None)  # the scenario file of a ros_mock node to start and replay against.
+@click.option('--speed', default=1.0)  # 2.0 replays twice as fast as captured, 0 as fast as possible.
+@click.option('-o', '--output', default=None)
+def replay(capture, node, scenario, speed, output):
+    """
+    Replay traffic captured by a PyrosClient against a running pyros node,
+    and report captured and replayed latencies per endpoint, as JSON.
+    :param capture: the capture file path
+    :param node: the name of the node to replay against
+    :param scenario: the JSON scenario file of a ros_mock node, started by this command and replayed against
+    :param speed: the replay speed factor
+    :param output: the report file path. Defaults to standard output.
+    """
+    # imported here, to not slow down the start of other commands
+    from pyros.client import PyrosClient
+    from pyros.loadgen import write_report
+    from pyros.replay import replay_file
+    with _scenario_node(node, scenario) as node_name:
+        client = PyrosClient(node_name)
+        try:
+            report = replay_file(capture, client, speed)
+        finally:
+            client.close()
+    write_report(report, output)
+
+
 if __name__ == '__main__':
    cli()
@@ -9,7 +9,7 @@ Hopefully this should endup in ros.__doc__
 """
 
 # create logger
-# TODO solve multiprocess logger problem(s)...
+# For processes logging under load, without blocking on log I/O, see pyros.log.QueueLogging.
 _logger = logging.getLogger(__name__)
 
 # The client part should be the same for any kind of backend.
@@ -17,9 +17,11 @@ _logger = logging.getLogger(__name__)
 # Therefore it is not, and will not be, a namespace package.
 
 from .client import PyrosClient
+from .sharded import ShardedPyrosClient
 
 __all__ = [
     'PyrosClient',
+    'ShardedPyrosClient',
 ]
 
 
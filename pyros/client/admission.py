@@ -0,0 +1,83 @@
+from __future__ import absolute_import
+
+import threading
+import time
+
+import six
+
+"""
+Client side admission control.
+Tracks requests in flight per endpoint, and refuses new ones beyond a configured limit,
+either immediately ( 'fail' ) or after waiting for a free slot until a deadline ( 'queue' ).
+It also sheds load early when the node advertises a request queue deeper than allowed.
+"""
+
+
+class AdmissionController(object):
+
+    MODES = ('fail', 'queue')
+
+    def __init__(self, limits=None, mode='fail', queue_timeout=1.0, max_node_queue=None, clock=None):
+        """
+        :param limits: {endpoint_name: maximum number of requests in flight}. Endpoints not listed are not limited.
+        :param mode: 'fail' refuses immediately when the limit is reached, 'queue' waits up to queue_timeout.
+        :param queue_timeout: the maximum time, in seconds, a request waits for a slot in 'queue' mode.
+        :param max_node_queue: refuse requests while the node advertises more queued requests than this.
+        """
+        if mode not in self.MODES:
+            raise ValueError("Unknown admission mode {0}. Valid modes are {1}".format(mode, self.MODES))
+        self.mode = mode
+        self.queue_timeout = queue_timeout
+        self.max_node_queue = max_node_queue
+        self._clock = clock or time.time
+        self._cond = threading.Condition()
+        self.limits = dict(limits or {})
+        self.in_flight = dict((endpoint, 0) for endpoint in self.limits)
+        self.rejected = dict((endpoint, 0) for endpoint in self.limits)
+        self.node_queue = 0
+
+    def update_node_queue(self, depth):
+        """Called when the node advertises its queue depth."""
+        self.node_queue = depth or 0
+
+    def acquire(self, endpoint):
+        """
+        :return: True if the request can be sent, False if it should be refused.
+        When True is returned, release() must be called once the request is done.
+        """
+        if self.max_node_queue is not None and self.node_queue > self.max_node_queue:
+            with self._cond:
+                self.rejected[endpoint] = self.rejected.get(endpoint, 0) + 1
+            return False
+
+        limit = self.limits.get(endpoint)
+        if limit is None:
+            return True
+
+        with self._cond:
+            if self.in_flight[endpoint] >= limit and self.mode == 'queue':
+                deadline = self._clock() + self.queue_timeout
+                while self.in_flight[endpoint] >= limit:
+                    remaining = deadline - self._clock()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+            if self.in_flight[endpoint] >= limit:
+                self.rejected[endpoint] += 1
+                return False
+            self.in_flight[endpoint] += 1
+            return True
+
+    def release(self, endpoint):
+        if endpoint not in self.limits:
+            return
+        with self._cond:
+            self.in_flight[endpoint] -= 1
+            self._cond.notify_all()  # waiters on other endpoints share the condition
+
+    def stats(self):
+        with self._cond:
+            return dict(
+                (endpoint, {'in_flight': self.in_flight[endpoint], 'limit': limit, 'rejected': self.rejected[endpoint]})
+                for endpoint, limit in six.iteritems(self.limits)
+            )
@@ -0,0 +1,150 @@
+from __future__ import absolute_import
+
+import collections
+import threading
+import time
+
+"""
+Asynchronous setup.
+Exposing hundreds of interfaces in one setup() call blocks until the node has exposed all of them.
+An asynchronous setup exposes them in small batches, from a background thread, and tells which ones are ready,
+so data can flow on the first interfaces while the others are being exposed :
+
+    handle = client.setup_async(subscribers=all_topics)
+    handle.wait(['/joint_states'], timeout=1)
+    client.topic_extract('/joint_states')
+    ...
+    handle.wait()  # everything exposed
+
+Each setup call carries all the names of the previous batches too, as a node exposes exactly what setup() lists.
+Names waited on are moved to the next batch.
+"""
+
+KINDS = ('publishers', 'subscribers', 'services', 'params')
+
+
+class SetupHandle(object):
+    def __init__(self, setup, publishers=None, subscribers=None, services=None, params=None,
+                 subscriber_policies=None, batch_size=16):
+        """
+        :param setup: the setup function of the client
+        :param batch_size: how many interfaces are added by each setup call
+        Other parameters are the ones of setup().
+        """
+        self._setup = setup
+        self.batch_size = batch_size
+        self.subscriber_policies = subscriber_policies or {}
+        names = dict(zip(KINDS, (publishers, subscribers, services, params)))
+        self._requested = dict((kind, names[kind] is not None) for kind in KINDS)  # kinds left as None stay None
+        self._pending = collections.deque(
+            (kind, name) for kind in KINDS for name in names[kind] or []
+        )
+        self._total = len(self._pending)
+        self._names = set(name for _, name in self._pending)
+        self._included = dict((kind, []) for kind in KINDS)  # names passed to setup calls
+        self._waiting = dict(collections.Counter(name for _, name in self._pending))  # {name: kinds left to expose}
+        self._condition = threading.Condition()
+        self._cancelled = False
+        self._finished = False
+        self.error = None
+        self.result = None
+
+    def start(self):
+        thread = threading.Thread(target=self._run, name='pyros_setup')
+        thread.daemon = True
+        thread.start()
+        return self
+
+    def _next_batch(self):
+        with self._condition:
+            if self._cancelled:
+                return [], None
+            batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+            for kind, name in batch:
+                self._included[kind].append(name)
+            kwargs = dict((kind, list(self._included[kind]) if self._requested[kind] else None) for kind in KINDS)
+            subscribers = set(self._included['subscribers'])
+        kwargs['subscriber_policies'] = dict(
+            (name, policy) for name, policy in self.subscriber_policies.items() if name in subscribers
+        ) or None
+        return batch, kwargs
+
+    def _run(self):
+        try:
+            batch, kwargs = self._next_batch()
+            first = True
+            while kwargs is not None and (batch or first):  # at least one call, even with nothing to expose
+                self.result = self._setup(**kwargs)
+                with self._condition:
+                    for _, name in batch:
+                        self._waiting[name] -= 1
+                        if not self._waiting[name]:
+                            del self._waiting[name]
+                    self._condition.notify_all()
+                batch, kwargs = self._next_batch()
+                first = False
+        except Exception as exc:
+            with self._condition:
+                self.error = exc
+                self._condition.notify_all()
+        finally:
+            with self._condition:
+                self._finished = True
+                self._condition.notify_all()
+
+    @property
+    def done(self):
+        """True when the setup is over : everything exposed, failed or cancelled."""
+        with self._condition:
+            return self._finished
+
+    def ready(self, name):
+        """:return: True if name is exposed, for all the kinds it was requested as"""
+        with self._condition:
+            return name in self._names and name not in self._waiting
+
+    def progress(self):
+        """:return: a tuple (exposed, total) of interface counts"""
+        with self._condition:
+            return self._total - sum(self._waiting.values()), self._total
+
+    def wait(self, names=None, timeout=None):
+        """
+        Waits for some interfaces to be exposed. Those still pending are exposed first.
+        :param names: the names to wait for, or None for all of them
+        :param timeout: how long to wait, in seconds, or None to wait until they are exposed
+        :return: True if they are all exposed, False on timeout
+        :raises: the exception of the setup call that failed, if any
+        :raises ValueError: if a name was not part of this setup
+        """
+        end = None if timeout is None else time.time() + timeout
+        with self._condition:
+            if names is not None:
+                unknown = [name for name in names if name not in self._names]
+                if unknown:
+                    raise ValueError("Not part of this setup : {0}".format(unknown))
+                wanted = set(names)
+                first = [item for item in self._pending if item[1] in wanted]
+                if first:
+                    others = [item for item in self._pending if item[1] not in wanted]
+                    self._pending.clear()
+                    self._pending.extend(first + others)
+            while True:
+                if self.error is not None:
+                    raise self.error
+                if names is None:
+                    if self._finished:
+                        return not self._waiting
+                elif not any(name in self._waiting for name in names):
+                    return True
+                elif self._finished:  # cancelled
+                    return False
+                remaining = None if end is None else end - time.time()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+
+    def cancel(self):
+        """Stops exposing more interfaces. The batch being exposed, if any, still completes."""
+        with self._condition:
+            self._cancelled = True
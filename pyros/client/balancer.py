@@ -0,0 +1,136 @@
+from __future__ import absolute_import, division
+
+import random
+import threading
+import time
+
+"""
+Provider selection policies, for endpoints that several redundant nodes provide.
+Only stateless endpoints ( any provider gives the same answer ) can be balanced this way.
+A policy orders the providers to try for one call : the first one is used, the next ones are failovers.
+A provider whose last call failed is tried last, until failure_cooldown seconds have passed :
+it is then tried first again when its turn comes, and recovers on success.
+"""
+
+
+class ProviderPolicy(object):
+    """
+    Base policy : keeps the discovery order.
+    Also tracks outstanding requests and latency per provider, for the policies that need it.
+    """
+    def __init__(self, failure_cooldown=5.0, clock=None):
+        """
+        :param failure_cooldown: how long, in seconds, a failed provider is tried last
+        """
+        self.failure_cooldown = failure_cooldown
+        self._clock = clock or time.time
+        self._lock = threading.Lock()
+        self.outstanding = {}
+        self.latency = {}  # exponentially weighted moving average, in seconds
+        self.failures = {}
+        self._failed_at = {}
+
+    def _failing(self, provider, now):
+        # called with the lock held
+        return self.failures.get(provider, 0) > 0 and now - self._failed_at[provider] < self.failure_cooldown
+
+    def order(self, providers):
+        """
+        :param providers: the names of the nodes providing the endpoint
+        :return: the names of the providers, in the order they should be tried
+        """
+        return list(providers)
+
+    def started(self, provider):
+        with self._lock:
+            self.outstanding[provider] = self.outstanding.get(provider, 0) + 1
+
+    def finished(self, provider, duration, ok=True, alpha=0.2):
+        """
+        :param duration: the time the call took, in seconds
+        :param ok: False if the call failed ( timed out )
+        :param alpha: weight of the last duration in the latency average
+        """
+        with self._lock:
+            self.outstanding[provider] = self.outstanding.get(provider, 1) - 1
+            if ok:
+                last = self.latency.get(provider)
+                self.latency[provider] = duration if last is None else alpha * duration + (1 - alpha) * last
+                self.failures[provider] = 0
+            else:
+                self.failures[provider] = self.failures.get(provider, 0) + 1
+                self._failed_at[provider] = self._clock()
+
+
+class RoundRobin(ProviderPolicy):
+    def __init__(self, **kwargs):
+        super(RoundRobin, self).__init__(**kwargs)
+        self._next = 0
+
+    def order(self, providers):
+        providers = list(providers)
+        if not providers:
+            return providers
+        with self._lock:
+            start = self._next % len(providers)
+            self._next += 1
+        return providers[start:] + providers[:start]
+
+
+class LeastOutstanding(ProviderPolicy):
+    """The provider with the fewest requests in flight first. Recently failing providers last."""
+    def order(self, providers):
+        now = self._clock()
+        with self._lock:
+            return sorted(providers, key=lambda p: (self._failing(p, now), self.outstanding.get(p, 0)))
+
+
+class LatencyWeighted(ProviderPolicy):
+    """
+    Picks the first provider at random, with a probability inversely proportional to its average latency.
+    Providers without measured latency get the best known one, so they are tried too.
+    Recently failing providers are tried last.
+    """
+    def __init__(self, rng=None, **kwargs):
+        super(LatencyWeighted, self).__init__(**kwargs)
+        self._rng = rng or random.Random()
+
+    def order(self, providers):
+        now = self._clock()
+        with self._lock:
+            healthy = [p for p in providers if not self._failing(p, now)]
+            failing = [p for p in providers if self._failing(p, now)]
+            known = [self.latency[p] for p in healthy if p in self.latency]
+            default = min(known) if known else 1.0
+            weights = [1.0 / max(self.latency.get(p, default), 1e-6) for p in healthy]
+
+        ordered = []
+        while healthy:
+            pick = self._rng.uniform(0, sum(weights))
+            for i, w in enumerate(weights):
+                pick -= w
+                if pick <= 0:
+                    break
+            ordered.append(healthy.pop(i))
+            weights.pop(i)
+        return ordered + failing
+
+
+POLICIES = {
+    'first': ProviderPolicy,
+    'round_robin': RoundRobin,
+    'least_outstanding': LeastOutstanding,
+    'latency_weighted': LatencyWeighted,
+}
+
+
+def make_policy(policy):
+    """
+    :param policy: a ProviderPolicy instance, or the name of one of POLICIES
+    """
+    if isinstance(policy, ProviderPolicy):
+        return policy
+    try:
+        return POLICIES[policy]()
+    except KeyError:
+        raise ValueError("Unknown provider policy {0}. Valid policies are {1}".format(policy, sorted(POLICIES)))
@@ -0,0 +1,136 @@
+from __future__ import absolute_import
+
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+import six
+
+"""
+Memoization of service responses, on the client side.
+Only meant for services that are pure functions of their request (map metadata, robot description, etc.)
+Caching is opt-in, per service, and configured with the PYROS_SERVICE_CACHE setting :
+
+PYROS_SERVICE_CACHE = {
+    '/map_metadata': {'ttl': 60, 'max_entries': 16},
+    '/robot_description': {'ttl': None},  # never expires
+}
+"""
+
+
+def canonicalize(request):
+    """
+    Builds a hashable, order independent, representation of a request content.
+    :param request: the request content (usually a dict, possibly nested)
+    :return: a hashable value, equal for equal requests
+    """
+    if isinstance(request, dict):
+        return tuple(sorted((k, canonicalize(v)) for k, v in six.iteritems(request)))
+    elif isinstance(request, (list, tuple)):
+        return type(request).__name__, tuple(canonicalize(v) for v in request)
+    elif isinstance(request, (set, frozenset)):
+        return 'set', tuple(sorted(canonicalize(v) for v in request))
+    return request
+
+
+class ServiceCache(object):
+    """
+    A LRU cache of service responses, keyed on (service_name, canonicalized request).
+    Each service has its own time to live and maximum number of entries.
+    Services not configured here are never cached.
+    """
+
+    DEFAULT_TTL = 10  # seconds
+    DEFAULT_MAX_ENTRIES = 64
+
+    def __init__(self, config=None, clock=None):
+        """
+        :param config: a dict {service_name: {'ttl': seconds or None, 'max_entries': int}}
+        :param clock: the function returning current time (for tests)
+        """
+        self._clock = clock or time.time
+        self._lock = threading.Lock()
+        self._settings = {}
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+        for service_name, settings in six.iteritems(config or {}):
+            self.configure(service_name, **(settings or {}))
+
+    def configure(self, service_name, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES):
+        """
+        Enables caching for a service.
+        :param service_name: the name of the service
+        :param ttl: time to live of a cached response in seconds. None means responses never expire.
+        :param max_entries: maximum number of different requests remembered for this service
+        """
+        with self._lock:
+            self._settings[service_name] = (ttl, max_entries)
+            self._entries.setdefault(service_name, OrderedDict())
+            self._evict(service_name)
+
+    def is_cached(self, service_name):
+        return service_name in self._settings
+
+    def get(self, service_name, request):
+        """
+        Retrieves a cached response.
+        :return: a tuple (found, response). response is a copy, so callers can modify it safely.
+        """
+        if service_name not in self._settings:
+            return False, None
+        with self._lock:
+            entries = self._entries[service_name]
+            try:
+                key = canonicalize(request)
+                expiry, response = entries.pop(key)
+            except (KeyError, TypeError):  # TypeError when the request is not hashable
+                self.misses += 1
+                return False, None
+            if expiry is not None and expiry < self._clock():
+                self.misses += 1
+                return False, None
+            entries[key] = (expiry, response)  # most recently used goes last
+            self.hits += 1
+        return True, copy.deepcopy(response)
+
+    def put(self, service_name, request, response):
+        if service_name not in self._settings:
+            return
+        try:
+            key = canonicalize(request)
+            hash(key)
+        except TypeError:  # we cannot cache what we cannot hash
+            return
+        with self._lock:
+            ttl, _ = self._settings[service_name]
+            expiry = None if ttl is None else self._clock() + ttl
+            entries = self._entries[service_name]
+            entries.pop(key, None)
+            entries[key] = (expiry, copy.deepcopy(response))
+            self._evict(service_name)
+
+    def invalidate(self, service_name=None, request=None):
+        """
+        Forgets cached responses.
+        :param service_name: the service to forget responses of. If None, all services are invalidated.
+        :param request: the request to forget the response of. If None, all responses of the service are forgotten.
+        """
+        with self._lock:
+            if service_name is None:
+                for entries in self._entries.values():
+                    entries.clear()
+            elif request is None:
+                self._entries.get(service_name, {}).clear()
+            else:
+                try:
+                    self._entries.get(service_name, {}).pop(canonicalize(request), None)
+                except TypeError:
+                    pass
+
+    def _evict(self, service_name):
+        _, max_entries = self._settings[service_name]
+        entries = self._entries[service_name]
+        while max_entries is not None and len(entries) > max_entries:
+            entries.popitem(last=False)  # least recently used goes first
@@ -0,0 +1,94 @@
+from __future__ import absolute_import
+
+import gzip
+import json
+import threading
+import time
+
+import six
+
+"""
+Capture of the traffic of a PyrosClient, to replay real workloads against a node and compare latencies.
+Every request to the node is recorded, in order, in a gzipped stream of JSON lines, one per request :
+[{start, thread, endpoint, name, call_kwargs, duration, request_size, response_size, error}, [args, kwargs]]
+ - start is the time of the request, in seconds since the start of the capture
+ - thread identifies the client thread that sent the request, to replay concurrent workloads concurrently
+ - endpoint is the name of the node service ( 'topic', 'service', 'param', ... ) and name the interface requested
+ - call_kwargs are the options of the call itself, like its timeouts
+ - request_size and response_size are the JSON encoded sizes of the payloads, in bytes
+ - error is the name of the exception raised by the request, if any
+The request is kept, to be sent again on replay. The response is only measured.
+A payload JSON cannot encode, like a lazy payload over a zmq frame, is not captured, and its size is None.
+The format is data only : reading a capture never runs code from it.
+Capture is opt-in : recording encodes every payload, which is not free.
+"""
+
+
+def _encode(content):
+    try:
+        return json.dumps(content, separators=(',', ':'))
+    except (TypeError, ValueError):
+        return None
+
+
+class TrafficRecorder(object):
+    def __init__(self, path, clock=None):
+        """
+        :param path: the capture file path
+        """
+        self.path = path
+        self.clock = clock or time.time
+        self._lock = threading.Lock()
+        self._file = gzip.open(path, 'wb')
+        self.start = self.clock()
+        self.count = 0
+
+    def record(self, endpoint, args, kwargs, start, duration, response=None, error=None, call_kwargs=None):
+        """
+        Records one request.
+        :param start: the time the request was sent, from the recorder clock
+        :param duration: the time the request took, in seconds
+        :param error: the exception raised by the request, if any
+        :param call_kwargs: the options of the call, like send_timeout and recv_timeout
+        """
+        name = args[0] if args and isinstance(args[0], six.string_types + six.integer_types) else None
+        request = _encode([args, kwargs])
+        response = _encode(response)
+        header = _encode({
+            'start': start - self.start,
+            'thread': threading.current_thread().ident,
+            'endpoint': endpoint,
+            'name': name,
+            'call_kwargs': call_kwargs or {},
+            'duration': duration,
+            'request_size': len(request) if request is not None else None,
+            'response_size': len(response) if response is not None else None,
+            'error': type(error).__name__ if error is not None else None,
+        })
+        line = '[{0},{1}]\n'.format(header, request if request is not None else 'null').encode('utf-8')
+        with self._lock:
+            if self._file is None:
+                return  # closed while the request was in flight
+            self._file.write(line)
+            self.count += 1
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_capture(path):
+    """
+    :param path: the capture file path
+    :return: an iterator on the records of the capture, as dicts.
+             args and kwargs are the captured request, both None if it was not captured.
+    """
+    with gzip.open(path, 'rb') as capture_file:
+        for line in capture_file:
+            record, request = json.loads(line.decode('utf-8'))
+            args, kwargs = request if request is not None else (None, None)
+            record['args'] = tuple(args) if args is not None else None
+            record['kwargs'] = kwargs
+            yield record
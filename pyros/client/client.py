@@ -1,7 +1,12 @@
 from __future__ import absolute_import
 
+import collections
+import re
 import sys
+import threading
+import time
 import unicodedata
+import uuid
 
 import six
 
@@ -17,6 +22,26 @@ import pyzmp
 
 from pyros_interfaces_common.exceptions import PyrosException
 
+from pyros.protocol.arrays import unpack_arrays
+from pyros.protocol.compression import CompressionStats, DEFAULT_THRESHOLD, available_codecs, decompress
+from pyros.protocol.delta import DeltaDecoder
+from pyros.protocol.filters import compile_filter
+from pyros.protocol.lanes import CONTROL, DATA, LaneStats, lane_of
+from pyros.protocol.lazy import loads_lazy
+from pyros.protocol.params import in_tree
+from pyros.protocol.projection import project, projected_value
+
+from .admission import AdmissionController
+from .async_setup import SetupHandle
+from .balancer import make_policy
+from .cache import ServiceCache
+from .capture import TrafficRecorder
+from .compact import CompactMessageFactory
+from .handles import TopicHandle, ServiceHandle, ParamHandle
+from .lanes import ControlLaneClient
+from .liveness import LivenessMonitor
+from .watch import ParamWatchListener
+
 # TODO : Requirement : Check TOTAL send/receive SYMMETRY.
 # If needed get rid of **kwargs arguments in call. Makes the interface less obvious and can trap unaware devs.
 
@@ -44,6 +69,60 @@ class PyrosServiceTimeout(PyrosException):
 PyrosException.register(PyrosServiceTimeout)
 
 
+# Raised without sending the request, when the client or the node is overloaded.
+class PyrosServiceOverloaded(PyrosException):
+    def __init__(self, message):
+        super(PyrosServiceOverloaded, self).__init__(message)
+        self.excmsg = message
+
+    @property
+    def message(self):
+        return self.excmsg
+
+PyrosException.register(PyrosServiceOverloaded)
+
+
+# Raised without sending the request, when the node is known to be down.
+class PyrosNodeUnavailable(PyrosException):
+    def __init__(self, message):
+        super(PyrosNodeUnavailable, self).__init__(message)
+        self.excmsg = message
+
+    @property
+    def message(self):
+        return self.excmsg
+
+PyrosException.register(PyrosNodeUnavailable)
+
+
+def _import_numpy():
+    # numpy is an optional dependency, only needed for array support
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("numpy is required for numpy_arrays support. You can install it with `pip install pyros[numpy]`")
+    return numpy
+
+
+_UNEXPECTED_KEYWORD = re.compile(r"unexpected keyword argument '(\w+)'")
+
+
+def _rejected_keyword(exc, names):
+    """
+    :param exc: a TypeError raised by a node service
+    :return: the name, among names, of the keyword argument the service does not accept, or None for other errors
+    """
+    match = _UNEXPECTED_KEYWORD.search(str(exc))
+    return match.group(1) if match is not None and match.group(1) in names else None
+
+
+def _ascii_name(name):
+    #changing unicode to string ( testing stability of multiprocess debugging )
+    if isinstance(name, unicode):
+        name = unicodedata.normalize('NFKD', name).encode('ascii', 'ignore')
+    return name
+
+
 # TODO : provide a test client ( similar to what werkzeug/flask does )
 # The goal is to make it easy for users of pyros to test and validate their library only against the client,
 # without having to have all the ROS environment installed and setup, and running extra processing
@@ -51,72 +130,413 @@ PyrosException.register(PyrosServiceTimeout)
 class PyrosClient(object):
     # TODO : improve ZMP to return the socket_bind address to point to the exact IPC/socket channel.
     # And pass it here, instead of assuming node name is unique...
-    def __init__(self, node_name=None):
+    # Endpoints for which any provider gives the same answer, and can be balanced between redundant nodes.
+    STATELESS_ENDPOINTS = ('service', 'msg_build')
+    # How often, in seconds, the providers of balanced endpoints are discovered again, as redundant nodes come and go.
+    PROVIDERS_REFRESH = 5.0
+
+    def __init__(self, node_name=None, service_cache=None, numpy_arrays=False, lazy_messages=False, compact_messages=False,
+                 provider_policy=None, admission=None, load_interval=0.5, heartbeat_interval=None, heartbeat_max_missed=2,
+                 capture=None, compression=None, delta_topics=None, keyframe_interval=100, control_lane=True):
+        """
+        :param node_name: the name of the node we want to talk to
+        :param service_cache: optional {service_name: {'ttl': seconds, 'max_entries': int}} dict, or ServiceCache,
+                              to memoize responses of services that are pure functions of their request.
+        :param numpy_arrays: if True, numeric array fields of extracted messages and service responses
+                             are transferred as typed buffers and returned as numpy.ndarray. Requires numpy.
+        :param lazy_messages: if True, extracted messages and service responses are returned as read-only
+                              LazyMessage mappings, decoding each field only when it is accessed.
+        :param compact_messages: if True, extracted messages are returned as instances of __slots__ classes,
+                                 generated from the skeleton returned by buildMsg, one per message type.
+                                 Cannot be combined with lazy_messages.
+        :param provider_policy: when node_name is None, how to select among redundant nodes for stateless endpoints :
+                                'first', 'round_robin', 'least_outstanding', 'latency_weighted' or a ProviderPolicy.
+                                On timeout, the call fails over to the next provider.
+        :param admission: optional AdmissionController, or dict of its arguments, limiting requests in flight
+                          per endpoint ( like {'limits': {'topic': 8}, 'mode': 'queue', 'queue_timeout': 0.5} ).
+                          Refused requests raise PyrosServiceOverloaded without reaching the node.
+        :param load_interval: how often, in seconds, the node queue depth is refreshed for admission control,
+                              in the background, from the heartbeats of the node, when it provides the 'heartbeat'
+                              service. With heartbeat_interval, it is refreshed with each liveness heartbeat instead.
+        :param heartbeat_interval: if set, and the node provides the 'heartbeat' service, the node liveness is checked
+                                   in the background every heartbeat_interval seconds. While the node is down,
+                                   calls fail immediately with PyrosNodeUnavailable, and services are discovered
+                                   again when the node comes back.
+        :param heartbeat_max_missed: number of missed heartbeats after which the node is considered down.
+        :param capture: optional file path, or TrafficRecorder, where every request to the node is recorded,
+                        to be replayed later with `pyros replay`. See pyros.client.capture.
+        :param compression: if True, or a dict like {'threshold': 65536, 'codecs': ['lz4', 'zlib']},
+                            responses of topic_extract, service_call and param_get larger than threshold bytes
+                            are compressed by the node, with the first codec of the list both sides have.
+                            Codecs default to all the ones installed here. See pyros.protocol.compression.
+        :param delta_topics: optional names of topics whose messages are large and change slowly, like maps.
+                             For these, the node sends only what changed since the last message this client got,
+                             and the full message is rebuilt here. Unchanged parts are shared between
+                             successive messages : they must not be modified. See pyros.protocol.delta.
+        :param keyframe_interval: for delta topics, the node sends the full message every keyframe_interval messages.
+        :param control_lane: if True, and the node provides the 'control_lane' service, setup() and the listings
+                             are sent to the node control lane, and never delay data-plane requests.
+                             Latencies of both lanes are measured in lane_stats. See pyros.protocol.lanes.
+        """
         # Link to only one Server
         self.node_name = node_name
-
+        self.provider_policy = make_policy(provider_policy) if provider_policy is not None and node_name is None else None
+        self._balanced_svcs = {}  # {endpoint: (time discovered, pyzmp.Service)}
+
+        if admission is None or isinstance(admission, AdmissionController):
+            self.admission = admission
+        else:
+            self.admission = AdmissionController(**admission)
+        self.load_interval = load_interval
+
+        self._batch_params = True  # until the node says otherwise
+        self._node_lacks = set()  # (service, option) the node rejected, not sent anymore
+
+        self._compress = None
+        self.compression_stats = CompressionStats()
+        if compression:
+            compression = compression if isinstance(compression, dict) else {}
+            installed = available_codecs()
+            self._compress = {
+                'codecs': [c for c in compression.get('codecs', installed) if c in installed],
+                'threshold': compression.get('threshold', DEFAULT_THRESHOLD),
+            }
+
+        self.delta_topics = set(delta_topics or ())
+        self._delta = DeltaDecoder(uuid.uuid4().hex, keyframe_interval) if self.delta_topics else None
+
+        self._numpy = _import_numpy() if numpy_arrays else None
+        self._array_history = {}
+        self.lazy_messages = lazy_messages
+        if compact_messages and lazy_messages:
+            raise ValueError("compact_messages and lazy_messages cannot be used together")
+        self._compact = CompactMessageFactory() if compact_messages else None
+
+        if service_cache is None or isinstance(service_cache, ServiceCache):
+            self.service_cache = service_cache
+        else:
+            self.service_cache = ServiceCache(service_cache)
+
+        if capture is None or isinstance(capture, TrafficRecorder):
+            self.capture = capture
+        else:
+            self.capture = TrafficRecorder(capture)
+
+        self._watch_listener = None
+
+        self.control_lane = control_lane
+        self._control_lane = None
+        self._control_lane_lock = threading.Lock()
+        self.lane_stats = {CONTROL: LaneStats(), DATA: LaneStats()}
+
+        self.resolve_epoch = 0  # incremented when the ids resolved so far are not valid anymore
+        self._discover()
+
+        # Optional : continuous liveness tracking, when the node provides the 'heartbeat' service.
+        # Heartbeats also advertise the node queue depth, used for admission control.
+        self.liveness = None
+        self._load_monitor = None
+        self._heartbeat_lane = None
+        heartbeat_svc = pyzmp.Service.discover('heartbeat') if heartbeat_interval or admission is not None else None
+        if heartbeat_svc is not None and heartbeat_interval:
+            self.liveness = LivenessMonitor(
+                self._heartbeat, interval=heartbeat_interval, max_missed=heartbeat_max_missed,
+                on_restart=self._rediscover, on_beat=self._on_heartbeat,
+            )
+            self.liveness.start()
+        elif heartbeat_svc is not None:
+            # in the background : a busy node would delay requests waiting for its queue depth
+            self._load_monitor = LivenessMonitor(self._heartbeat, interval=load_interval, on_beat=self._on_heartbeat)
+            self._load_monitor.start()
+
+    def _discover(self, timeout=5):
+        """
+        Discovers all services of the node. Called again when the node restarts.
+        :param timeout: how long to wait for each required service, in seconds
+        """
         # Discover all Services. Wait for at least one, and make sure it s provided by our expected Server
-        self.msg_build_svc = pyzmp.Service.discover('msg_build', 5)
+        self.msg_build_svc = pyzmp.Service.discover('msg_build', timeout)
         if self.msg_build_svc is None or (
             self.node_name is not None and
             self.node_name not in [p[0] for p in self.msg_build_svc.providers]
         ):
             raise PyrosServiceNotFound('msg_build')
 
-        self.setup_svc = pyzmp.Service.discover('setup', 5)
+        self.setup_svc = pyzmp.Service.discover('setup', timeout)
         if self.setup_svc is None or (
                         self.node_name is not None and
                         self.node_name not in [p[0] for p in self.setup_svc.providers]
         ):
             raise PyrosServiceNotFound('setup')
 
-        self.topic_svc = pyzmp.Service.discover('topic', 5)
+        self.topic_svc = pyzmp.Service.discover('topic', timeout)
         if self.topic_svc is None or (
             self.node_name is not None and
             self.node_name not in [p[0] for p in self.topic_svc.providers]
         ):
             raise PyrosServiceNotFound('topic')
 
-        self.service_svc = pyzmp.Service.discover('service', 5)
+        self.service_svc = pyzmp.Service.discover('service', timeout)
         if self.service_svc is None or (
             self.node_name is not None and
             self.node_name not in [p[0] for p in self.service_svc.providers]
         ):
             raise PyrosServiceNotFound('service')
 
-        self.param_svc = pyzmp.Service.discover('param', 5)
+        self.param_svc = pyzmp.Service.discover('param', timeout)
         if self.param_svc is None or (
             self.node_name is not None and
             self.node_name not in [p[0] for p in self.param_svc.providers]
         ):
             raise PyrosServiceNotFound('param')
 
-        self.topics_svc = pyzmp.Service.discover('topics', 5)
+        self.topics_svc = pyzmp.Service.discover('topics', timeout)
         if self.topics_svc is None or (
             self.node_name is not None and
             self.node_name not in [p[0] for p in self.topics_svc.providers]
         ):
             raise PyrosServiceNotFound('topics')
 
-        self.services_svc = pyzmp.Service.discover('services', 5)
+        self.services_svc = pyzmp.Service.discover('services', timeout)
         if self.services_svc is None or (
             self.node_name is not None and
             self.node_name not in [p[0] for p in self.services_svc.providers]
         ):
             raise PyrosServiceNotFound('services')
 
-        self.params_svc = pyzmp.Service.discover('params', 5)
+        self.params_svc = pyzmp.Service.discover('params', timeout)
         if self.params_svc is None or (
             self.node_name is not None and
             self.node_name not in [p[0] for p in self.params_svc.providers]
         ):
             raise PyrosServiceNotFound('params')
 
+        # Optional : resolving names to compact ids. Not waiting for it, older nodes do not provide it.
+        self.resolve_svc = pyzmp.Service.discover('resolve')
+        if self.resolve_svc is not None and (
+            self.node_name is not None and
+            self.node_name not in [p[0] for p in self.resolve_svc.providers]
+        ):
+            self.resolve_svc = None
+
+        # Optional : param change notifications.
+        self.param_watch_svc = pyzmp.Service.discover('param_watch')
+        if self.param_watch_svc is not None and (
+            self.node_name is not None and
+            self.node_name not in [p[0] for p in self.param_watch_svc.providers]
+        ):
+            self.param_watch_svc = None
+        # Optional : control lane. Its endpoint is asked on first use, and again after a restart.
+        self.control_lane_svc = pyzmp.Service.discover('control_lane') if self.control_lane else None
+        if self.control_lane_svc is not None and (
+            self.node_name is not None and
+            self.node_name not in [p[0] for p in self.control_lane_svc.providers]
+        ):
+            self.control_lane_svc = None
+        with self._control_lane_lock:
+            if self._control_lane is not None:
+                self._control_lane.close()
+                self._control_lane = None
+
+        if self._watch_listener is not None and self.param_watch_svc is not None:
+            # the node restarted : it forgot our watches, and publishes on a new endpoint.
+            # Not through _call : the node is still considered down until this returns.
+            for prefix in self._watch_listener.prefixes():
+                self._watch_listener.connect(self._send(self.param_watch_svc, args=(prefix,)))
+
+    def _rediscover(self):
+        # the restarted node has new addresses, and issues new ids
+        self._discover()
+        self._forget_resolved()
+
+    def _heartbeat(self, timeout=1.0):
+        beat_timeout = int(timeout * 1000)
+        if self._heartbeat_lane is None:
+            # rediscovering the services every time : after a restart the node has a new address
+            lane_svc = pyzmp.Service.discover('heartbeat_lane')
+            if lane_svc is not None and (
+                self.node_name is None or self.node_name in [p[0] for p in lane_svc.providers]
+            ):
+                endpoint = lane_svc.call(node=self.node_name, send_timeout=beat_timeout, recv_timeout=beat_timeout)
+                self._heartbeat_lane = ControlLaneClient(endpoint)
+        if self._heartbeat_lane is not None:
+            # answered by the node even while its main loop is busy
+            try:
+                return self._heartbeat_lane.call('heartbeat', send_timeout=beat_timeout, recv_timeout=beat_timeout)
+            except Exception:
+                self._heartbeat_lane.close()
+                self._heartbeat_lane = None  # asking for the endpoint again : the node may have restarted
+                raise
+
+        # older node, answering heartbeats from its main loop
+        heartbeat_svc = pyzmp.Service.discover('heartbeat')
+        if heartbeat_svc is None:
+            raise PyrosServiceNotFound('heartbeat')
+        return heartbeat_svc.call(node=self.node_name, send_timeout=beat_timeout, recv_timeout=beat_timeout)
+
+    def _on_heartbeat(self, beat):
+        if self.admission is not None and beat:
+            self.admission.update_node_queue(beat.get('queue_depth'))
+
+    def close(self):
+        """Stops the background activity of this client, if any."""
+        if self.liveness is not None:
+            self.liveness.stop()
+        if self._load_monitor is not None:
+            self._load_monitor.stop()
+        if self._heartbeat_lane is not None:
+            self._heartbeat_lane.close()
+        if self.capture is not None:
+            self.capture.close()
+        if self._watch_listener is not None:
+            self._watch_listener.stop()
+        if self._control_lane is not None:
+            self._control_lane.close()
+
+    def _call(self, svc, args=None, kwargs=None, **call_kwargs):
+        # All requests to the node go through here.
+        if self.capture is None:
+            return self._admit(svc, args, kwargs, **call_kwargs)
+
+        start = self.capture.clock()
+        try:
+            res = self._admit(svc, args, kwargs, **call_kwargs)
+        except Exception as exc:
+            self.capture.record(
+                svc.name, args, kwargs, start, self.capture.clock() - start, error=exc, call_kwargs=call_kwargs
+            )
+            raise
+        self.capture.record(
+            svc.name, args, kwargs, start, self.capture.clock() - start, response=res, call_kwargs=call_kwargs
+        )
+        return res
+
+    def _admit(self, svc, args=None, kwargs=None, **call_kwargs):
+        if self.liveness is not None and not self.liveness.alive:
+            raise PyrosNodeUnavailable("Pyros node {0} is not answering heartbeats".format(self.node_name))
+        if self.admission is None:
+            return self._send(svc, args, kwargs, **call_kwargs)
+
+        if not self.admission.acquire(svc.name):
+            raise PyrosServiceOverloaded("Pyros {0} request refused : too many requests in flight".format(svc.name))
+        try:
+            return self._send(svc, args, kwargs, **call_kwargs)
+        finally:
+            self.admission.release(svc.name)
+
+    def _send(self, svc, args=None, kwargs=None, **call_kwargs):
+        lane = lane_of(svc.name, kwargs)
+        start = time.time()
+        try:
+            if lane == CONTROL and self.control_lane_svc is not None:
+                return self._control_lane_client().call(svc.name, args, kwargs, **call_kwargs)
+            if self.provider_policy is not None and svc.name in self.STATELESS_ENDPOINTS:
+                return self._balanced_call(svc, args, kwargs, **call_kwargs)
+            # Targeting our node explicitly : otherwise zmq would round robin among all providers of the service.
+            return svc.call(args=args, kwargs=kwargs, node=self.node_name, **call_kwargs)
+        finally:
+            self.lane_stats[lane].count_request(time.time() - start)
+
+    def _control_lane_client(self):
+        with self._control_lane_lock:
+            if self._control_lane is None:
+                self._control_lane = ControlLaneClient(self.control_lane_svc.call(node=self.node_name))
+            return self._control_lane
+
+    def _balanced_svc(self, svc):
+        now = time.time()
+        checked, balanced = self._balanced_svcs.get(svc.name, (None, svc))
+        if checked is None or now - checked >= self.PROVIDERS_REFRESH:
+            balanced = pyzmp.Service.discover(svc.name) or balanced  # keeping the last known ones if none answer
+            self._balanced_svcs[svc.name] = (now, balanced)
+        return balanced
+
+    def _balanced_call(self, svc, args=None, kwargs=None, **call_kwargs):
+        svc = self._balanced_svc(svc)
+        providers = self.provider_policy.order(sorted(set(p[0] for p in svc.providers)))
+        for attempt, provider in enumerate(providers):
+            self.provider_policy.started(provider)
+            start = time.time()
+            try:
+                res = svc.call(args=args, kwargs=kwargs, node=provider, **call_kwargs)
+            except pyzmp.service.ServiceCallTimeout:
+                self.provider_policy.finished(provider, time.time() - start, ok=False)
+                if attempt == len(providers) - 1:
+                    raise
+                continue
+            except Exception:  # the node answered, even if with an exception
+                self.provider_policy.finished(provider, time.time() - start)
+                raise
+            self.provider_policy.finished(provider, time.time() - start)
+            return res
+        raise PyrosServiceNotFound(svc.name)
+
+    def _encoding_kwargs(self, fields=None, where=None, delta=None):
+        # options are None when not needed, and not sent then, to keep working with nodes that do not support them
+        return {
+            'typed_buffers': True if self._numpy is not None else None,
+            'lazy': True if self.lazy_messages else None,
+            'fields': list(fields) if fields is not None else None,
+            'where': where,
+            'delta': delta,
+            'compress': self._compress,
+        }
+
+    def _call_with_options(self, svc, args, options, needs=None):
+        """
+        Calls a node service with options older nodes may not support, like encoding options.
+        Options the node rejects as unexpected keyword arguments are remembered, per service, and not sent anymore.
+        The service did not run then, so sending the request again without them is safe.
+        :param options: a dict {option: value}. Options with a None value are not sent.
+        :param needs: a dict {option: other option}, for options only sent along with the other one, if it is passed
+        :return: a tuple (res, sent) with the dict of options sent to the node
+        """
+        options = dict((name, value) for name, value in six.iteritems(options) if value is not None)
+        needs = needs or {}
+        while True:
+            lacked = set(name for name in options if (svc.name, name) in self._node_lacks)
+            sent = dict(
+                (name, value) for name, value in six.iteritems(options)
+                if name not in lacked and needs.get(name) not in lacked
+            )
+            try:
+                return self._call(svc, args=args, kwargs=sent or None), sent
+            except TypeError as exc:
+                rejected = _rejected_keyword(exc, sent)
+                if rejected is None:  # raised by the service itself
+                    raise
+                self._node_lacks.add((svc.name, rejected))  # older node, not accepting this option
+
+    def _extract_call(self, svc, args, fields=None, where=None, delta=None):
+        """
+        Calls the topic or service endpoint, with the field projection and the filter done on the node if possible.
+        :param delta: the delta request option, for delta topics
+        :return: a tuple (res, node_fields, node_where), with the options the node applied, None for the others.
+        """
+        try:
+            # a filter done here needs the whole message : no projection on the node then
+            res, sent = self._call_with_options(
+                svc, args, self._encoding_kwargs(fields, where, delta), needs={'fields': 'where'}
+            )
+        except pyzmp.service.ServiceCallTimeout as exc:
+            six.reraise(PyrosServiceTimeout("Pyros Service call timed out."), None, sys.exc_info()[2])
+        return res, sent.get('fields'), sent.get('where')
+
+    def _decode(self, res, topic_name=None):
+        if self._compress is not None:
+            res = decompress(res, self.compression_stats)
+        if topic_name in self.delta_topics:
+            res = self._delta.decode(topic_name, res)
+        decode = None
+        if self._numpy is not None:
+            decode = lambda content: unpack_arrays(content, self._numpy)
+        if self.lazy_messages:
+            return loads_lazy(res, decode)
+        return decode(res) if decode is not None else res
+
     def buildMsg(self, connection_name, suffix=None):
-        #changing unicode to string ( testing stability of multiprocess debugging )
-        if isinstance(connection_name, unicode):
-            connection_name = unicodedata.normalize('NFKD', connection_name).encode('ascii', 'ignore')
-        res = self.msg_build_svc.call(args=(connection_name,))
+        connection_name = _ascii_name(connection_name)
+        res = self._call(self.msg_build_svc, args=(connection_name,))
         return res
 
     def topic_inject(self, topic_name, _msg_content=None, **kwargs):
@@ -127,52 +547,146 @@ class PyrosClient(object):
         :param kwargs: each extra kwarg will be put int he message is structure matches
         :return:
         """
-        #changing unicode to string ( testing stability of multiprocess debugging )
-        if isinstance(topic_name, unicode):
-            topic_name = unicodedata.normalize('NFKD', topic_name).encode('ascii', 'ignore')
+        topic_name = _ascii_name(topic_name)
 
         if _msg_content is not None:
             # logging.warn("injecting {msg} into {topic}".format(msg=_msg_content, topic=topic_name))
-            res = self.topic_svc.call(args=(topic_name, _msg_content,))
+            return self._topic_inject(topic_name, _msg_content)
         else:  # default kwargs is {}
             # logging.warn("injecting {msg} into {topic}".format(msg=kwargs, topic=topic_name))
-            res = self.topic_svc.call(args=(topic_name, kwargs,))
+            return self._topic_inject(topic_name, kwargs)
 
+    def _topic_inject(self, topic_key, msg_content):
+        res = self._call(self.topic_svc, args=(topic_key, msg_content,))
         return res is None  # check if message has been consumed
 
-    def topic_extract(self, topic_name):
-        #changing unicode to string ( testing stability of multiprocess debugging )
-        if isinstance(topic_name, unicode):
-            topic_name = unicodedata.normalize('NFKD', topic_name).encode('ascii', 'ignore')
-
-        try:
-            res = self.topic_svc.call(args=(topic_name, None,))
-        except pyzmp.service.ServiceCallTimeout as exc:
-            six.reraise(PyrosServiceTimeout("Pyros Service call timed out."), None, sys.exc_info()[2])
+    def topic_extract(self, topic_name, fields=None, where=None):
+        """
+        Extracts a message from a topic.
+        :param topic_name: name of the topic
+        :param fields: optional list of field paths to keep, like ['pose.pose.position', 'ranges[0:100]'],
+                       applied on the node before sending. See pyros.protocol.projection.
+        :param where: optional filter expression, like ['>=', 'level', 2]. Messages not matching it are dropped
+                      on the node, and the first matching one is returned. See pyros.protocol.filters.
+        """
+        topic_name = _ascii_name(topic_name)
+
+        return self._topic_extract(topic_name, topic_name, fields, where)
+
+    def _topic_extract(self, topic_name, topic_key, fields=None, where=None):
+        # topic_key is what identifies the topic on the node : its name, or its id if it has been resolved
+        if where is not None:
+            compile_filter(where)  # invalid expressions fail here, not on the node
+        if topic_name in self.delta_topics:
+            # frames must be decoded in the order the node sent them
+            with self._delta.lock:
+                res, node_fields, node_where = self._delta_extract(topic_name, topic_key, fields, where)
+        else:
+            res, node_fields, node_where = self._extract_call(self.topic_svc, (topic_key, None,), fields, where)
+            res = self._decode(res)
 
         # TODO : if topic_name not exposed, we get None as res.
         # We should improve that behavior (display warning ? allow auto -dynamic- expose ?)
 
+        if where is not None and node_where is None:
+            # filtering here what the node could not
+            matches = compile_filter(where)
+            while res is not None and not matches(res):
+                if topic_name in self.delta_topics:
+                    with self._delta.lock:
+                        res = self._delta_extract(topic_name, topic_key)[0]
+                else:
+                    res = self._decode(self._extract_call(self.topic_svc, (topic_key, None,))[0])
+        if fields is not None:
+            return res if node_fields is not None else project(res, fields)  # partial messages are not compacted
+        if self._compact is not None and res is not None:
+            if not self._compact.is_registered(topic_name):
+                self._compact.register(topic_name, self.buildMsg(topic_name))
+            res = self._compact.convert(topic_name, res)
         return res
 
-    def service_call(self, service_name, _msg_content=None, **kwargs):
-        #changing unicode to string ( testing stability of multiprocess debugging )
-        if isinstance(service_name, unicode):
-            service_name = unicodedata.normalize('NFKD', service_name).encode('ascii', 'ignore')
+    def _delta_extract(self, topic_name, topic_key, fields=None, where=None):
+        res, node_fields, node_where = self._extract_call(
+            self.topic_svc, (topic_key, None,), fields, where, self._delta.request(topic_name)
+        )
+        return self._decode(res, topic_name), node_fields, node_where
 
-        try:
-            if _msg_content is not None:
-                res = self.service_svc.call(args=(service_name, _msg_content,))
-            else:  # default kwargs is {}
-                res = self.service_svc.call(args=(service_name, kwargs,))
-        except pyzmp.service.ServiceCallTimeout as exc:
-            six.reraise(PyrosServiceTimeout("Pyros Service call timed out."), None, sys.exc_info()[2])
+    def topic_extract_array(self, topic_name, fields, n=1):
+        """
+        Extracts a message from a topic, and returns numeric fields of the last n messages extracted this way,
+        stacked as numpy arrays. Requires numpy_arrays=True.
+        :param topic_name: name of the topic
+        :param fields: list of dotted field paths, like ['ranges'] or ['position', 'velocity']
+        :param n: the number of messages to stack
+        :return: a dict {field: numpy.ndarray}. The first dimension of each array is the number of messages stacked.
+        """
+        if self._numpy is None:
+            raise RuntimeError("topic_extract_array requires a PyrosClient created with numpy_arrays=True")
+
+        history = self._array_history.get(topic_name)
+        if history is None or history.maxlen != n:
+            history = collections.deque(history or (), maxlen=n)
+            self._array_history[topic_name] = history
+
+        msg = self.topic_extract(topic_name, fields=fields)
+        if msg is not None:
+            history.append(msg)
+
+        stacked = {}
+        for field in fields:
+            values = [self._numpy.asarray(projected_value(m, field)) for m in history]
+            stacked[field] = self._numpy.stack(values) if values else self._numpy.empty((0,))
+        return stacked
+
+    def service_call(self, service_name, _msg_content=None, _fields=None, **kwargs):
+        """
+        Calls a service.
+        :param service_name: name of the service
+        :param _msg_content: optional request content. If not passed, the request is built from kwargs.
+        :param _fields: optional list of field paths of the response to keep, applied on the node before sending.
+                        See pyros.protocol.projection.
+        """
+        service_name = _ascii_name(service_name)
+
+        request = _msg_content if _msg_content is not None else kwargs  # default kwargs is {}
+        return self._service_call(service_name, service_name, request, _fields)
+
+    def _service_call(self, service_name, service_key, request, fields=None):
+        # service_key is what identifies the service on the node : its name, or its id if it has been resolved
+        # projected responses are memoized separately from full ones
+        cache_key = request if fields is None else {'request': request, 'fields': list(fields)}
+        if self.service_cache is not None and self.service_cache.is_cached(service_name):
+            found, res = self.service_cache.get(service_name, cache_key)
+            if found:
+                return res
+
+        res, node_fields, _ = self._extract_call(self.service_svc, (service_key, request,), fields)
+
+        res = self._decode(res)
+        if fields is not None and node_fields is None:
+            res = project(res, fields)
+
+        if self.service_cache is not None and res is not None:
+            self.service_cache.put(service_name, cache_key, res)
         # A service that doesn't exist on the node will return res_content.resp_content None.
         # It should probably except...
         # TODO : improve error handling, maybe by checking the type of res ?
 
         return res
 
+    def service_invalidate(self, service_name=None, _msg_content=None, **kwargs):
+        """
+        Forgets memoized responses of a service.
+        :param service_name: name of the service. If None, all memoized responses are forgotten.
+        :param _msg_content: optional request content. If neither this nor kwargs are passed,
+                             all responses for this service are forgotten.
+        """
+        if self.service_cache is None:
+            return
+        service_name = _ascii_name(service_name)
+        request = _msg_content if _msg_content is not None else (kwargs or None)
+        self.service_cache.invalidate(service_name, request)
+
     def param_set(self, param_name, _value=None, **kwargs):
         """
         Setting parameter. if _value, we inject it directly. if not, we use all extra kwargs
@@ -181,16 +695,17 @@ class PyrosClient(object):
         :param kwargs: each extra kwarg will be put in the value if structure matches
         :return:
         """
-        #changing unicode to string ( testing stability of multiprocess debugging )
-        if isinstance(param_name, unicode):
-            param_name = unicodedata.normalize('NFKD', param_name).encode('ascii', 'ignore')
+        param_name = _ascii_name(param_name)
 
+        return self._param_set(param_name, _value, **kwargs)
+
+    def _param_set(self, param_key, _value=None, **kwargs):
         _value = _value or {}
 
         if kwargs:
-            res = self.param_svc.call(args=(param_name, kwargs,))
+            res = self._call(self.param_svc, args=(param_key, kwargs,))
         elif _value is not None:
-            res = self.param_svc.call(args=(param_name, _value,))
+            res = self._call(self.param_svc, args=(param_key, _value,))
         else:   # if _msg_content is None the request is invalid.
                 # just return something to mean False.
             res = 'WRONG SET'
@@ -198,40 +713,208 @@ class PyrosClient(object):
         return res is None  # check if message has been consumed
 
     def param_get(self, param_name):
-        #changing unicode to string ( testing stability of multiprocess debugging )
-        if isinstance(param_name, unicode):
-            param_name = unicodedata.normalize('NFKD', param_name).encode('ascii', 'ignore')
-        res = self.param_svc.call(args=(param_name, None,))
+        param_name = _ascii_name(param_name)
+        return self._param_get(param_name)
+
+    def _param_get(self, param_key):
+        res, _ = self._call_with_options(self.param_svc, (param_key, None,), {'compress': self._compress})
+        return decompress(res, self.compression_stats)
+
+    def _params_batch(self, **batch):
+        """
+        Sends a batched params request.
+        :return: a tuple (supported, result). supported is False when the node does not support batches.
+        :raises: the error of the node, if it supports batches and the batch failed
+        """
+        if not self._batch_params:
+            return False, None
+        try:
+            return True, self._call(self.params_svc, kwargs=batch, send_timeout=5000, recv_timeout=10000)
+        except TypeError as exc:
+            if _rejected_keyword(exc, batch) is None:  # the batch failed on the node : not sent again
+                raise
+            self._batch_params = False  # older node, its params service takes no arguments
+            return False, None
+
+    def param_get_many(self, param_names):
+        """
+        Gets several params in one request.
+        :param param_names: the names of the params
+        :return: a dict {name: value}
+        """
+        param_names = [_ascii_name(name) for name in param_names]
+        supported, res = self._params_batch(names=param_names)
+        if not supported:
+            res = dict((name, self._param_get(name)) for name in param_names)
+        return res
+
+    def param_get_tree(self, prefix):
+        """
+        Gets all params under a prefix in one request, like '/robot' for '/robot' and '/robot/arm/length'.
+        :param prefix: the root of the param subtree
+        :return: a dict {name: value}
+        """
+        prefix = _ascii_name(prefix)
+        supported, res = self._params_batch(prefix=prefix)
+        if not supported:
+            res = self.param_get_many(name for name in (self.params() or []) if in_tree(name, prefix))
         return res
 
+    def param_set_many(self, values):
+        """
+        Sets several params in one request, atomically : if one cannot be set, none is.
+        With nodes not supporting batches, params are set one by one, and if one fails, the ones already set
+        are restored, and the ones created are deleted, when the node can delete params.
+        Other clients may then see some of the new values before the rollback.
+        :param values: a dict {name: value}
+        :return: True if all params have been set
+        :raises: the error of the node, when a param cannot be set
+        """
+        values = dict((_ascii_name(name), value) for name, value in six.iteritems(values))
+        supported, res = self._params_batch(values=values)
+        if supported:
+            return res is None
+
+        exposed = self.params() or {}
+        previous = []
+        try:
+            for name, value in six.iteritems(values):
+                previous.append((name, name in exposed, self._param_get(name)))
+                # exact values, like the batch : param_set would replace falsy values with {}
+                if self._call(self.param_svc, args=(name, value,)) is not None:
+                    raise ValueError("Param {0} could not be set".format(name))
+        except Exception:
+            for name, existed, value in reversed(previous):
+                if existed:
+                    self._call(self.param_svc, args=(name, value,))
+                else:
+                    self._param_delete(name)
+            raise
+        return True
+
+    def _param_delete(self, param_key):
+        try:
+            self._call(self.param_svc, args=(param_key, None,), kwargs={'delete': True})
+        except TypeError as exc:
+            if _rejected_keyword(exc, ('delete',)) is None:
+                raise
+            # older node, params cannot be deleted : the param keeps its value
+
+    def param_watch(self, name_or_prefix, callback):
+        """
+        Watches a param, or all params under a prefix, without polling : the node notifies their changes.
+        Requires a node providing the 'param_watch' service.
+        :param name_or_prefix: a param name, or the root of a param subtree, like '/robot'
+        :param callback: called as callback(name, old_value, new_value, source) for each change,
+                         from a background thread. source is what changed the param, like 'param' or 'external'.
+        :return: the watch id, to pass to param_unwatch
+        """
+        if self.param_watch_svc is None:
+            raise PyrosServiceNotFound('param_watch')
+        name_or_prefix = _ascii_name(name_or_prefix)
+        endpoint = self._call(self.param_watch_svc, args=(name_or_prefix,))
+        if self._watch_listener is None:
+            self._watch_listener = ParamWatchListener()
+            self._watch_listener.start()
+        self._watch_listener.connect(endpoint)
+        return self._watch_listener.add(name_or_prefix, callback)
+
+    def param_unwatch(self, watch_id):
+        """
+        Stops a watch.
+        :param watch_id: the id returned by param_watch
+        """
+        if self._watch_listener is None:
+            raise KeyError("Unknown param watch {0!r}".format(watch_id))
+        prefix = self._watch_listener.remove(watch_id)
+        self._call(self.param_watch_svc, args=(prefix,), kwargs={'watch': False})
+
+    def _resolve(self, kind, name):
+        """
+        Validates and normalizes a name once, and asks the node for its compact id, if the node supports it.
+        :return: a tuple (name, key) where key is what identifies the interface on the node.
+        """
+        if not isinstance(name, six.string_types):
+            raise TypeError("{kind} name must be a string, not {name!r}".format(kind=kind, name=name))
+        name = _ascii_name(name)
+
+        if self.resolve_svc is None:
+            return name, name
+        key = self._call(self.resolve_svc, args=(kind, name,))
+        if key is None:
+            raise PyrosServiceNotFound("{kind} {name} is not exposed on the node".format(kind=kind, name=name))
+        return name, key
+
+    def _forget_resolved(self):
+        """Handles resolve their name again on their next call."""
+        self.resolve_epoch += 1
+
+    def topic(self, topic_name):
+        """
+        Resolves a topic once, and returns a handle to inject into / extract from it without further name processing.
+        """
+        return TopicHandle(self, topic_name)
+
+    def service(self, service_name):
+        """
+        Resolves a service once, and returns a handle to call it without further name processing.
+        """
+        return ServiceHandle(self, service_name)
+
+    def param(self, param_name):
+        """
+        Resolves a param once, and returns a handle to get / set it without further name processing.
+        """
+        return ParamHandle(self, param_name)
+
     def topics(self):
         try:
-            res = self.topics_svc.call(send_timeout=5000, recv_timeout=10000)  # Need to be generous on timeout in case we are starting up multiprocesses
+            res = self._call(self.topics_svc, send_timeout=5000, recv_timeout=10000)  # Need to be generous on timeout in case we are starting up multiprocesses
         except pyzmp.service.ServiceCallTimeout as exc:
             six.reraise(PyrosServiceTimeout("Pyros Service call timed out."), None, sys.exc_info()[2])
         return res
         
     def services(self):
         try:
-            res = self.services_svc.call(send_timeout=5000, recv_timeout=10000)  # Need to be generous on timeout in case we are starting up multiprocesses
+            res = self._call(self.services_svc, send_timeout=5000, recv_timeout=10000)  # Need to be generous on timeout in case we are starting up multiprocesses
         except pyzmp.service.ServiceCallTimeout as exc:
             six.reraise(PyrosServiceTimeout("Pyros Service call timed out."), None, sys.exc_info()[2])
         return res
 
     def params(self):
-        res = self.params_svc.call(send_timeout=5000, recv_timeout=10000)  # Need to be generous on timeout in case we are starting up multiprocesses
+        res = self._call(self.params_svc, send_timeout=5000, recv_timeout=10000)  # Need to be generous on timeout in case we are starting up multiprocesses
         return res
 
-    def setup(self, publishers=None, subscribers=None, services=None, params=None): #, enable_cache=False):
-        res = self.setup_svc.call(kwargs={
+    def setup(self, publishers=None, subscribers=None, services=None, params=None, subscriber_policies=None): #, enable_cache=False):
+        """
+        Exposes interfaces on the node.
+        :param subscriber_policies: optional {subscriber_name: policy_dict} to rate limit or downsample
+                                    high rate subscribers on the node, before message conversion.
+                                    See pyros.server.throttle for the available policies.
+        """
+        setup_kwargs = {
             'publishers': publishers,
             'subscribers': subscribers,
             'services': services,
             'params': params,
             #'enable_cache': enable_cache,  # TODO : CAREFUL : check if we can actually enable the cache dynamically ?
-        }, send_timeout=5000, recv_timeout=10000)  # Need to be generous on timeout in case we are starting up multiprocesses
+        }
+        # only passed when used, to keep working with nodes that do not support it
+        if subscriber_policies:
+            setup_kwargs['subscriber_policies'] = subscriber_policies
+        res = self._call(self.setup_svc, kwargs=setup_kwargs, send_timeout=5000, recv_timeout=10000)  # Need to be generous on timeout in case we are starting up multiprocesses
         return res
 
+    def setup_async(self, publishers=None, subscribers=None, services=None, params=None, subscriber_policies=None,
+                    batch_size=16):
+        """
+        Exposes interfaces on the node, batch_size at a time, from a background thread.
+        :return: a SetupHandle, to check or wait for interfaces being exposed. See pyros.client.async_setup.
+        """
+        return SetupHandle(
+            self.setup, publishers, subscribers, services, params, subscriber_policies, batch_size
+        ).start()
+
     #def listacts(self):
     #    return {}
 
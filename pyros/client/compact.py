@@ -0,0 +1,157 @@
+from __future__ import absolute_import
+
+import re
+
+import six
+
+"""
+Compact message representation for high volume topics.
+A message as a nested dict costs one hash table per (sub)message.
+Here each message type gets a generated class with __slots__, built once from the message skeleton,
+and messages are stored as instances of it : only the values are stored, the field names are shared.
+"""
+
+
+class CompactMessage(object):
+    """
+    Base of generated message classes.
+    Subclasses define __slots__ ( the field names ) and _nested ( {field_name: nested class} ).
+    """
+    __slots__ = ()
+    _nested = {}
+
+    def __init__(self, *args, **kwargs):
+        for name, value in zip(self.__slots__, args):
+            setattr(self, name, value)
+        for name, value in six.iteritems(kwargs):
+            setattr(self, name, value)
+
+    @classmethod
+    def from_dict(cls, content, factory=None):
+        """
+        :param content: the message as a dict
+        :param factory: the factory to use for dicts inside lists, whose structure is not known in advance
+        """
+        if len(content) != len(cls.__slots__):
+            raise KeyError("message structure does not match {0}".format(cls.__name__))
+        msg = cls.__new__(cls)
+        for name in cls.__slots__:
+            value = content[name]
+            nested = cls._nested.get(name)
+            if nested is not None and isinstance(value, dict):
+                value = nested.from_dict(value, factory)
+            elif factory is not None and isinstance(value, list) and any(isinstance(v, dict) for v in value):
+                value = [factory.from_dict(v) if isinstance(v, dict) else v for v in value]
+            setattr(msg, name, value)
+        return msg
+
+    def to_dict(self):
+        return dict((name, _to_dict(getattr(self, name))) for name in self.__slots__)
+
+    def __eq__(self, other):
+        if isinstance(other, CompactMessage):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "{0}({1})".format(type(self).__name__, ", ".join(
+            "{0}={1!r}".format(name, getattr(self, name)) for name in self.__slots__
+        ))
+
+
+def _to_dict(value):
+    if isinstance(value, CompactMessage):
+        return value.to_dict()
+    elif isinstance(value, list):
+        return [_to_dict(v) for v in value]
+    return value
+
+
+def _class_name(name):
+    return re.sub(r'\W|^(?=\d)', '_', name.strip('/')) or 'Message'
+
+
+def make_message_class(name, skeleton):
+    """
+    Generates a __slots__ class from a message skeleton.
+    :param name: the name of the class (usually derived from the message type or connection name)
+    :param skeleton: a message as a dict, like the one returned by buildMsg
+    :return: a CompactMessage subclass
+    """
+    fields = tuple(sorted(skeleton))
+    nested = dict(
+        (f, make_message_class(name + '_' + f, v)) for f, v in six.iteritems(skeleton) if isinstance(v, dict)
+    )
+    return type(str(_class_name(name)), (CompactMessage,), {'__slots__': fields, '_nested': nested})
+
+
+def message_type(skeleton):
+    """
+    :param skeleton: a message as a dict, like the one returned by buildMsg
+    :return: the structure of the message : its field names, and the structures of its submessages.
+    Messages of the same type have the same structure.
+    """
+    return tuple(sorted(
+        (f, message_type(v) if isinstance(v, dict) else None) for f, v in six.iteritems(skeleton)
+    ))
+
+
+class CompactMessageFactory(object):
+    """
+    Caches generated classes : one per message type, and one per dict structure for dicts found inside lists.
+    Connections are registered with their skeleton, and share the class of their message type.
+    """
+    def __init__(self):
+        self._connections = {}
+        self._types = {}
+        self._shapes = {}
+
+    def register(self, connection_name, skeleton):
+        """
+        :return: the class for the message type of this connection, or None if the skeleton is not a message (dict)
+        """
+        if connection_name not in self._connections:
+            cls = None
+            if isinstance(skeleton, dict):
+                msg_type = message_type(skeleton)
+                cls = self._types.get(msg_type)
+                if cls is None:
+                    cls = self._types[msg_type] = make_message_class(connection_name, skeleton)
+            self._connections[connection_name] = cls
+        return self._connections[connection_name]
+
+    def is_registered(self, connection_name):
+        return connection_name in self._connections
+
+    def convert(self, connection_name, content):
+        """
+        :return: the content as an instance of the class of connection_name.
+        The content is returned unchanged if it does not match the registered skeleton.
+        """
+        cls = self._connections.get(connection_name)
+        if cls is None or not isinstance(content, dict):
+            return content
+        try:
+            return cls.from_dict(content, self)
+        except KeyError:  # structure does not match the skeleton
+            return content
+
+    def from_dict(self, content):
+        shape = tuple(sorted(content))
+        cls = self._shapes.get(shape)
+        if cls is None:
+            cls = self._shapes[shape] = type('Element', (CompactMessage,), {'__slots__': shape, '_nested': {}})
+        msg = cls.__new__(cls)
+        for name in shape:
+            value = content[name]
+            if isinstance(value, dict):
+                value = self.from_dict(value)
+            elif isinstance(value, list) and any(isinstance(v, dict) for v in value):
+                value = [self.from_dict(v) if isinstance(v, dict) else v for v in value]
+            setattr(msg, name, value)
+        return msg
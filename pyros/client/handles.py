@@ -0,0 +1,80 @@
+from __future__ import absolute_import
+
+"""
+Handles on resolved interfaces.
+A handle is obtained from PyrosClient.topic(), service() or param().
+The name is validated and normalized once, and the node id is used on every call,
+so nothing is done per call, except the call itself.
+Ids are only valid for the node that issued them : after the client rediscovers a restarted node,
+or when the node does not know the id anymore, the handle resolves its name again.
+"""
+
+
+class _Handle(object):
+    __slots__ = ('_client', 'name', '_key', '_epoch')
+    kind = None
+
+    def __init__(self, client, name):
+        """
+        :param client: the PyrosClient used to communicate with the node
+        :param name: the name of the interface
+        """
+        self._client = client
+        self.name = name
+        self._resolve()
+
+    def _resolve(self):
+        epoch = self._client.resolve_epoch  # before resolving : a restart meanwhile makes us resolve again
+        self.name, self._key = self._client._resolve(self.kind, self.name)
+        self._epoch = epoch
+
+    @property
+    def key(self):
+        """What identifies the interface on the node : its id, or its name if the node cannot resolve ids."""
+        if self._epoch != self._client.resolve_epoch:
+            self._resolve()
+        return self._key
+
+    def _call(self, call):
+        try:
+            return call(self.key)
+        except KeyError:
+            if self._key == self.name:  # not an id the node forgot
+                raise
+            self._client._forget_resolved()  # the node restarted : the ids of the other handles are stale too
+            return call(self.key)
+
+    def __repr__(self):
+        return "{0}({1!r}, key={2!r})".format(type(self).__name__, self.name, self._key)
+
+
+class TopicHandle(_Handle):
+    __slots__ = ()
+    kind = 'topic'
+
+    def inject(self, _msg_content=None, **kwargs):
+        content = _msg_content if _msg_content is not None else kwargs
+        return self._call(lambda key: self._client._topic_inject(key, content))
+
+    def extract(self, fields=None, where=None):
+        return self._call(lambda key: self._client._topic_extract(self.name, key, fields, where))
+
+
+class ServiceHandle(_Handle):
+    __slots__ = ()
+    kind = 'service'
+
+    def call(self, _msg_content=None, _fields=None, **kwargs):
+        content = _msg_content if _msg_content is not None else kwargs
+        return self._call(lambda key: self._client._service_call(self.name, key, content, _fields))
+
+
+class ParamHandle(_Handle):
+    __slots__ = ()
+    kind = 'param'
+
+    def set(self, _value=None, **kwargs):
+        return self._call(lambda key: self._client._param_set(key, _value, **kwargs))
+
+    def get(self):
+        return self._call(lambda key: self._client._param_get(key))
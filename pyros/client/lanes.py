@@ -0,0 +1,54 @@
+from __future__ import absolute_import
+
+import threading
+
+import pyzmp
+
+from pyros.protocol.lanes import dumps_request, loads_response
+
+"""
+Control lane, on the client side.
+Control-plane requests are sent to the node control socket, one at a time, instead of the node main socket :
+the node serves them in a separate thread, and data-plane requests never wait behind them.
+"""
+
+
+class ControlLaneClient(object):
+    def __init__(self, endpoint):
+        """
+        :param endpoint: the control socket endpoint, returned by the node 'control_lane' service
+        """
+        self.endpoint = endpoint
+        self._lock = threading.Lock()  # zmq sockets are not thread safe, and REQ sockets wait for each response
+        self._socket = None
+
+    def call(self, endpoint, args=None, kwargs=None, send_timeout=1000, recv_timeout=5000):
+        """
+        :param endpoint: the name of the node service to call
+        :return: the node response
+        :raises pyzmp.service.ServiceCallTimeout: if the node does not answer in time
+        """
+        import zmq
+        with self._lock:
+            if self._socket is None:
+                self._socket = zmq.Context.instance().socket(zmq.REQ)
+                self._socket.connect(self.endpoint)
+            if not self._socket.poll(send_timeout, zmq.POLLOUT):
+                self._reset()
+                raise pyzmp.service.ServiceCallTimeout("Control lane request to {0} timed out".format(endpoint))
+            self._socket.send(dumps_request(endpoint, args, kwargs))
+            if not self._socket.poll(recv_timeout, zmq.POLLIN):
+                # a REQ socket cannot send again before it received : starting over with a new one
+                self._reset()
+                raise pyzmp.service.ServiceCallTimeout("Control lane response from {0} timed out".format(endpoint))
+            frame = self._socket.recv()
+        return loads_response(frame)
+
+    def _reset(self):
+        self._socket.close(linger=0)
+        self._socket = None
+
+    def close(self):
+        with self._lock:
+            if self._socket is not None:
+                self._reset()
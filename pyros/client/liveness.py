@@ -0,0 +1,89 @@
+from __future__ import absolute_import
+
+import logging
+import threading
+import time
+
+"""
+Continuous node liveness tracking, from heartbeats.
+Without it, a client learns that its node is gone only after the full timeout of a call, for every call.
+With it, the node is known to be down within max_missed heartbeat intervals, and calls can fail immediately.
+A node answering late is busy, like with a long service call, not down.
+"""
+
+_logger = logging.getLogger(__name__)
+
+
+class LivenessMonitor(object):
+    def __init__(self, heartbeat, interval=1.0, max_missed=2, on_restart=None, on_beat=None, clock=None):
+        """
+        :param heartbeat: the function calling the node heartbeat, with the time to wait for the answer, in seconds.
+                          Returns a dict with a 'boot_id', raises on failure.
+        :param interval: time between heartbeats, in seconds
+        :param max_missed: number of consecutive missed heartbeats after which the node is considered down.
+                           A heartbeat not answered within max_missed intervals is missed max_missed times.
+        :param on_restart: called when the node answers with a different boot_id : it restarted.
+                           If it raises, the node is considered down, and it will be called again.
+        :param on_beat: called with each heartbeat answer
+        """
+        self._heartbeat = heartbeat
+        self.interval = interval
+        self.max_missed = max_missed
+        self._on_restart = on_restart
+        self._on_beat = on_beat
+        self._clock = clock or time.time
+
+        self.alive = True  # the client has just discovered the node
+        self.busy = False  # the last heartbeat was answered late
+        self.boot_id = None
+        self.missed = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='pyros_liveness')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def check(self):
+        """One heartbeat, from the monitor thread."""
+        timeout = self.interval * self.max_missed
+        start = self._clock()
+        try:
+            beat = self._heartbeat(timeout)
+        except Exception:
+            waited = self._clock() - start
+            self.missed = self.max_missed if waited >= timeout else self.missed + 1
+            if self.alive and self.missed >= self.max_missed:
+                _logger.warning("pyros node missed {0} heartbeats, considering it down".format(self.missed))
+                self.alive = False
+            return
+        self.busy = self._clock() - start > self.interval
+
+        boot_id = beat.get('boot_id') if beat else None
+        restarted = self.boot_id is not None and boot_id is not None and boot_id != self.boot_id
+        if restarted and self._on_restart is not None:
+            try:
+                self._on_restart()
+            except Exception:
+                _logger.warning("pyros node is back, but reconnecting failed", exc_info=True)
+                self.alive = False
+                return
+            _logger.warning("pyros node restarted, reconnected")
+        elif not self.alive:
+            _logger.warning("pyros node is back")
+
+        self.boot_id = boot_id
+        self.missed = 0
+        self.alive = True
+        if self._on_beat is not None:
+            self._on_beat(beat)
@@ -0,0 +1,223 @@
+from __future__ import absolute_import
+
+import itertools
+import os
+import zlib
+
+import six
+
+from pyros.protocol.params import in_tree
+
+from .async_setup import SetupHandle
+from .client import PyrosClient
+
+"""
+Client to several pyros nodes, each exposing a disjoint slice of the system.
+Spreading topics, services and params over several node processes spreads the node work over several cores.
+"""
+
+
+class ShardedPyrosClient(object):
+    """
+    Routes each topic, service and param to one of several nodes, by name :
+     - the longest matching prefix rule decides, if any matches. Prefixes match whole path segments :
+       '/arm' matches '/arm' and '/arm/joint_states', not '/armband'.
+     - otherwise a stable hash of the name decides.
+    The same routing is used by setup(), so every name is exposed on the node that will be asked for it.
+    """
+
+    def __init__(self, node_names, rules=None, client_factory=PyrosClient, **client_kwargs):
+        """
+        :param node_names: the names of the nodes to spread the work on
+        :param rules: optional list of (name_prefix, node_name) routing rules
+        :param client_factory: the function creating a client for one node (for tests)
+        :param client_kwargs: passed to each node client, like service_cache or numpy_arrays.
+                              A capture path gets the node name added, each node client records to its own file.
+        """
+        if not node_names:
+            raise ValueError("ShardedPyrosClient requires at least one node name")
+        self.node_names = list(node_names)
+        self.rules = sorted(rules or [], key=lambda r: len(r[0]), reverse=True)  # longest prefix first
+        for _, node_name in self.rules:
+            if node_name not in self.node_names:
+                raise ValueError("Routing rule to unknown node {0}".format(node_name))
+        self.clients = dict((n, client_factory(n, **self._client_kwargs(n, client_kwargs))) for n in self.node_names)
+        self._routes = {}
+        self._watches = {}  # {watch_id: [(node_name, node_watch_id)]}
+        self._watch_ids = itertools.count()
+
+    @staticmethod
+    def _client_kwargs(node_name, client_kwargs):
+        capture = client_kwargs.get('capture')
+        if not isinstance(capture, six.string_types):
+            return client_kwargs
+        root, ext = os.path.splitext(capture)
+        return dict(client_kwargs, capture='{0}.{1}{2}'.format(root, node_name, ext))
+
+    def route(self, name):
+        """
+        :return: the name of the node responsible for this topic, service or param name
+        """
+        try:
+            return self._routes[name]
+        except KeyError:
+            pass
+        for prefix, node_name in self.rules:
+            if in_tree(name, prefix):
+                break
+        else:
+            # crc32 is stable between processes and python versions, unlike hash()
+            key = name.encode('utf-8') if isinstance(name, six.text_type) else name
+            node_name = self.node_names[(zlib.crc32(key) & 0xffffffff) % len(self.node_names)]
+        self._routes[name] = node_name
+        return node_name
+
+    def client_for(self, name):
+        return self.clients[self.route(name)]
+
+    def buildMsg(self, connection_name, suffix=None):
+        return self.client_for(connection_name).buildMsg(connection_name, suffix)
+
+    def topic_inject(self, topic_name, _msg_content=None, **kwargs):
+        return self.client_for(topic_name).topic_inject(topic_name, _msg_content, **kwargs)
+
+    def topic_extract(self, topic_name, fields=None, where=None):
+        return self.client_for(topic_name).topic_extract(topic_name, fields, where)
+
+    def topic_extract_array(self, topic_name, fields, n=1):
+        return self.client_for(topic_name).topic_extract_array(topic_name, fields, n)
+
+    def service_call(self, service_name, _msg_content=None, _fields=None, **kwargs):
+        return self.client_for(service_name).service_call(service_name, _msg_content, _fields, **kwargs)
+
+    def service_invalidate(self, service_name=None, _msg_content=None, **kwargs):
+        clients = self.clients.values() if service_name is None else [self.client_for(service_name)]
+        for client in clients:
+            client.service_invalidate(service_name, _msg_content, **kwargs)
+
+    def param_set(self, param_name, _value=None, **kwargs):
+        return self.client_for(param_name).param_set(param_name, _value, **kwargs)
+
+    def param_get(self, param_name):
+        return self.client_for(param_name).param_get(param_name)
+
+    def param_get_many(self, param_names):
+        slices = self._split(param_names)
+        return self._aggregate(
+            self.clients[n].param_get_many(slices[n]) for n in self.node_names if slices[n]
+        ) or {}
+
+    def param_get_tree(self, prefix):
+        return self._aggregate(self.clients[n].param_get_tree(prefix) for n in self.node_names) or {}
+
+    def param_set_many(self, values):
+        """
+        Atomic on each node, but not across nodes : a failure on one node does not restore params on the others.
+        """
+        slices = self._split(values)
+        return all([
+            self.clients[n].param_set_many(dict((name, values[name]) for name in slices[n]))
+            for n in self.node_names if slices[n]
+        ])
+
+    def param_watch(self, name_or_prefix, callback):
+        """
+        Watches a param, or a param subtree, on every node : a subtree can be spread over several nodes.
+        :return: the watch id, to pass to param_unwatch
+        """
+        node_watches = []
+        try:
+            for node_name in self.node_names:
+                node_watches.append((node_name, self.clients[node_name].param_watch(name_or_prefix, callback)))
+        except Exception:
+            for node_name, node_watch_id in node_watches:
+                self.clients[node_name].param_unwatch(node_watch_id)
+            raise
+        watch_id = next(self._watch_ids)
+        self._watches[watch_id] = node_watches
+        return watch_id
+
+    def param_unwatch(self, watch_id):
+        try:
+            node_watches = self._watches.pop(watch_id)
+        except KeyError:
+            raise KeyError("Unknown param watch id {0}".format(watch_id))
+        for node_name, node_watch_id in node_watches:
+            self.clients[node_name].param_unwatch(node_watch_id)
+
+    def close(self):
+        """Stops the background activity of all node clients."""
+        for client in self.clients.values():
+            client.close()
+
+    def topic(self, topic_name):
+        return self.client_for(topic_name).topic(topic_name)
+
+    def service(self, service_name):
+        return self.client_for(service_name).service(service_name)
+
+    def param(self, param_name):
+        return self.client_for(param_name).param(param_name)
+
+    def _aggregate(self, results):
+        merged = None
+        for res in results:
+            if res is None:
+                continue
+            if isinstance(res, dict):
+                merged = merged or {}
+                merged.update(res)
+            else:
+                merged = (merged or []) + list(res)
+        return merged
+
+    def topics(self):
+        return self._aggregate(self.clients[n].topics() for n in self.node_names)
+
+    def services(self):
+        return self._aggregate(self.clients[n].services() for n in self.node_names)
+
+    def params(self):
+        return self._aggregate(self.clients[n].params() for n in self.node_names)
+
+    def _split(self, names):
+        slices = dict((n, []) for n in self.node_names)
+        for name in names or []:
+            slices[self.route(name)].append(name)
+        return slices
+
+    def setup(self, publishers=None, subscribers=None, services=None, params=None, subscriber_policies=None):
+        """
+        Exposes on each node only the slice of interfaces routed to it.
+        :return: the aggregated setup results of all nodes
+        """
+        slices = dict(
+            (kind, self._split(names)) for kind, names in
+            (('publishers', publishers), ('subscribers', subscribers), ('services', services), ('params', params))
+        )
+        results = []
+        for node_name in self.node_names:
+            policies = None
+            if subscriber_policies:
+                policies = dict(
+                    (name, policy) for name, policy in six.iteritems(subscriber_policies)
+                    if self.route(name) == node_name
+                )
+            results.append(self.clients[node_name].setup(
+                publishers=slices['publishers'][node_name] if publishers is not None else None,
+                subscribers=slices['subscribers'][node_name] if subscribers is not None else None,
+                services=slices['services'][node_name] if services is not None else None,
+                params=slices['params'][node_name] if params is not None else None,
+                subscriber_policies=policies,
+            ))
+        return self._aggregate(results)
+
+    def setup_async(self, publishers=None, subscribers=None, services=None, params=None, subscriber_policies=None,
+                    batch_size=16):
+        """
+        Exposes interfaces, batch_size at a time, from a background thread. Each batch goes to all nodes.
+        :return: a SetupHandle. See pyros.client.async_setup.
+        """
+        return SetupHandle(
+            self.setup, publishers, subscribers, services, params, subscriber_policies, batch_size
+        ).start()
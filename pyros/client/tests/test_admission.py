@@ -0,0 +1,64 @@
+from __future__ import absolute_import
+
+import threading
+import time
+import unittest
+
+from pyros.client.admission import AdmissionController
+
+
+class TestAdmissionController(unittest.TestCase):
+    def test_unlimited(self):
+        admission = AdmissionController()
+        assert all(admission.acquire('topic') for _ in range(100))
+
+    def test_fail_fast(self):
+        admission = AdmissionController({'topic': 2})
+        assert admission.acquire('topic')
+        assert admission.acquire('topic')
+        assert not admission.acquire('topic')
+        admission.release('topic')
+        assert admission.acquire('topic')
+        assert admission.stats()['topic'] == {'in_flight': 2, 'limit': 2, 'rejected': 1}
+
+    def test_queue_with_deadline(self):
+        admission = AdmissionController({'service': 1}, mode='queue', queue_timeout=0.05)
+        assert admission.acquire('service')
+        start = time.time()
+        assert not admission.acquire('service')  # waits for the deadline, then refuses
+        assert time.time() - start >= 0.04
+
+        releaser = threading.Timer(0.01, admission.release, args=('service',))
+        releaser.start()
+        admission.queue_timeout = 1.0
+        assert admission.acquire('service')  # gets the slot as soon as it is released
+        releaser.join()
+
+    def test_queue_on_several_endpoints(self):
+        admission = AdmissionController({'topic': 1, 'service': 1}, mode='queue', queue_timeout=2.0)
+        assert admission.acquire('topic')
+        assert admission.acquire('service')
+        waited = {}
+
+        def wait(endpoint):
+            start = time.time()
+            assert admission.acquire(endpoint)
+            waited[endpoint] = time.time() - start
+        waiters = [threading.Thread(target=wait, args=(endpoint,)) for endpoint in ('service', 'topic')]
+        for waiter in waiters:
+            waiter.start()
+        time.sleep(0.05)
+        admission.release('topic')  # the 'service' waiter must not take the only wakeup
+        waiters[1].join(1.0)
+        assert not waiters[1].is_alive()
+        assert waited['topic'] < 1.0
+        admission.release('service')
+        waiters[0].join(1.0)
+        assert not waiters[0].is_alive()
+
+    def test_node_queue_shedding(self):
+        admission = AdmissionController(max_node_queue=4)
+        admission.update_node_queue(10)
+        assert not admission.acquire('topic')
+        admission.update_node_queue(2)
+        assert admission.acquire('topic')
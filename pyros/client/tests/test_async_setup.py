@@ -0,0 +1,126 @@
+from __future__ import absolute_import
+
+import threading
+import time
+import unittest
+
+from pyros.client.async_setup import SetupHandle
+
+
+class FakeNode(object):
+    """Records setup calls. Each call blocks until released, when gated."""
+    def __init__(self, gated=False, fail_on=None):
+        self.calls = []
+        self.gate = threading.Semaphore(0) if gated else None
+        self.fail_on = fail_on
+
+    def setup(self, **kwargs):
+        if self.gate is not None:
+            self.gate.acquire()
+        self.calls.append(kwargs)
+        if self.fail_on is not None and self.fail_on in (kwargs['publishers'] or []):
+            raise RuntimeError("cannot expose {0}".format(self.fail_on))
+        return len(self.calls)
+
+
+class TestSetupHandle(unittest.TestCase):
+
+    def test_cumulative_batches(self):
+        node = FakeNode()
+        handle = SetupHandle(node.setup, publishers=['/p{0}'.format(i) for i in range(5)], services=['/s'],
+                             batch_size=2).start()
+        assert handle.wait(timeout=1)
+        assert handle.done
+        assert [call['publishers'] for call in node.calls] == [
+            ['/p0', '/p1'], ['/p0', '/p1', '/p2', '/p3'], ['/p0', '/p1', '/p2', '/p3', '/p4'],
+        ]
+        assert node.calls[-1]['services'] == ['/s']
+        assert node.calls[0]['services'] == []
+        assert node.calls[0]['subscribers'] is None  # not requested : unchanged on the node
+        assert handle.result == 3
+        assert handle.progress() == (6, 6)
+
+    def test_nothing_to_expose(self):
+        node = FakeNode()
+        assert SetupHandle(node.setup, publishers=[]).start().wait(timeout=1)
+        assert node.calls == [{'publishers': [], 'subscribers': None, 'services': None, 'params': None,
+                               'subscriber_policies': None}]
+
+    def test_readiness(self):
+        node = FakeNode(gated=True)
+        handle = SetupHandle(node.setup, subscribers=['/a', '/b', '/c'], batch_size=1).start()
+        assert not handle.ready('/a')
+        assert not handle.wait(['/a'], timeout=0.05)
+        node.gate.release()
+        assert handle.wait(['/a'], timeout=1)
+        assert handle.ready('/a')
+        assert not handle.ready('/c')
+        assert not handle.ready('/unknown')
+        assert handle.progress() == (1, 3)
+        node.gate.release()
+        node.gate.release()
+        assert handle.wait(timeout=1)
+
+    def test_waited_names_first(self):
+        node = FakeNode(gated=True)
+        handle = SetupHandle(node.setup, publishers=['/a', '/b', '/c', '/d'], batch_size=1).start()
+        while len(handle._pending) == 4:
+            time.sleep(0.001)  # until the thread took '/a'
+        waiter = threading.Thread(target=handle.wait, args=(['/d'],))
+        waiter.start()
+        while handle._pending[0][1] != '/d':
+            time.sleep(0.001)  # until the waiter moved '/d' first
+        node.gate.release()
+        node.gate.release()
+        waiter.join(1)
+        assert not waiter.is_alive()
+        assert node.calls[1]['publishers'] == ['/a', '/d']
+        for _ in range(2):
+            node.gate.release()
+        assert handle.wait(timeout=1)
+
+    def test_same_name_several_kinds(self):
+        node = FakeNode(gated=True)
+        handle = SetupHandle(node.setup, publishers=['/t'], subscribers=['/t'], batch_size=1).start()
+        node.gate.release()
+        assert not handle.wait(['/t'], timeout=0.05)  # exposed as publisher only
+        node.gate.release()
+        assert handle.wait(['/t'], timeout=1)
+
+    def test_subscriber_policies(self):
+        node = FakeNode()
+        policies = {'/a': {'rate': 10}, '/b': {'rate': 1}}
+        SetupHandle(node.setup, subscribers=['/a', '/b'], subscriber_policies=policies, batch_size=1).start().wait()
+        assert node.calls[0]['subscriber_policies'] == {'/a': {'rate': 10}}
+        assert node.calls[1]['subscriber_policies'] == policies
+
+    def test_failure(self):
+        node = FakeNode(fail_on='/c')
+        handle = SetupHandle(node.setup, publishers=['/a', '/b', '/c', '/d'], batch_size=1).start()
+        with self.assertRaises(RuntimeError):
+            handle.wait()
+        assert isinstance(handle.error, RuntimeError)
+        assert handle.ready('/b')
+        assert not handle.ready('/c')
+        assert len(node.calls) == 3
+
+    def test_unknown_name(self):
+        handle = SetupHandle(FakeNode().setup, publishers=['/a']).start()
+        with self.assertRaises(ValueError):
+            handle.wait(['/unknown'])
+
+    def test_cancel(self):
+        node = FakeNode(gated=True)
+        handle = SetupHandle(node.setup, publishers=['/a', '/b', '/c'], batch_size=1).start()
+        handle.cancel()
+        node.gate.release()
+        assert not handle.wait(timeout=1)
+        assert handle.done
+        assert handle.ready('/a')
+        assert not handle.wait(['/c'], timeout=1)
+        assert len(node.calls) == 1
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
@@ -0,0 +1,64 @@
+from __future__ import absolute_import
+
+import random
+import unittest
+
+from pyros.client.balancer import make_policy, ProviderPolicy, RoundRobin, LeastOutstanding, LatencyWeighted
+from pyros.testing import FakeClock
+
+
+class TestProviderPolicies(unittest.TestCase):
+    providers = ['node_a', 'node_b', 'node_c']
+
+    def test_make_policy(self):
+        assert isinstance(make_policy('round_robin'), RoundRobin)
+        policy = LeastOutstanding()
+        assert make_policy(policy) is policy
+        with self.assertRaises(ValueError):
+            make_policy('unknown')
+
+    def test_first(self):
+        assert ProviderPolicy().order(self.providers) == self.providers
+
+    def test_round_robin(self):
+        policy = RoundRobin()
+        firsts = [policy.order(self.providers)[0] for _ in range(6)]
+        assert firsts == self.providers * 2
+        assert sorted(policy.order(self.providers)) == self.providers  # all providers are failovers
+
+    def test_least_outstanding(self):
+        policy = LeastOutstanding()
+        policy.started('node_a')
+        policy.started('node_a')
+        policy.started('node_b')
+        assert policy.order(self.providers) == ['node_c', 'node_b', 'node_a']
+        policy.finished('node_c', 5.0, ok=False)  # timed out
+        assert policy.order(self.providers)[-1] == 'node_c'
+
+    def test_latency_weighted(self):
+        policy = LatencyWeighted(rng=random.Random(42))
+        for p, latency in [('node_a', 0.001), ('node_b', 0.1), ('node_c', 0.1)]:
+            policy.started(p)
+            policy.finished(p, latency)
+        firsts = [policy.order(self.providers)[0] for _ in range(1000)]
+        assert firsts.count('node_a') > 900
+        assert 'node_b' in firsts or 'node_c' in firsts  # slow providers still get some load
+        policy.finished('node_a', 5.0, ok=False)
+        assert policy.order(self.providers)[-1] == 'node_a'
+
+    def test_failure_cooldown(self):
+        clock = FakeClock()
+        for policy in (LeastOutstanding(failure_cooldown=5.0, clock=clock),
+                       LatencyWeighted(rng=random.Random(42), failure_cooldown=5.0, clock=clock)):
+            for p in self.providers:
+                policy.started(p)
+                policy.finished(p, 0.01)
+            policy.started('node_b')  # the others are busier
+            policy.started('node_c')
+            policy.finished('node_a', 5.0, ok=False)  # a transient timeout
+            assert policy.order(self.providers)[-1] == 'node_a'
+            clock.now += 5.0
+            assert 'node_a' in [policy.order(self.providers)[0] for _ in range(100)]  # tried first again
+            policy.started('node_a')
+            policy.finished('node_a', 0.01)
+            assert policy.failures['node_a'] == 0
@@ -0,0 +1,62 @@
+from __future__ import absolute_import
+
+import unittest
+
+from pyros.client.cache import ServiceCache, canonicalize
+from pyros.testing import FakeClock
+
+
+class TestServiceCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.cache = ServiceCache({
+            'cached_service': {'ttl': 10, 'max_entries': 2},
+            'eternal_service': {'ttl': None},
+        }, clock=self.clock)
+
+    def test_canonicalize_ignores_dict_order(self):
+        assert canonicalize({'a': 1, 'b': {'c': [1, 2]}}) == canonicalize({'b': {'c': [1, 2]}, 'a': 1})
+
+    def test_not_configured_is_not_cached(self):
+        self.cache.put('random_service', {}, 'response')
+        assert self.cache.get('random_service', {}) == (False, None)
+
+    def test_hit(self):
+        self.cache.put('cached_service', {'data': 'data_string'}, {'answer': 42})
+        assert self.cache.get('cached_service', {'data': 'data_string'}) == (True, {'answer': 42})
+        assert self.cache.get('cached_service', {'data': 'other_string'}) == (False, None)
+
+    def test_hit_returns_copy(self):
+        self.cache.put('cached_service', {}, {'answer': [42]})
+        _, res = self.cache.get('cached_service', {})
+        res['answer'].append(43)
+        assert self.cache.get('cached_service', {}) == (True, {'answer': [42]})
+
+    def test_ttl(self):
+        self.cache.put('cached_service', {}, 'response')
+        self.cache.put('eternal_service', {}, 'response')
+        self.clock.now = 11
+        assert self.cache.get('cached_service', {}) == (False, None)
+        assert self.cache.get('eternal_service', {}) == (True, 'response')
+
+    def test_lru_eviction(self):
+        self.cache.put('cached_service', 'first', 1)
+        self.cache.put('cached_service', 'second', 2)
+        self.cache.get('cached_service', 'first')  # first is now the most recently used
+        self.cache.put('cached_service', 'third', 3)
+        assert self.cache.get('cached_service', 'first') == (True, 1)
+        assert self.cache.get('cached_service', 'second') == (False, None)
+        assert self.cache.get('cached_service', 'third') == (True, 3)
+
+    def test_invalidate(self):
+        self.cache.put('cached_service', 'first', 1)
+        self.cache.put('cached_service', 'second', 2)
+        self.cache.put('eternal_service', 'first', 1)
+        self.cache.invalidate('cached_service', 'first')
+        assert self.cache.get('cached_service', 'first') == (False, None)
+        assert self.cache.get('cached_service', 'second') == (True, 2)
+        self.cache.invalidate('cached_service')
+        assert self.cache.get('cached_service', 'second') == (False, None)
+        assert self.cache.get('eternal_service', 'first') == (True, 1)
+        self.cache.invalidate()
+        assert self.cache.get('eternal_service', 'first') == (False, None)
@@ -0,0 +1,102 @@
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from pyros.client.capture import TrafficRecorder, read_capture
+from pyros.replay import replay
+
+
+class FakeService(object):
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeClient(object):
+    """Just enough of PyrosClient for replay."""
+    def __init__(self):
+        self.topic_svc = FakeService('topic')
+        self.param_svc = FakeService('param')
+        self.calls = []
+
+    def _call(self, svc, args=None, kwargs=None, **call_kwargs):
+        self.calls.append((svc.name, args, kwargs, call_kwargs))
+        if svc.name == 'param':
+            raise KeyError(args[0])
+
+
+class TestCapture(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'traffic.pyros')
+        self.now = [100.0]
+        self.recorder = TrafficRecorder(self.path, clock=lambda: self.now[0])
+
+    def tearDown(self):
+        self.recorder.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_record_and_read(self):
+        self.now[0] = 101.0
+        self.recorder.record('topic', ('/chatter', {'data': 'hello'}), None, 100.5, 0.25, response=[{'data': 'hi'}])
+        self.recorder.record('param', ('/p', None), None, 101.0, 0.125, error=KeyError('/p'))
+        self.recorder.record('topics', None, None, 101.0, 0.5, call_kwargs={'send_timeout': 5000})
+        self.recorder.record('topic', ('/raw', object()), None, 101.0, 0.1, response=object())
+        self.recorder.close()
+        self.recorder.record('topic', ('/late', None), None, 102.0, 0.1)  # after close : dropped
+
+        records = list(read_capture(self.path))
+        self.assertEqual(len(records), 4)
+        self.assertEqual(records[0]['start'], 0.5)
+        self.assertEqual(records[0]['endpoint'], 'topic')
+        self.assertEqual(records[0]['name'], '/chatter')
+        self.assertEqual(records[0]['args'], ('/chatter', {'data': 'hello'}))
+        self.assertEqual(records[0]['duration'], 0.25)
+        self.assertEqual(records[0]['thread'], threading.current_thread().ident)
+        self.assertGreater(records[0]['request_size'], 0)
+        self.assertGreater(records[0]['response_size'], 0)
+        self.assertNotIn('response', records[0])  # only measured
+        self.assertIsNone(records[0]['error'])
+        self.assertEqual(records[1]['error'], 'KeyError')
+        self.assertEqual(records[2]['call_kwargs'], {'send_timeout': 5000})
+        self.assertIsNone(records[2]['args'])
+        self.assertEqual(records[2]['request_size'], len('[null,null]'))
+        # payloads JSON cannot encode are measured as unknown, and the request is not captured
+        self.assertEqual(records[3]['name'], '/raw')
+        self.assertIsNone(records[3]['args'])
+        self.assertIsNone(records[3]['request_size'])
+        self.assertIsNone(records[3]['response_size'])
+
+    def test_replay(self):
+        self.recorder.record('topic', ('/chatter', {'data': 'hello'}), None, 100.0, 0.5)
+        self.recorder.record('topic', ('/chatter', None), {'lazy': True}, 100.1, 0.5)
+        self.recorder.record('param', ('/p', None), None, 100.2, 0.5)
+        self.recorder.record('unknown', (), None, 100.3, 0.5)
+        self.recorder.record('topic', None, None, 100.4, 0.5, call_kwargs={'send_timeout': 5000, 'recv_timeout': 10000})
+        self.recorder.record('topic', ('/raw', object()), None, 100.5, 0.5)
+        self.recorder.close()
+
+        client = FakeClient()
+        report = replay(client, list(read_capture(self.path)), speed=0)
+        self.assertEqual(client.calls, [
+            ('topic', ('/chatter', {'data': 'hello'}), None, {}),
+            ('topic', ('/chatter', None), {'lazy': True}, {}),
+            ('param', ('/p', None), None, {}),
+            ('topic', None, None, {'send_timeout': 5000, 'recv_timeout': 10000}),
+        ])
+        self.assertEqual(report['requests'], 6)
+        self.assertEqual(report['threads'], 1)
+        topic = report['endpoints']['topic']
+        self.assertEqual(topic['errors'], 1)  # the request that was not captured
+        self.assertEqual(topic['p50']['captured'], 0.5)
+        self.assertLess(topic['p50']['delta'], 0)  # the fake client is faster than the capture
+        self.assertEqual(report['endpoints']['param']['new_errors'], 1)
+        self.assertEqual(report['endpoints']['unknown']['errors'], 1)
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
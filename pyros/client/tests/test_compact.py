@@ -0,0 +1,61 @@
+from __future__ import absolute_import
+
+import unittest
+
+from pyros.client.compact import CompactMessage, CompactMessageFactory, make_message_class
+
+
+class TestCompactMessage(unittest.TestCase):
+    def setUp(self):
+        self.skeleton = {
+            'header': {'seq': 0, 'frame_id': ''},
+            'name': [],
+            'position': [],
+        }
+        self.msg = {
+            'header': {'seq': 42, 'frame_id': 'base_link'},
+            'name': ['joint_1', 'joint_2'],
+            'position': [0.1, 0.2],
+        }
+        self.factory = CompactMessageFactory()
+        self.factory.register('/joint_states', self.skeleton)
+
+    def test_make_message_class(self):
+        cls = make_message_class('/joint_states', self.skeleton)
+        assert cls.__name__ == 'joint_states'
+        assert cls.__slots__ == ('header', 'name', 'position')
+        msg = cls.from_dict(self.msg)
+        assert not hasattr(msg, '__dict__')
+        assert msg.header.seq == 42
+        assert msg.position == [0.1, 0.2]
+
+    def test_class_cached_per_type(self):
+        first = self.factory.convert('/joint_states', self.msg)
+        second = self.factory.convert('/joint_states', self.msg)
+        assert type(first) is type(second)
+        assert type(first.header) is type(second.header)
+
+    def test_class_shared_by_connections_of_a_type(self):
+        self.factory.register('/arm/joint_states', {'position': [], 'name': [], 'header': {'frame_id': '', 'seq': 0}})
+        self.factory.register('/odom', {'header': {'seq': 0, 'frame_id': ''}, 'pose': {}})
+        joint_states = self.factory.convert('/joint_states', self.msg)
+        assert type(self.factory.convert('/arm/joint_states', self.msg)) is type(joint_states)
+        assert self.factory.convert('/odom', {'header': {'seq': 1, 'frame_id': ''}, 'pose': {}}).pose == {}
+        assert type(self.factory.convert('/odom', self.msg)) is dict  # another type
+
+    def test_roundtrip(self):
+        msg = self.factory.convert('/joint_states', self.msg)
+        assert isinstance(msg, CompactMessage)
+        assert msg.to_dict() == self.msg
+        assert msg == self.msg
+
+    def test_dicts_in_lists(self):
+        self.factory.register('/markers', {'markers': []})
+        msg = self.factory.convert('/markers', {'markers': [{'id': 1}, {'id': 2}]})
+        assert [m.id for m in msg.markers] == [1, 2]
+        assert type(msg.markers[0]) is type(msg.markers[1])
+
+    def test_mismatch_unchanged(self):
+        assert self.factory.convert('/joint_states', {'data': 'data_string'}) == {'data': 'data_string'}
+        assert self.factory.convert('/joint_states', 'data_string') == 'data_string'
+        assert self.factory.convert('/unknown', self.msg) is self.msg
@@ -0,0 +1,67 @@
+from __future__ import absolute_import
+
+import unittest
+
+from pyros.client.handles import TopicHandle, ParamHandle
+
+
+class FakeClient(object):
+    """Resolves names like a node : ids are issued in order, and forgotten on restart."""
+    def __init__(self):
+        self.resolve_epoch = 0
+        self.ids = {}
+        self.injected = []
+
+    def restart(self, names=()):
+        self.ids = dict((name, i) for i, name in enumerate(names))
+
+    def _forget_resolved(self):
+        self.resolve_epoch += 1
+
+    def _resolve(self, kind, name):
+        return name, self.ids.setdefault(name, len(self.ids))
+
+    def lookup(self, key):
+        for name, i in self.ids.items():
+            if i == key:
+                return name
+        raise KeyError("Unknown interface id {0}".format(key))
+
+    def _topic_inject(self, key, content):
+        self.injected.append((self.lookup(key), content))
+        return True
+
+    def _param_get(self, key):
+        return self.lookup(key)
+
+
+class TestHandles(unittest.TestCase):
+    def setUp(self):
+        self.client = FakeClient()
+
+    def test_resolved_once(self):
+        handle = TopicHandle(self.client, '/chatter')
+        assert handle.key == 0
+        assert handle.inject(data='data_string')
+        assert self.client.injected == [('/chatter', {'data': 'data_string'})]
+
+    def test_resolved_again_after_rediscovery(self):
+        chatter = TopicHandle(self.client, '/chatter')
+        TopicHandle(self.client, '/other')
+        self.client.restart(['/other', '/chatter'])  # same ids, for other topics
+        self.client._forget_resolved()
+        assert chatter.inject(data='data_string')
+        assert self.client.injected == [('/chatter', {'data': 'data_string'})]
+
+    def test_resolved_again_on_unknown_id(self):
+        param = ParamHandle(self.client, '/param')
+        other = ParamHandle(self.client, '/other')
+        self.client.restart()  # without the client noticing
+        assert other.get() == '/other'
+        assert other.key == 0
+        assert param.key == 1  # resolved again too
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
@@ -0,0 +1,108 @@
+from __future__ import absolute_import
+
+import unittest
+
+from pyros.client.liveness import LivenessMonitor
+from pyros.testing import FakeClock
+
+
+class FakeNode(object):
+    def __init__(self, clock):
+        self.clock = clock
+        self.up = True
+        self.boot_id = 'first_boot'
+        self.delay = 0.0  # time to answer
+
+    def heartbeat(self, timeout):
+        if not self.up:
+            raise RuntimeError("no answer")
+        if self.delay >= timeout:
+            self.clock.now += timeout
+            raise RuntimeError("timed out")
+        self.clock.now += self.delay
+        return {'boot_id': self.boot_id, 'queue_depth': 3}
+
+
+class TestLivenessMonitor(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.node = FakeNode(self.clock)
+        self.restarts = []
+        self.beats = []
+        self.monitor = LivenessMonitor(
+            self.node.heartbeat, interval=0.01, max_missed=2,
+            on_restart=lambda: self.restarts.append(True), on_beat=self.beats.append, clock=self.clock,
+        )
+
+    def test_alive(self):
+        self.monitor.check()
+        assert self.monitor.alive
+        assert self.beats == [{'boot_id': 'first_boot', 'queue_depth': 3}]
+        assert not self.restarts
+
+    def test_down_after_max_missed(self):
+        self.monitor.check()
+        self.node.up = False
+        self.monitor.check()
+        assert self.monitor.alive  # one miss is tolerated
+        self.monitor.check()
+        assert not self.monitor.alive
+
+    def test_back_without_restart(self):
+        self.monitor.check()
+        self.node.up = False
+        self.monitor.check()
+        self.monitor.check()
+        self.node.up = True
+        self.monitor.check()
+        assert self.monitor.alive
+        assert not self.restarts  # same boot : the node kept its state
+
+    def test_reconnect_when_back_restarted(self):
+        self.monitor.check()
+        self.node.up = False
+        self.monitor.check()
+        self.monitor.check()
+        self.node.up = True
+        self.node.boot_id = 'second_boot'
+        self.monitor.check()
+        assert self.monitor.alive
+        assert self.restarts == [True]
+
+    def test_late_answer_is_busy(self):
+        self.monitor.check()
+        self.node.delay = 0.015  # later than the interval, within max_missed intervals
+        self.monitor.check()
+        self.monitor.check()
+        assert self.monitor.alive
+        assert self.monitor.busy
+        self.node.delay = 0.0
+        self.monitor.check()
+        assert not self.monitor.busy
+
+    def test_no_answer_within_max_missed_intervals(self):
+        self.monitor.check()
+        self.node.delay = 1.0
+        self.monitor.check()
+        assert not self.monitor.alive  # waited for max_missed intervals already
+
+    def test_restart_between_heartbeats(self):
+        self.monitor.check()
+        self.node.boot_id = 'second_boot'
+        self.monitor.check()
+        assert self.monitor.alive
+        assert self.restarts == [True]
+
+    def test_reconnect_failure(self):
+        def failing_restart():
+            raise RuntimeError("services not there yet")
+        self.monitor._on_restart = failing_restart
+        self.monitor.check()
+        self.node.boot_id = 'second_boot'
+        self.monitor.check()
+        assert not self.monitor.alive
+
+    def test_thread(self):
+        self.monitor.start()
+        self.monitor.stop()
+        assert not self.monitor._thread.is_alive()
@@ -0,0 +1,124 @@
+from __future__ import absolute_import
+
+import unittest
+
+from pyros.client.sharded import ShardedPyrosClient
+
+
+class RecordingClient(object):
+    """Stands for a PyrosClient connected to one node, remembering what it has been asked."""
+    def __init__(self, node_name, capture=None):
+        self.node_name = node_name
+        self.capture = capture
+        self.setups = []
+        self.extracted = []
+        self.watches = {}
+        self.closed = False
+
+    def topic_extract(self, topic_name, fields=None, where=None):
+        self.extracted.append(topic_name)
+        return self.node_name
+
+    def topics(self):
+        return dict((t, self.node_name) for s in self.setups for t in s['subscribers'] or [])
+
+    def setup(self, **kwargs):
+        self.setups.append(kwargs)
+        return None
+
+    def param_get_many(self, param_names):
+        return dict((name, self.node_name) for name in param_names)
+
+    def param_set_many(self, values):
+        self.setups.append({'values': values})
+        return True
+
+    def param_watch(self, name_or_prefix, callback):
+        watch_id = len(self.watches)
+        self.watches[watch_id] = name_or_prefix
+        return watch_id
+
+    def param_unwatch(self, watch_id):
+        del self.watches[watch_id]
+
+    def close(self):
+        self.closed = True
+
+
+class TestShardedPyrosClient(unittest.TestCase):
+    def setUp(self):
+        self.client = ShardedPyrosClient(
+            ['arm_node', 'base_node', 'sensor_node'],
+            rules=[('/arm', 'arm_node'), ('/arm/gripper', 'base_node')],
+            client_factory=RecordingClient,
+        )
+
+    def test_prefix_rules(self):
+        assert self.client.route('/arm/joint_states') == 'arm_node'
+        assert self.client.route('/arm/gripper/state') == 'base_node'  # longest prefix wins
+        assert self.client.route('/arm') == 'arm_node'
+        assert self.client.route('/armband') == 'sensor_node'  # hashed : not a path under /arm
+
+    def test_hash_routing_is_stable(self):
+        other = ShardedPyrosClient(['arm_node', 'base_node', 'sensor_node'], client_factory=RecordingClient)
+        for name in ['/scan', '/imu', '/odom', '/camera/image']:
+            assert self.client.route(name) == other.route(name)
+            assert self.client.route(name) in self.client.node_names
+
+    def test_calls_routed(self):
+        assert self.client.topic_extract('/arm/joint_states') == 'arm_node'
+        assert self.client.clients['arm_node'].extracted == ['/arm/joint_states']
+
+    def test_setup_disjoint_slices(self):
+        subscribers = ['/arm/joint_states', '/arm/gripper/state', '/scan', '/imu', '/odom']
+        self.client.setup(subscribers=subscribers)
+        exposed = []
+        for node_name, client in self.client.clients.items():
+            assert len(client.setups) == 1
+            for name in client.setups[0]['subscribers']:
+                assert self.client.route(name) == node_name
+            exposed += client.setups[0]['subscribers']
+        assert sorted(exposed) == sorted(subscribers)
+        assert sorted(self.client.topics()) == sorted(subscribers)
+
+    def test_setup_async(self):
+        subscribers = ['/arm/joint_states', '/arm/gripper/state', '/scan', '/imu', '/odom']
+        handle = self.client.setup_async(subscribers=subscribers, batch_size=2)
+        assert handle.wait(timeout=1)
+        for node_name, client in self.client.clients.items():
+            assert len(client.setups) == 3  # one per batch
+            assert all(self.client.route(name) == node_name for name in client.setups[-1]['subscribers'])
+        assert sorted(self.client.topics()) == sorted(subscribers)
+
+    def test_params_batch_split(self):
+        names = ['/arm/length', '/arm/gripper/force', '/max_speed']
+        values = self.client.param_get_many(names)
+        assert sorted(values) == sorted(names)
+        for name, node_name in values.items():
+            assert self.client.route(name) == node_name
+
+        assert self.client.param_set_many(dict((name, 1) for name in names))
+        for node_name, client in self.client.clients.items():
+            for setup in client.setups:
+                assert all(self.client.route(name) == node_name for name in setup['values'])
+
+    def test_param_watch_on_every_node(self):
+        watch_id = self.client.param_watch('/arm', lambda *change: None)
+        assert all(client.watches == {0: '/arm'} for client in self.client.clients.values())
+        self.client.param_unwatch(watch_id)
+        assert all(client.watches == {} for client in self.client.clients.values())
+        with self.assertRaises(KeyError):
+            self.client.param_unwatch(watch_id)
+
+    def test_close(self):
+        self.client.close()
+        assert all(client.closed for client in self.client.clients.values())
+
+    def test_capture_per_node(self):
+        client = ShardedPyrosClient(['arm_node', 'base_node'], client_factory=RecordingClient, capture='traffic.gz')
+        assert client.clients['arm_node'].capture == 'traffic.arm_node.gz'
+        assert client.clients['base_node'].capture == 'traffic.base_node.gz'
+
+    def test_unknown_node_rule(self):
+        with self.assertRaises(ValueError):
+            ShardedPyrosClient(['arm_node'], rules=[('/base', 'base_node')], client_factory=RecordingClient)
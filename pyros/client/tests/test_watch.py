@@ -0,0 +1,53 @@
+from __future__ import absolute_import
+
+import time
+import unittest
+
+import zmq
+
+from pyros.client.watch import ParamWatchListener
+from pyros.protocol.params import dumps_event
+
+
+class TestParamWatchListener(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.listener = ParamWatchListener(poll_interval=0.01)
+
+    def record(self, name, old, new, source):
+        self.events.append((name, old, new, source))
+
+    def test_dispatch_to_matching_watches(self):
+        self.listener.add('/robot', self.record)
+        self.listener.add('/robot/arm/length', self.record)
+        self.listener.dispatch({'name': '/robot/arm/length', 'old': 1, 'new': 2, 'source': 'param'})
+        self.listener.dispatch({'name': '/robot2', 'old': 1, 'new': 2, 'source': 'param'})
+        assert self.events == [('/robot/arm/length', 1, 2, 'param')] * 2
+
+    def test_remove(self):
+        watch_id = self.listener.add('/robot', self.record)
+        assert self.listener.remove(watch_id) == '/robot'
+        self.listener.dispatch({'name': '/robot/speed', 'old': 1, 'new': 2, 'source': 'param'})
+        assert self.events == []
+
+    def test_receive(self):
+        publisher = zmq.Context.instance().socket(zmq.PUB)
+        port = publisher.bind_to_random_port('tcp://127.0.0.1')
+        try:
+            self.listener.start()
+            self.listener.connect('tcp://127.0.0.1:{0}'.format(port))
+            self.listener.add('/robot', self.record)
+            deadline = time.time() + 5
+            while not self.events and time.time() < deadline:  # until the subscription reaches the publisher
+                publisher.send_multipart(dumps_event('/robot2', 0, 1, 'param'))
+                publisher.send_multipart(dumps_event('/robot/speed', 1, 2, 'external'))
+                time.sleep(0.02)
+            assert self.events[0] == ('/robot/speed', 1, 2, 'external')
+        finally:
+            self.listener.stop()
+            publisher.close(linger=0)
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
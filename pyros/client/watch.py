@@ -0,0 +1,110 @@
+from __future__ import absolute_import
+
+import collections
+import itertools
+import logging
+import threading
+
+from pyros.protocol.params import in_tree, loads_event
+
+"""
+Param watches, on the client side.
+The node publishes changes of watched params on a zmq PUB socket.
+One background thread per client receives them and calls the callbacks of the matching watches.
+As always with zmq PUB/SUB, changes happening right after a watch is added, before the subscription
+reaches the node, may be missed : get the current value after watching, not before.
+"""
+
+_logger = logging.getLogger(__name__)
+
+
+def _topic(prefix):
+    return prefix.rstrip('/').encode('utf-8')
+
+
+class ParamWatchListener(object):
+    def __init__(self, poll_interval=0.1):
+        """
+        :param poll_interval: how often, in seconds, the thread checks for new watches and for stop
+        """
+        self.poll_interval = poll_interval
+        self.endpoint = None
+        self._lock = threading.Lock()
+        self._watches = {}  # {watch_id: (prefix, callback)}
+        self._ids = itertools.count(1)
+        self._pending = collections.deque()  # socket operations, applied by the thread : zmq sockets are not thread safe
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='pyros_param_watch')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def connect(self, endpoint):
+        """Connects to the node publisher. Called again, with the new endpoint, when the node restarts."""
+        if endpoint != self.endpoint:
+            if self.endpoint is not None:
+                self._pending.append(('disconnect', self.endpoint))
+            self._pending.append(('connect', endpoint))
+            self.endpoint = endpoint
+
+    def add(self, prefix, callback):
+        """
+        :return: the watch id
+        """
+        with self._lock:
+            watch_id = next(self._ids)
+            self._watches[watch_id] = (prefix, callback)
+        self._pending.append(('subscribe', prefix))
+        return watch_id
+
+    def remove(self, watch_id):
+        """
+        :return: the prefix of the removed watch
+        """
+        with self._lock:
+            if watch_id not in self._watches:
+                raise KeyError("Unknown param watch {0!r}".format(watch_id))
+            prefix, _ = self._watches.pop(watch_id)
+        self._pending.append(('unsubscribe', prefix))
+        return prefix
+
+    def prefixes(self):
+        with self._lock:
+            return [prefix for prefix, _ in self._watches.values()]
+
+    def _apply_pending(self, socket):
+        import zmq
+        while self._pending:
+            op, arg = self._pending.popleft()
+            if op in ('connect', 'disconnect'):
+                getattr(socket, op)(arg)
+            else:
+                socket.setsockopt(zmq.SUBSCRIBE if op == 'subscribe' else zmq.UNSUBSCRIBE, _topic(arg))
+
+    def dispatch(self, event):
+        """Calls the callbacks of the watches matching the event, from the listener thread."""
+        with self._lock:
+            callbacks = [cb for prefix, cb in self._watches.values() if in_tree(event['name'], prefix)]
+        for callback in callbacks:
+            try:
+                callback(event['name'], event['old'], event['new'], event['source'])
+            except Exception:
+                _logger.warning("param watch callback failed for {0}".format(event['name']), exc_info=True)
+
+    def _run(self):
+        import zmq
+        socket = zmq.Context.instance().socket(zmq.SUB)
+        try:
+            while not self._stop.is_set():
+                self._apply_pending(socket)
+                if socket.poll(int(self.poll_interval * 1000)):
+                    self.dispatch(loads_event(socket.recv_multipart()))
+        finally:
+            socket.close(linger=0)
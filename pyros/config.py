@@ -3,6 +3,14 @@
 ###
 # Settings to pass to pyros node to interface with another system
 
+# Services whose responses are memoized by the client, as they are pure functions of their request.
+# {service_name: {'ttl': seconds (None for no expiry), 'max_entries': int}}
+SERVICE_CACHE = {}
+
+# Logging through a queue, written by a background thread, in processes using pyros_ctx, and the nodes they start.
+# None to log directly, or the arguments of pyros.log.QueueLogging, like {'debug_rate': 10.0}
+LOG_QUEUE = None
+
 
 ###
 # Mock specific
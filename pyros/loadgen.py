@@ -0,0 +1,278 @@
+from __future__ import absolute_import, division
+
+import json
+import multiprocessing
+import os
+import random
+import threading
+import time
+
+import six
+
+"""
+Load generator and soak test harness for pyros nodes.
+Answers "how many clients and requests per second can one node sustain ?" :
+N clients ( threads or processes ) issue a weighted mix of requests against a node for a duration,
+and the throughput, latency percentiles, error and timeout rates, and node RSS over time are reported as JSON.
+Used by `pyros loadgen`.
+"""
+
+# operation: relative weight
+DEFAULT_MIX = {
+    'topic_inject': 2,
+    'topic_extract': 4,
+    'service_call': 2,
+    'param_get': 1,
+    'param_set': 1,
+    'topics': 0,
+    'services': 0,
+    'params': 0,
+}
+
+OPERATIONS = tuple(sorted(DEFAULT_MIX))
+
+
+def parse_mix(specs):
+    """
+    :param specs: list of 'operation=weight' strings, like ['topic_extract=4', 'service_call=1']
+    :return: a mix dict. Operations not listed get a weight of 0.
+    """
+    mix = dict((op, 0) for op in OPERATIONS)
+    for spec in specs:
+        op, _, weight = spec.partition('=')
+        if op not in mix:
+            raise ValueError("Unknown operation {0}. Valid operations are {1}".format(op, OPERATIONS))
+        mix[op] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, pct):
+    """Nearest rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = int(round(pct / 100.0 * (len(sorted_values) - 1)))
+    return sorted_values[rank]
+
+
+def node_rss(pid):
+    """
+    :return: the resident set size of a process, in bytes, or None if it cannot be read
+    """
+    try:
+        import psutil
+        return psutil.Process(pid).memory_info().rss
+    except ImportError:
+        pass
+    except Exception:
+        return None
+    try:  # linux without psutil
+        with open('/proc/{0}/status'.format(pid)) as status:
+            for line in status:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except (IOError, OSError, ValueError):
+        pass
+    return None
+
+
+class _Targets(object):
+    """The names requests are sent to, and the payload sent."""
+    def __init__(self, topics, services, params, payload_size):
+        self.topics = list(topics)
+        self.services = list(services)
+        self.params = list(params)
+        self.payload = {'data': 'x' * payload_size}
+
+
+def _operation(client, op, targets, rng):
+    if op == 'topic_inject':
+        return client.topic_inject(rng.choice(targets.topics), targets.payload)
+    elif op == 'topic_extract':
+        return client.topic_extract(rng.choice(targets.topics))
+    elif op == 'service_call':
+        return client.service_call(rng.choice(targets.services), targets.payload)
+    elif op == 'param_get':
+        return client.param_get(rng.choice(targets.params))
+    elif op == 'param_set':
+        return client.param_set(rng.choice(targets.params), targets.payload)
+    return getattr(client, op)()  # listings
+
+
+def _worker(worker_id, node_name, mix, targets, duration, results, client_factory):
+    from pyros.client.client import PyrosServiceTimeout  # not needed until workers run
+    import pyzmp
+
+    rng = random.Random(worker_id)
+    ops = [op for op in OPERATIONS if mix.get(op) and (
+        (not op.startswith('topic_') or targets.topics) and
+        (op != 'service_call' or targets.services) and
+        (not op.startswith('param_') or targets.params)
+    )]
+    weights = [mix[op] for op in ops]
+    stats = dict((op, {'latencies': [], 'errors': 0, 'timeouts': 0}) for op in ops)
+
+    client = client_factory(node_name)
+    try:
+        deadline = time.time() + duration
+        while ops and time.time() < deadline:
+            op = _weighted_choice(rng, ops, weights)
+            start = time.time()
+            try:
+                _operation(client, op, targets, rng)
+            except (PyrosServiceTimeout, pyzmp.service.ServiceCallTimeout):
+                stats[op]['timeouts'] += 1
+            except Exception:
+                stats[op]['errors'] += 1
+            else:
+                stats[op]['latencies'].append(time.time() - start)
+    finally:
+        getattr(client, 'close', lambda: None)()
+    results.put(stats)
+
+
+def _weighted_choice(rng, ops, weights):
+    pick = rng.uniform(0, sum(weights))
+    for op, w in zip(ops, weights):
+        pick -= w
+        if pick <= 0:
+            return op
+    return ops[-1]
+
+
+def _default_client_factory(node_name):
+    from pyros.client import PyrosClient
+    return PyrosClient(node_name)
+
+
+def run_load(node_name=None, clients=4, duration=10.0, mix=None, topics=None, services=None, params=None,
+             payload_size=64, processes=False, node_pid=None, sample_interval=1.0,
+             client_factory=_default_client_factory):
+    """
+    Runs a load test against a node.
+    :param node_name: the name of the node to target
+    :param clients: number of concurrent clients
+    :param duration: duration of the test, in seconds
+    :param mix: {operation: weight} dict, defaults to DEFAULT_MIX
+    :param topics: names of topics to use. Defaults to the ones listed by the node.
+    :param services: names of services to use. Defaults to the ones listed by the node.
+    :param params: names of params to use. Defaults to the ones listed by the node.
+    :param payload_size: size of injected messages, service requests and param values
+    :param processes: use one process per client, instead of one thread per client
+    :param node_pid: pid of the node, to sample its RSS. Defaults to the pid advertised by its heartbeat, if any.
+    :param sample_interval: time between node RSS samples, in seconds
+    :return: the results, as a JSON serializable dict
+    """
+    mix = mix or DEFAULT_MIX
+
+    if topics is None or services is None or params is None or node_pid is None:
+        probe = client_factory(node_name)
+        try:
+            topics = list(probe.topics() or []) if topics is None else topics
+            services = list(probe.services() or []) if services is None else services
+            params = list(probe.params() or []) if params is None else params
+            if node_pid is None:
+                node_pid = _heartbeat_pid(node_name)
+        finally:
+            getattr(probe, 'close', lambda: None)()
+    targets = _Targets(topics, services, params, payload_size)
+
+    if processes:
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(
+            target=_worker, args=(i, node_name, mix, targets, duration, results, client_factory)
+        ) for i in range(clients)]
+    else:
+        results = six.moves.queue.Queue()
+        workers = [threading.Thread(
+            target=_worker, args=(i, node_name, mix, targets, duration, results, client_factory)
+        ) for i in range(clients)]
+
+    rss = []
+    start = time.time()
+    for w in workers:
+        w.start()
+
+    worker_stats = []
+    while len(worker_stats) < len(workers):
+        if node_pid is not None:
+            rss.append({'time': round(time.time() - start, 3), 'rss': node_rss(node_pid)})
+        try:
+            worker_stats.append(results.get(timeout=sample_interval))
+        except six.moves.queue.Empty:
+            if not any(w.is_alive() for w in workers) and results.empty():
+                break  # a worker died without reporting
+    elapsed = time.time() - start
+    for w in workers:
+        w.join()
+
+    return _report(worker_stats, elapsed, clients, duration, processes, node_name, node_pid, rss)
+
+
+def _heartbeat_pid(node_name):
+    try:
+        import pyzmp
+        heartbeat_svc = pyzmp.Service.discover('heartbeat')
+        if heartbeat_svc is not None:
+            return heartbeat_svc.call(node=node_name).get('pid')
+    except Exception:
+        pass
+    return None
+
+
+def _summarize(latencies, errors, timeouts, elapsed):
+    latencies = sorted(latencies)
+    total = len(latencies) + errors + timeouts
+    return {
+        'requests': total,
+        'throughput': len(latencies) / elapsed if elapsed else None,  # successful requests per second
+        'error_rate': errors / total if total else 0.0,
+        'timeout_rate': timeouts / total if total else 0.0,
+        'latency': {
+            'mean': sum(latencies) / len(latencies) if latencies else None,
+            'p50': percentile(latencies, 50),
+            'p90': percentile(latencies, 90),
+            'p99': percentile(latencies, 99),
+            'max': latencies[-1] if latencies else None,
+        },
+    }
+
+
+def _report(worker_stats, elapsed, clients, duration, processes, node_name, node_pid, rss):
+    per_op = {}
+    for stats in worker_stats:
+        for op, s in six.iteritems(stats):
+            acc = per_op.setdefault(op, {'latencies': [], 'errors': 0, 'timeouts': 0})
+            acc['latencies'] += s['latencies']
+            acc['errors'] += s['errors']
+            acc['timeouts'] += s['timeouts']
+
+    return {
+        'node': node_name,
+        'node_pid': node_pid,
+        'clients': clients,
+        'mode': 'processes' if processes else 'threads',
+        'duration': duration,
+        'elapsed': elapsed,
+        'workers_reported': len(worker_stats),
+        'total': _summarize(
+            [l for acc in per_op.values() for l in acc['latencies']],
+            sum(acc['errors'] for acc in per_op.values()),
+            sum(acc['timeouts'] for acc in per_op.values()),
+            elapsed,
+        ),
+        'operations': dict(
+            (op, _summarize(acc['latencies'], acc['errors'], acc['timeouts'], elapsed))
+            for op, acc in six.iteritems(per_op)
+        ),
+        'node_rss': rss,
+    }
+
+
+def write_report(report, path=None):
+    """Writes the report as JSON to path, or to stdout if path is None."""
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if path is None:
+        print(text)
+    else:
+        with open(path, 'w') as report_file:
+            report_file.write(text + os.linesep)
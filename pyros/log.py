@@ -0,0 +1,249 @@
+from __future__ import absolute_import, division
+
+import logging
+import random
+import threading
+import time
+
+from six.moves import queue
+
+try:
+    from logging.handlers import QueueHandler, QueueListener
+except ImportError:  # python 2
+    QueueHandler = QueueListener = None
+
+"""
+Non blocking logging, for the node and client processes.
+With queue logging, a logging call only puts the record in a queue : a listener thread writes it,
+so the request path never waits for a console or a file. When the queue is full, records are dropped, and counted.
+
+    queued = QueueLogging(['pyros']).start()
+    ...
+    queued.stop()  # writes the records left, and puts the handlers back
+
+The queue is a multiprocessing queue by default : processes forked after start(), like the pyros node
+started by `pyros run`, log through the same listener, in the parent process.
+`pyros --log-queue` sets it up for the command line, and the LOG_QUEUE setting of the pyros config
+for the processes using pyros_ctx, with QueueLogging arguments, like {'debug_rate': 10.0}.
+
+Per-message debug events are rate limited, or sampled, by adding a filter to a logger or a handler :
+ - RateLimitFilter lets through at most rate records per second from each line of code, after a burst,
+ - SampleFilter lets through one record out of n from each line of code, or a random fraction of them.
+Records above their max_level, like warnings and errors, are never filtered out.
+"""
+
+
+if QueueHandler is None:
+    class QueueHandler(logging.Handler):
+        """The python 3 logging.handlers.QueueHandler, for python 2."""
+        def __init__(self, queue):
+            logging.Handler.__init__(self)
+            self.queue = queue
+
+        def enqueue(self, record):
+            self.queue.put_nowait(record)
+
+        def prepare(self, record):
+            # formatting here : the args and exception of a record may not be pickleable
+            self.format(record)
+            record.msg = record.message
+            record.args = None
+            record.exc_info = None
+            return record
+
+        def emit(self, record):
+            try:
+                self.enqueue(self.prepare(record))
+            except Exception:
+                self.handleError(record)
+
+    class QueueListener(object):
+        """The python 3 logging.handlers.QueueListener, for python 2."""
+        _sentinel = None
+
+        def __init__(self, queue, *handlers, **kwargs):
+            self.queue = queue
+            self.handlers = handlers
+            self.respect_handler_level = kwargs.get('respect_handler_level', False)
+            self._thread = None
+
+        def prepare(self, record):
+            return record
+
+        def handle(self, record):
+            record = self.prepare(record)
+            for handler in self.handlers:
+                if not self.respect_handler_level or record.levelno >= handler.level:
+                    handler.handle(record)
+
+        def _monitor(self):
+            while True:
+                record = self.queue.get(True)
+                if record is self._sentinel:
+                    break
+                self.handle(record)
+
+        def start(self):
+            self._thread = threading.Thread(target=self._monitor)
+            self._thread.daemon = True
+            self._thread.start()
+
+        def enqueue_sentinel(self):
+            self.queue.put_nowait(self._sentinel)
+
+        def stop(self):
+            self.enqueue_sentinel()
+            self._thread.join()
+            self._thread = None
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Never blocks : when the queue is full, records are dropped, and counted."""
+    def __init__(self, queue):
+        QueueHandler.__init__(self, queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _RoutingListener(QueueListener):
+    """Hands each record to the handlers of the logger it was logged on, as before queueing."""
+    def __init__(self, queue, routes):
+        """
+        :param routes: {logger_name: handlers}
+        """
+        QueueListener.__init__(self, queue)
+        self.routes = routes
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)  # waiting if the queue is full : the listener is emptying it
+
+    def handle(self, record):
+        record = self.prepare(record)
+        name = record.name
+        while name and name not in self.routes:
+            name = name.rpartition('.')[0]
+        for handler in self.routes.get(name, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+
+
+class QueueLogging(object):
+    def __init__(self, loggers=('pyros',), queue_size=10000, multiprocess=True, filters=(), debug_rate=None):
+        """
+        :param loggers: the names of the loggers whose handlers are moved behind the queue
+        :param queue_size: the maximum number of records waiting to be written
+        :param multiprocess: if True, processes forked after start() log through this queue too
+        :param filters: filters applied before queueing, like a RateLimitFilter
+        :param debug_rate: if set, the loggers log debug records while started, at most debug_rate per second
+                           from each line of code. 0 for all of them.
+        """
+        self.loggers = list(loggers)
+        self.debug_rate = debug_rate
+        if multiprocess:
+            import multiprocessing
+            self.queue = multiprocessing.Queue(queue_size)
+        else:
+            self.queue = queue.Queue(queue_size)
+        self.handler = DroppingQueueHandler(self.queue)
+        for log_filter in filters:
+            self.handler.addFilter(log_filter)
+        if debug_rate:
+            self.handler.addFilter(RateLimitFilter(debug_rate))
+        self._routes = {}
+        self._levels = {}
+        self._listener = None
+
+    def start(self):
+        for name in self.loggers:
+            logger = logging.getLogger(name)
+            self._routes[name] = list(logger.handlers)
+            logger.handlers = [self.handler]
+            if self.debug_rate is not None:
+                self._levels[name] = logger.level
+                logger.setLevel(logging.DEBUG)
+        self._listener = _RoutingListener(self.queue, self._routes)
+        self._listener.start()
+        return self
+
+    def stop(self):
+        """Writes the records left in the queue, and puts the handlers back on their loggers."""
+        if self._listener is None:
+            return
+        for name in self.loggers:
+            logging.getLogger(name).handlers = self._routes[name]
+        for name, level in self._levels.items():
+            logging.getLogger(name).setLevel(level)
+        self._listener.stop()
+        self._listener = None
+
+    @property
+    def dropped(self):
+        return self.handler.dropped
+
+
+class _PerCallSiteFilter(logging.Filter):
+    """Filters records at or below max_level, deciding separately for each line of code."""
+    def __init__(self, max_level=logging.DEBUG):
+        """
+        :param max_level: records above this level always pass
+        """
+        logging.Filter.__init__(self)
+        self.max_level = max_level
+        self.suppressed = 0
+        self._lock = threading.Lock()
+        self._sites = {}  # {(logger name, file, line): state}
+
+    def filter(self, record):
+        if record.levelno > self.max_level:
+            return True
+        with self._lock:
+            passed = self._passes((record.name, record.pathname, record.lineno))
+            if not passed:
+                self.suppressed += 1
+            return passed
+
+
+class RateLimitFilter(_PerCallSiteFilter):
+    def __init__(self, rate=10.0, burst=None, max_level=logging.DEBUG, clock=None):
+        """
+        :param rate: records per second let through from each line of code
+        :param burst: how many records can pass at once, after a quiet period. Defaults to rate.
+        """
+        _PerCallSiteFilter.__init__(self, max_level)
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._clock = clock or time.time
+
+    def _passes(self, site):
+        now = self._clock()
+        tokens, last = self._sites.get(site, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - last) * self.rate)  # token bucket
+        passed = tokens >= 1
+        self._sites[site] = (tokens - 1 if passed else tokens, now)
+        return passed
+
+
+class SampleFilter(_PerCallSiteFilter):
+    def __init__(self, n=None, fraction=None, max_level=logging.DEBUG, rng=None):
+        """
+        :param n: lets through one record out of n, from each line of code
+        :param fraction: or lets through this random fraction of records
+        """
+        _PerCallSiteFilter.__init__(self, max_level)
+        if (n is None) == (fraction is None):
+            raise ValueError("SampleFilter needs either n or fraction")
+        self.n = n
+        self.fraction = fraction
+        self._random = (rng or random.Random()).random
+
+    def _passes(self, site):
+        if self.fraction is not None:
+            return self._random() < self.fraction
+        count = self._sites.get(site, 0)
+        self._sites[site] = (count + 1) % self.n
+        return count == 0
@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import, division, print_function
+
+"""
+Data formats exchanged between pyros clients and nodes.
+Everything here must stay importable from both sides, without any backend ( ROS, etc. ) installed.
+"""
@@ -0,0 +1,130 @@
+from __future__ import absolute_import
+
+import array
+import sys
+
+import six
+
+"""
+Typed buffers for numeric array fields.
+A long list of numbers ( LaserScan.ranges, JointState.position, etc. ) is pickled element by element,
+and rebuilt as a list of python objects on the other side.
+Packed as a TypedBuffer, it travels as a single bytes blob, and can be rebuilt as a numpy.ndarray view on it.
+numpy is only needed on the client side, and only if arrays are requested.
+"""
+
+
+class TypedBuffer(object):
+    """
+    A homogeneous numeric array, stored as raw bytes.
+    typecode is an array module typecode, also understood by numpy.dtype()
+    """
+    __slots__ = ('typecode', 'byteorder', 'data')
+
+    def __init__(self, typecode, data, byteorder=sys.byteorder):
+        self.typecode = typecode
+        self.data = data
+        self.byteorder = byteorder
+
+    def __reduce__(self):
+        return TypedBuffer, (self.typecode, self.data, self.byteorder)
+
+    def __len__(self):
+        return len(self.data) // array.array(self.typecode).itemsize
+
+    def __eq__(self, other):
+        return (isinstance(other, TypedBuffer) and self.typecode == other.typecode and
+                self.byteorder == other.byteorder and self.data == other.data)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "TypedBuffer({0!r}, <{1} items>)".format(self.typecode, len(self))
+
+    @classmethod
+    def from_list(cls, typecode, values):
+        arr = array.array(typecode, values)
+        return cls(typecode, arr.tobytes() if six.PY3 else arr.tostring())
+
+    def to_array(self):
+        arr = array.array(self.typecode)
+        if six.PY3:
+            arr.frombytes(self.data)
+        else:
+            arr.fromstring(self.data)
+        if self.byteorder != sys.byteorder:
+            arr.byteswap()
+        return arr
+
+    def to_list(self):
+        return self.to_array().tolist()
+
+    def to_numpy(self, numpy):
+        """
+        :param numpy: the numpy module
+        :return: a read-only ndarray sharing memory with the received buffer
+        """
+        dtype = numpy.dtype(self.typecode)
+        if self.byteorder != sys.byteorder:
+            dtype = dtype.newbyteorder()
+        return numpy.frombuffer(self.data, dtype=dtype)
+
+
+# fixed width typecodes only : a C long is 4 bytes on windows, 8 on linux, and buffers travel between both.
+# 'q' is not supported by the array module on python 2 : integers are not packed there.
+try:
+    array.array('q')
+    _INT_TYPECODE = 'q'
+except ValueError:
+    _INT_TYPECODE = None
+
+
+def _typecode(values):
+    # bool is a subclass of int, but we do not want to turn booleans into integers
+    if all(type(v) is float for v in values):
+        return 'd'
+    if _INT_TYPECODE and all(isinstance(v, six.integer_types) and not isinstance(v, bool) for v in values):
+        return _INT_TYPECODE
+    return None
+
+
+def pack_arrays(content, min_length=16):
+    """
+    Node side : replaces, in a converted message, the numeric lists by TypedBuffers.
+    :param content: a converted message (dict, list or value)
+    :param min_length: lists shorter than this are not worth packing
+    :return: the content, with long numeric lists packed
+    """
+    if isinstance(content, dict):
+        return dict((k, pack_arrays(v, min_length)) for k, v in six.iteritems(content))
+    elif isinstance(content, bytearray):
+        return TypedBuffer('B', bytes(content))
+    elif isinstance(content, (list, tuple)):
+        if len(content) >= min_length:
+            typecode = _typecode(content)
+            if typecode is not None:
+                try:
+                    return TypedBuffer.from_list(typecode, content)
+                except OverflowError:  # integers too big for 64 bits
+                    pass
+        return (list if isinstance(content, list) else tuple)(pack_arrays(v, min_length) for v in content)
+    return content
+
+
+def unpack_arrays(content, numpy=None):
+    """
+    Client side : replaces TypedBuffers by numpy arrays if numpy is passed, or by lists otherwise.
+    :param content: the received message content
+    :param numpy: the numpy module, or None
+    :return: the content, with TypedBuffers unpacked
+    """
+    if isinstance(content, TypedBuffer):
+        return content.to_numpy(numpy) if numpy is not None else content.to_list()
+    elif isinstance(content, dict):
+        return dict((k, unpack_arrays(v, numpy)) for k, v in six.iteritems(content))
+    elif isinstance(content, (list, tuple)):
+        return (list if isinstance(content, list) else tuple)(unpack_arrays(v, numpy) for v in content)
+    return content
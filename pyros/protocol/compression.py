@@ -0,0 +1,201 @@
+from __future__ import absolute_import, division
+
+import threading
+import time
+import zlib
+
+import six
+from six.moves import cPickle as pickle
+
+from .arrays import TypedBuffer
+from .delta import DeltaFrame
+from .lazy import LazyPayload
+
+"""
+Compression of large responses, negotiated per client.
+The client sends the codecs it can decode, in order of preference, and a size threshold.
+The node compresses a response with the first of these codecs it has, only if the response is larger than the threshold.
+Small responses are only measured, by a walk stopping as soon as the threshold is reached, and sent as before.
+
+Codecs are 'lz4' ( needs the lz4 package ), 'zstd' ( needs the zstandard package ) and 'zlib', always there.
+They can be installed with `pip install pyros[compression]`.
+"""
+
+DEFAULT_THRESHOLD = 64 * 1024
+
+
+def _lz4():
+    import lz4.frame
+    return lz4.frame.compress, lz4.frame.decompress
+
+
+def _per_thread(factory, method):
+    # for codec objects not safe to share between threads, like zstandard compressors
+    local = threading.local()
+
+    def call(data):
+        obj = getattr(local, 'obj', None)
+        if obj is None:
+            obj = local.obj = factory()
+        return getattr(obj, method)(data)
+    return call
+
+
+def _zstd():
+    import zstandard
+    return _per_thread(zstandard.ZstdCompressor, 'compress'), _per_thread(zstandard.ZstdDecompressor, 'decompress')
+
+
+def _zlib():
+    return (lambda data: zlib.compress(data, 1)), zlib.decompress  # level 1 : fast, and still good on maps and images
+
+
+_CODECS = (('lz4', _lz4), ('zstd', _zstd), ('zlib', _zlib))
+_loaded = {}
+
+
+def _codec(name):
+    """:return: the (compress, decompress) functions of a codec, or None if it is not installed"""
+    if name not in _loaded:
+        loader = dict(_CODECS).get(name)
+        try:
+            _loaded[name] = loader() if loader is not None else None
+        except ImportError:
+            _loaded[name] = None
+    return _loaded[name]
+
+
+def available_codecs():
+    """:return: the names of the codecs installed here, in order of preference"""
+    return [name for name, _ in _CODECS if _codec(name) is not None]
+
+
+def negotiate(codecs):
+    """
+    :param codecs: the codecs the client can decode, in order of preference
+    :return: the first one installed here, or None
+    """
+    for name in codecs:
+        if _codec(name) is not None:
+            return name
+    return None
+
+
+class CompressedPayload(object):
+    """A pickled, then compressed, response."""
+    __slots__ = ('codec', 'data', 'raw_size')
+
+    def __init__(self, codec, data, raw_size):
+        self.codec = codec
+        self.data = data
+        self.raw_size = raw_size
+
+    def __reduce__(self):
+        return CompressedPayload, (self.codec, self.data, self.raw_size)
+
+    def __repr__(self):
+        return "CompressedPayload({0!r}, {1} -> {2} bytes)".format(self.codec, self.raw_size, len(self.data))
+
+
+class CompressionStats(object):
+    """Counters, on the node for compression, on the client for decompression."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.messages = 0  # compressed or decompressed
+        self.skipped = 0  # below the threshold
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.seconds = 0.0
+
+    def count(self, raw_size, compressed_size, seconds):
+        with self._lock:
+            self.messages += 1
+            self.raw_bytes += raw_size
+            self.compressed_bytes += compressed_size
+            self.seconds += seconds
+
+    def skip(self):
+        with self._lock:
+            self.skipped += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'messages': self.messages,
+                'skipped': self.skipped,
+                'raw_bytes': self.raw_bytes,
+                'compressed_bytes': self.compressed_bytes,
+                'ratio': self.raw_bytes / self.compressed_bytes if self.compressed_bytes else None,
+                'seconds': self.seconds,
+            }
+
+
+def _reaches(content, threshold):
+    """
+    Estimates the size of content, stopping as soon as threshold is reached.
+    :return: True if content is at least threshold bytes
+    """
+    pending = [content]
+    size = 0
+    while pending:
+        item = pending.pop()
+        if isinstance(item, (six.binary_type, six.text_type, bytearray)):
+            size += len(item)
+        elif isinstance(item, dict):
+            pending.extend(six.itervalues(item))
+            size += 8 * len(item)
+        elif isinstance(item, (list, tuple)):
+            if item and not isinstance(item[0], (dict, list, tuple, six.binary_type, six.text_type)):
+                size += 8 * len(item)  # numbers : not walking them one by one
+            else:
+                pending.extend(item)
+        elif isinstance(item, TypedBuffer):
+            size += len(item.data)
+        elif isinstance(item, LazyPayload):
+            pending.extend(six.itervalues(item.fields))
+        elif isinstance(item, DeltaFrame):
+            pending.extend((item.patch, item.content))
+        else:
+            size += 8
+        if size >= threshold:
+            return True
+    return False
+
+
+def compress(content, codecs, threshold=DEFAULT_THRESHOLD, stats=None):
+    """
+    Node side.
+    :param content: the encoded response
+    :param codecs: the codecs the client can decode, in order of preference
+    :param threshold: responses smaller than this, in bytes, are not compressed
+    :param stats: optional CompressionStats to count in
+    :return: a CompressedPayload, or content unchanged
+    """
+    codec = negotiate(codecs)
+    if content is None or codec is None or not _reaches(content, threshold):
+        if stats is not None:
+            stats.skip()
+        return content
+    start = time.time()
+    raw = pickle.dumps(content, pickle.HIGHEST_PROTOCOL)
+    payload = CompressedPayload(codec, _codec(codec)[0](raw), len(raw))
+    if stats is not None:
+        stats.count(len(raw), len(payload.data), time.time() - start)
+    return payload
+
+
+def decompress(content, stats=None):
+    """
+    Client side.
+    :return: the response, decompressed if it was compressed
+    """
+    if not isinstance(content, CompressedPayload):
+        return content
+    start = time.time()
+    codec = _codec(content.codec)
+    if codec is None:
+        raise ValueError("Cannot decompress {0} payload : codec not installed".format(content.codec))
+    res = pickle.loads(codec[1](content.data))
+    if stats is not None:
+        stats.count(content.raw_size, len(content.data), time.time() - start)
+    return res
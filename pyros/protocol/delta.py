@@ -0,0 +1,209 @@
+from __future__ import absolute_import, division
+
+import collections
+import threading
+
+import six
+
+from .arrays import TypedBuffer
+
+"""
+Delta encoding, for large messages changing slowly, like maps or static transforms.
+The node remembers the last message delivered to each client, on each delta topic,
+and sends only what changed since then. The client rebuilds the full message from the last one it received.
+
+The client sends delta={'client': its id, 'base': the seq of its last message, 'keyframe_interval': n}.
+The node answers with a DeltaFrame :
+ - a keyframe, with the full content, when the client has no base, when the node does not have the same base,
+   or every keyframe_interval messages,
+ - otherwise a patch against the base.
+
+A patch is None if nothing changed, or a tree of changes :
+ - ('set', value) replaces the value
+ - ('dict', {key: patch}, removed_keys) changes some keys of a dict
+ - ('list', {index: patch}) changes some items of a list of the same length
+ - ('bytes', block_size, {block_index: block}) changes some blocks of a string of the same length
+ - ('buffer', patch) changes the data of a TypedBuffer
+
+Unchanged parts of the rebuilt message are shared with the previous message : they must not be modified.
+"""
+
+BLOCK_SIZE = 64
+
+
+class DeltaFrame(object):
+    __slots__ = ('seq', 'base', 'patch', 'content')
+
+    def __init__(self, seq, base=None, patch=None, content=None):
+        """
+        :param seq: the number of this message, for this client and topic
+        :param base: the seq of the message patch applies to. None for a keyframe.
+        """
+        self.seq = seq
+        self.base = base
+        self.patch = patch
+        self.content = content
+
+    def __reduce__(self):
+        return DeltaFrame, (self.seq, self.base, self.patch, self.content)
+
+    @property
+    def keyframe(self):
+        return self.base is None
+
+    def __repr__(self):
+        return "DeltaFrame(seq={0}, {1})".format(self.seq, 'keyframe' if self.keyframe else 'base={0}'.format(self.base))
+
+
+def diff(old, new):
+    """
+    :return: the patch turning old into new, None if they are equal
+    """
+    if type(old) is not type(new):
+        return ('set', new)
+    if isinstance(old, dict):
+        changes = {}
+        for key, value in six.iteritems(new):
+            if key not in old:
+                changes[key] = ('set', value)
+            elif old[key] is not value:
+                change = diff(old[key], value)
+                if change is not None:
+                    changes[key] = change
+        removed = [key for key in old if key not in new]
+        return ('dict', changes, removed) if changes or removed else None
+    if isinstance(old, TypedBuffer):
+        if old.typecode != new.typecode or old.byteorder != new.byteorder:
+            return ('set', new)
+        change = diff(old.data, new.data)
+        return None if change is None else ('buffer', change)
+    if isinstance(old, (list, tuple)):
+        if old == new:  # fast path, compared in C
+            return None
+        if len(old) != len(new):
+            return ('set', new)
+        changes = {}
+        for index, (before, after) in enumerate(zip(old, new)):
+            if before != after:
+                changes[index] = diff(before, after)
+                if len(changes) > len(new) // 2:
+                    return ('set', new)  # mostly changed : the patch would be bigger than the value
+        return ('list', changes)
+    if isinstance(old, (six.binary_type, six.text_type)) and len(old) == len(new) > BLOCK_SIZE:
+        if old == new:
+            return None
+        changes = dict(
+            (start // BLOCK_SIZE, new[start:start + BLOCK_SIZE]) for start in range(0, len(new), BLOCK_SIZE)
+            if old[start:start + BLOCK_SIZE] != new[start:start + BLOCK_SIZE]
+        )
+        if len(changes) * BLOCK_SIZE > len(new) // 2:
+            return ('set', new)
+        return ('bytes', BLOCK_SIZE, changes)
+    return None if old == new else ('set', new)
+
+
+def patch(old, change):
+    """
+    :return: the value obtained by applying the patch to old. old is not modified.
+    """
+    if change is None:
+        return old
+    kind = change[0]
+    if kind == 'set':
+        return change[1]
+    if kind == 'dict':
+        new = dict(old)
+        for key, sub in six.iteritems(change[1]):
+            new[key] = patch(old.get(key), sub)
+        for key in change[2]:
+            del new[key]
+        return new
+    if kind == 'list':
+        new = list(old)
+        for index, sub in six.iteritems(change[1]):
+            new[index] = patch(old[index], sub)
+        return type(old)(new) if isinstance(old, tuple) else new
+    if kind == 'bytes':
+        block_size, blocks = change[1], change[2]
+        parts = [old[start:start + block_size] for start in range(0, len(old), block_size)]
+        for index, block in six.iteritems(blocks):
+            parts[index] = block
+        return old[:0].join(parts)
+    if kind == 'buffer':
+        return TypedBuffer(old.typecode, patch(old.data, change[1]), old.byteorder)
+    raise ValueError("Unknown patch {0!r}".format(kind))
+
+
+class DeltaEncoder(object):
+    """Node side : remembers the last message delivered to each client, on each delta topic."""
+    def __init__(self, max_entries=256):
+        """
+        :param max_entries: the maximum number of (client, topic) messages remembered. The least recently used
+                            is forgotten first, and its client gets a keyframe next time.
+        """
+        self.max_entries = max_entries
+        self._last = collections.OrderedDict()  # {(client, topic): (seq, content, deltas since keyframe)}
+        self.keyframes = 0
+        self.deltas = 0
+
+    def encode(self, topic, content, client, base=None, keyframe_interval=100):
+        """
+        :param topic: the topic name
+        :param content: the message to deliver, or None
+        :param client: the client id
+        :param base: the seq of the last message the client has, or None
+        :return: a DeltaFrame, or None if content is None
+        """
+        if content is None:
+            return None
+        key = (client, topic)
+        last = self._last.pop(key, None)
+        if last is not None and last[0] == base and last[2] + 1 < keyframe_interval:
+            frame = DeltaFrame(base + 1, base=base, patch=diff(last[1], content))
+            since_keyframe = last[2] + 1
+            self.deltas += 1
+        else:
+            frame = DeltaFrame(0 if base is None else base + 1, content=content)
+            since_keyframe = 0
+            self.keyframes += 1
+        self._last[key] = (frame.seq, content, since_keyframe)
+        while len(self._last) > self.max_entries:
+            self._last.popitem(last=False)
+        return frame
+
+    def stats(self):
+        return {'keyframes': self.keyframes, 'deltas': self.deltas, 'entries': len(self._last)}
+
+
+class DeltaDecoder(object):
+    """Client side : rebuilds full messages from the frames of the delta topics."""
+    def __init__(self, client_id, keyframe_interval=100):
+        self.client_id = client_id
+        self.keyframe_interval = keyframe_interval
+        # held by the client from request() to decode(), for frames to be decoded in the order they are sent
+        self.lock = threading.RLock()
+        self._last = {}  # {topic: (seq, content)}
+
+    def request(self, topic):
+        """:return: the delta request option for topic"""
+        with self.lock:
+            last = self._last.get(topic)
+        return {'client': self.client_id, 'base': last[0] if last else None, 'keyframe_interval': self.keyframe_interval}
+
+    def decode(self, topic, frame):
+        """
+        :param frame: the DeltaFrame received, or anything else, returned unchanged
+        :return: the full message
+        """
+        if not isinstance(frame, DeltaFrame):
+            return frame
+        with self.lock:
+            if frame.keyframe:
+                content = frame.content
+            else:
+                last = self._last.get(topic)
+                if last is None or last[0] != frame.base:
+                    raise ValueError("Delta frame for {0} does not apply to the last message received".format(topic))
+                content = patch(last[1], frame.patch)
+            self._last[topic] = (frame.seq, content)
+        return content
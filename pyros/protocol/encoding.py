@@ -0,0 +1,43 @@
+from __future__ import absolute_import
+
+from .arrays import pack_arrays
+from .compression import compress as compress_content
+from .lazy import dumps_lazy
+from .projection import project
+
+"""
+Node side entry point : encodes a converted message as requested by the client.
+Nodes receive the encoding options as keyword arguments of the topic and service calls,
+and pass them here, unchanged, before returning the response.
+"""
+
+
+def encode(content, typed_buffers=False, lazy=False, fields=None, compress=None, delta=None,
+           stats=None, deltas=None, topic=None):
+    """
+    :param content: the converted message ( dict, list or value )
+    :param fields: keep only these field paths, see pyros.protocol.projection
+    :param typed_buffers: pack numeric lists as TypedBuffers
+    :param lazy: encode each field separately, for the client to decode on access
+    :param compress: {'codecs': [...], 'threshold': bytes}, to compress large responses with one of the client codecs
+    :param delta: {'client': ..., 'base': ..., 'keyframe_interval': ...}, to send only what changed
+                  since the last message delivered to this client. See pyros.protocol.delta.
+    The node passes these, the client passes the others :
+    :param stats: the node CompressionStats, to count compressed responses in
+    :param deltas: the node DeltaEncoder, remembering the last messages delivered
+    :param topic: the name of the topic the content comes from, for delta encoding
+    :return: the encoded content, ready to be sent back
+    """
+    if fields is not None:
+        content = project(content, fields)
+    if typed_buffers:
+        content = pack_arrays(content)
+    if delta is not None:
+        if deltas is None or topic is None:
+            raise ValueError("delta encoding needs the node DeltaEncoder and the topic name")
+        content = deltas.encode(topic, content, **delta)
+    elif lazy:
+        content = dumps_lazy(content)
+    if compress is not None:
+        content = compress_content(content, stats=stats, **compress)
+    return content
@@ -0,0 +1,168 @@
+from __future__ import absolute_import
+
+import operator
+import re
+
+import six
+from six.moves.collections_abc import Mapping
+
+from .projection import parse_path
+
+"""
+Declarative message filters, evaluated on the node, so messages that do not match never cross the process boundary.
+A filter is a plain, pickleable, JSON friendly expression :
+
+ - [op, path, value] compares a field to a value. op is one of '==', '!=', '<', '<=', '>', '>=',
+   'in' ( field in value ), 'not_in', 'contains' ( value in field ) or 'matches' ( regular expression search ).
+ - ['exists', path] is true if the field is there.
+ - ['and', expr, ...], ['or', expr, ...] and ['not', expr] combine expressions.
+ - ['any', path, expr] and ['all', path, expr] test expr on each item of a list field, with paths relative to the item.
+
+Paths are the dotted paths of field projection, like 'header.frame_id' or 'status[0].level'.
+A comparison on a missing field is false. Examples :
+
+ ['>=', 'level', 2]  # diagnostics with level >= WARN
+ ['any', 'detections', ['>', 'confidence', 0.8]]  # at least one confident detection
+ ['and', ['==', 'header.frame_id', 'map'], ['not', ['matches', 'name', '^debug_']]]
+
+Fields are read from dicts, and from attributes of other objects : a filter also works on raw ROS messages,
+before they are converted.
+
+Filters come from clients and run on the node : 'matches' patterns are limited to MAX_PATTERN_LENGTH characters,
+and patterns with a quantified group containing a quantifier, like '(a+)+', are refused,
+as they can backtrack for a very long time on some fields.
+"""
+
+_MISSING = object()
+
+MAX_PATTERN_LENGTH = 256
+_NESTED_QUANTIFIER = re.compile(r'\([^()]*[*+}][^()]*\)[*+{]')
+
+
+def _get(msg, steps):
+    for step in steps:
+        try:
+            if isinstance(step, six.string_types):
+                msg = msg[step] if isinstance(msg, Mapping) else getattr(msg, step)
+            else:
+                msg = msg[step]
+        except (KeyError, IndexError, TypeError, AttributeError):
+            return _MISSING
+    return msg
+
+
+def _matches(field, pattern):
+    return re.search(pattern, field) is not None
+
+
+def _compile_pattern(pattern):
+    if not isinstance(pattern, six.string_types) or len(pattern) > MAX_PATTERN_LENGTH:
+        raise ValueError("Invalid filter pattern {0!r} : a string of at most {1} characters is required".format(
+            pattern, MAX_PATTERN_LENGTH
+        ))
+    if _NESTED_QUANTIFIER.search(pattern):
+        raise ValueError("Invalid filter pattern {0!r} : nested quantifiers are not allowed".format(pattern))
+    try:
+        return re.compile(pattern)
+    except re.error as exc:
+        raise ValueError("Invalid filter pattern {0!r} : {1}".format(pattern, exc))
+
+
+_COMPARISONS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '<': operator.lt,
+    '<=': operator.le,
+    '>': operator.gt,
+    '>=': operator.ge,
+    'in': lambda field, value: field in value,
+    'not_in': lambda field, value: field not in value,
+    'contains': lambda field, value: value in field,
+    'matches': _matches,
+}
+
+
+def _compile(expr):
+    if not isinstance(expr, (list, tuple)) or not expr:
+        raise ValueError("Invalid filter expression {0!r}".format(expr))
+    op, args = expr[0], list(expr[1:])
+
+    if op in ('and', 'or'):
+        preds = [_compile(e) for e in args]
+        combine = all if op == 'and' else any
+        return lambda msg: combine(p(msg) for p in preds)
+    if op == 'not' and len(args) == 1:
+        pred = _compile(args[0])
+        return lambda msg: not pred(msg)
+    if op == 'exists' and len(args) == 1:
+        steps = parse_path(args[0])
+        return lambda msg: _get(msg, steps) is not _MISSING
+    if op in ('any', 'all') and len(args) == 2:
+        steps, pred = parse_path(args[0]), _compile(args[1])
+        combine = any if op == 'any' else all
+
+        def quantified(msg):
+            items = _get(msg, steps)
+            if items is _MISSING or isinstance(items, (Mapping, six.string_types, six.binary_type)):
+                return False
+            try:
+                return combine(pred(item) for item in items)
+            except TypeError:  # not iterable
+                return False
+        return quantified
+    if op in _COMPARISONS and len(args) == 2:
+        steps, value, compare = parse_path(args[0]), args[1], _COMPARISONS[op]
+        if op == 'matches':
+            value = _compile_pattern(value)
+
+        def comparison(msg):
+            field = _get(msg, steps)
+            if field is _MISSING:
+                return False
+            try:
+                return bool(compare(field, value))
+            except TypeError:  # like comparing None with a number
+                return False
+        return comparison
+    raise ValueError("Invalid filter expression {0!r}".format(expr))
+
+
+def _freeze(expr):
+    if isinstance(expr, (list, tuple)):
+        return tuple(_freeze(e) for e in expr)
+    return expr
+
+
+_compiled = {}  # filters are few, and evaluated on every message : compiling them once
+
+
+def compile_filter(expr):
+    """
+    :param expr: a filter expression
+    :return: a predicate function, taking a message and returning True if it matches
+    :raises ValueError: if the expression is invalid
+    """
+    try:
+        key = _freeze(expr)
+        pred = _compiled.get(key)
+    except TypeError:  # unhashable value, like a dict : not cached
+        key, pred = None, None
+    if pred is None:
+        pred = _compile(expr)
+        if key is not None and len(_compiled) < 1024:
+            _compiled[key] = pred
+    return pred
+
+
+def first_match(pop, expr):
+    """
+    Pops messages until one matches. Non matching messages are dropped.
+    :param pop: the function returning the next message, or None when there are no more
+    :param expr: a filter expression
+    :return: the first matching message, or None
+    """
+    pred = compile_filter(expr)
+    msg = pop()
+    while msg is not None and not pred(msg):
+        msg = pop()
+    return msg
@@ -0,0 +1,95 @@
+from __future__ import absolute_import, division
+
+import collections
+import sys
+import threading
+
+from six.moves import cPickle as pickle
+
+"""
+Control-plane and data-plane lanes.
+Control-plane requests ( setup, and the topics, services and params listings ) can take seconds on a large system.
+Data-plane requests ( topic inject and extract, service calls, param get and set ) must not wait behind them.
+A node supporting lanes serves the control-plane on its own socket and thread, advertised by the 'control_lane'
+service, while its main loop keeps serving the data-plane.
+
+On the control lane, a request is a pickled (endpoint, args, kwargs) tuple,
+and a response a pickled (True, response) or (False, (exception type, exception value)) tuple.
+"""
+
+CONTROL = 'control'
+DATA = 'data'
+
+CONTROL_ENDPOINTS = ('setup', 'topics', 'services', 'params')
+
+
+def lane_of(endpoint, kwargs=None):
+    """
+    :param endpoint: the name of the node service called
+    :param kwargs: the keyword arguments of the call
+    :return: CONTROL or DATA
+    """
+    if endpoint not in CONTROL_ENDPOINTS:
+        return DATA
+    # params with arguments are batched param gets and sets : data-plane
+    return DATA if endpoint == 'params' and kwargs else CONTROL
+
+
+def dumps_request(endpoint, args=None, kwargs=None):
+    return pickle.dumps((endpoint, args or (), kwargs or {}), pickle.HIGHEST_PROTOCOL)
+
+
+def loads_request(frame):
+    return pickle.loads(frame)
+
+
+def dumps_response(response):
+    return pickle.dumps((True, response), pickle.HIGHEST_PROTOCOL)
+
+
+def dumps_error():
+    """:return: the response frame for the exception being handled"""
+    exc_type, exc_value = sys.exc_info()[:2]
+    try:
+        return pickle.dumps((False, (exc_type, exc_value)), pickle.HIGHEST_PROTOCOL)
+    except Exception:  # unpickleable exception
+        return pickle.dumps((False, (RuntimeError, RuntimeError(repr(exc_value)))), pickle.HIGHEST_PROTOCOL)
+
+
+def loads_response(frame):
+    """
+    :return: the response
+    :raises: the exception raised by the node, with its original type
+    """
+    ok, response = pickle.loads(frame)
+    if not ok:
+        raise response[1]
+    return response
+
+
+class LaneStats(object):
+    """Latency of the requests of one lane, measured where they are served, or where they are sent."""
+    def __init__(self, window=1024):
+        """
+        :param window: how many of the last latencies percentiles are computed on
+        """
+        self._lock = threading.Lock()
+        self._recent = collections.deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def count_request(self, seconds):
+        with self._lock:
+            self._recent.append(seconds)
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def stats(self):
+        with self._lock:
+            recent = sorted(self._recent)
+            stats = {'count': self.count, 'mean': self.total / self.count if self.count else None, 'max': self.max}
+        for pct in (50, 99):
+            stats['p{0}'.format(pct)] = recent[min(len(recent) - 1, len(recent) * pct // 100)] if recent else None
+        return stats
@@ -0,0 +1,121 @@
+from __future__ import absolute_import
+
+import pickle
+
+import six
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # python 2
+    from collections import Mapping
+
+"""
+Lazy messages, decoded field by field, on access.
+The node pickles each field of a converted message separately, and sends the resulting LazyPayload.
+Unpickling a LazyPayload only copies bytes, the fields are unpickled when the client reads them.
+Nested messages are LazyPayloads themselves, so reading msg['pose']['position'] never decodes the covariance.
+"""
+
+
+class LazyPayload(object):
+    """
+    A message as it travels : a dict of {field_name: pickled_field_value}.
+    """
+    __slots__ = ('fields',)
+
+    def __init__(self, fields):
+        self.fields = fields
+
+    def __reduce__(self):
+        return LazyPayload, (self.fields,)
+
+
+def dumps_lazy(content, protocol=pickle.HIGHEST_PROTOCOL):
+    """
+    Node side : encodes a converted message as a LazyPayload.
+    Anything that is not a dict is returned unchanged : it is small enough to be decoded eagerly.
+    """
+    if not isinstance(content, dict):
+        return content
+    return LazyPayload(dict(
+        (k, pickle.dumps(dumps_lazy(v, protocol), protocol)) for k, v in six.iteritems(content)
+    ))
+
+
+class LazyMessage(Mapping):
+    """
+    Client side : read only view on a LazyPayload.
+    Fields are decoded on first access ( msg['field'] or msg.field ) and remembered.
+    Use to_dict() to decode everything at once.
+    """
+    __slots__ = ('_payload', '_decoded', '_decode')
+
+    def __init__(self, payload, decode=None):
+        """
+        :param payload: the LazyPayload received
+        :param decode: optional function applied to each field value after it has been unpickled
+        """
+        self._payload = payload
+        self._decoded = {}
+        self._decode = decode
+
+    def __getitem__(self, key):
+        try:
+            return self._decoded[key]
+        except KeyError:
+            value = pickle.loads(self._payload.fields[key])  # raises KeyError for unknown fields
+            if isinstance(value, LazyPayload):
+                value = LazyMessage(value, self._decode)
+            elif self._decode is not None:
+                value = self._decode(value)
+            self._decoded[key] = value
+            return value
+
+    def __getattr__(self, name):
+        # only called when normal attribute lookup fails
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError("Message has no field {0}".format(name))
+
+    def __iter__(self):
+        return iter(self._payload.fields)
+
+    def __len__(self):
+        return len(self._payload.fields)
+
+    def __contains__(self, key):
+        return key in self._payload.fields
+
+    def __eq__(self, other):
+        if isinstance(other, LazyMessage):
+            other = other.to_dict()
+        return self.to_dict() == other
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "LazyMessage({0})".format(", ".join(
+            "{0}={1!r}".format(k, self._decoded[k]) if k in self._decoded else "{0}=...".format(k)
+            for k in self._payload.fields
+        ))
+
+    def to_dict(self):
+        """Decodes all fields, recursively, and returns the message as usual nested dicts."""
+        return dict(
+            (k, v.to_dict() if isinstance(v, LazyMessage) else v) for k, v in ((k, self[k]) for k in self)
+        )
+
+
+def loads_lazy(content, decode=None):
+    """
+    Client side : wraps a received LazyPayload in a LazyMessage. Other contents are returned unchanged.
+    """
+    if isinstance(content, LazyPayload):
+        return LazyMessage(content, decode)
+    return decode(content) if decode is not None else content
@@ -0,0 +1,35 @@
+from __future__ import absolute_import
+
+from six.moves import cPickle as pickle
+
+"""
+Param names and param change events, as exchanged between pyros clients and nodes.
+Change events are published by the node on a zmq PUB socket, as two frames :
+ - the param name, so subscriptions to a name prefix are filtered by zmq, on the node side
+ - the pickled event dict : {'name': ..., 'old': ..., 'new': ..., 'source': ...}
+"""
+
+
+def in_tree(name, prefix):
+    """
+    :return: True if name is prefix, or a descendant of prefix in the / separated param namespace
+    """
+    prefix = prefix.rstrip('/')
+    return not prefix or name == prefix or name.startswith(prefix + '/')
+
+
+def dumps_event(name, old, new, source):
+    """
+    :param source: what changed the param, like the node service that set it, or 'external'
+    :return: the frames to publish
+    """
+    event = {'name': name, 'old': old, 'new': new, 'source': source}
+    return [name.encode('utf-8'), pickle.dumps(event, pickle.HIGHEST_PROTOCOL)]
+
+
+def loads_event(frames):
+    """
+    :param frames: the frames received
+    :return: the event dict
+    """
+    return pickle.loads(frames[1])
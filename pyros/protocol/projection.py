@@ -0,0 +1,124 @@
+from __future__ import absolute_import
+
+import re
+
+import six
+from six.moves.collections_abc import Mapping
+
+"""
+Field projection : keeping only some fields of a message, on the node, before it is encoded and sent.
+Fields are dotted paths, like 'pose.pose.position'. A path part can index or slice a list, python style :
+ - 'ranges[0:100:2]' keeps one range out of two, among the first 100
+ - 'pose.covariance[0]' keeps only the first covariance value
+ - 'points[0:10].x' keeps the x coordinate of the first 10 points
+The projection keeps the structure of the message : projecting 'pose.pose.position' on an Odometry message
+gives {'pose': {'pose': {'position': {...}}}}. An index replaces the list by the indexed item.
+Paths to missing fields are ignored.
+"""
+
+_PART = re.compile(r'^([^\[\]]*)((?:\[[^\[\]]*\])*)$')
+_BRACKET = re.compile(r'\[([^\[\]]*)\]')
+
+_parsed = {}  # paths are few, and projected on every message : parsing them once
+
+
+def _index(text):
+    if ':' not in text:
+        return int(text)
+    bounds = [int(b) if b.strip() else None for b in text.split(':')]
+    if len(bounds) > 3:
+        raise ValueError("Invalid slice [{0}]".format(text))
+    return slice(*bounds)
+
+
+def parse_path(path):
+    """
+    :param path: a dotted field path
+    :return: the list of steps of the path : field names, int indexes and slices
+    """
+    steps = _parsed.get(path)
+    if steps is None:
+        steps = []
+        for part in path.split('.'):
+            match = _PART.match(part)
+            if match is None:
+                raise ValueError("Invalid field path {0}".format(path))
+            name, brackets = match.groups()
+            if name:
+                steps.append(name)
+            steps.extend(_index(b) for b in _BRACKET.findall(brackets))
+        if len(_parsed) < 1024:
+            _parsed[path] = steps
+    return steps
+
+
+_MISSING = object()
+
+
+def _project(content, steps):
+    if not steps:
+        return content
+    step, rest = steps[0], steps[1:]
+    if isinstance(step, six.string_types):
+        if not isinstance(content, Mapping) or step not in content:
+            return _MISSING
+        value = _project(content[step], rest)
+        return _MISSING if value is _MISSING else {step: value}
+    if isinstance(content, Mapping):
+        return _MISSING
+    try:  # lists, tuples, strings ( uint8[] ), but also numpy arrays, on the client side
+        selected = content[step]
+    except (TypeError, IndexError):
+        return _MISSING
+    if isinstance(step, slice) and rest:
+        values = [_project(item, rest) for item in selected]
+        return [v for v in values if v is not _MISSING]
+    return _project(selected, rest)
+
+
+def _select(content, steps):
+    for i, step in enumerate(steps):
+        if isinstance(step, six.string_types):
+            content = content[step]
+        elif isinstance(step, slice) and i + 1 < len(steps):
+            return [_select(item, steps[i + 1:]) for item in content]
+        # indexes and slices were applied by the projection already
+    return content
+
+
+def projected_value(projected, path):
+    """
+    :param projected: a content projected on path
+    :param path: a field path
+    :return: the value selected by path, without the structure the projection kept around it.
+    Raises KeyError if the field is missing.
+    """
+    return _select(projected, parse_path(path))
+
+
+def _merge(left, right):
+    if isinstance(left, dict) and isinstance(right, dict):
+        merged = dict(left)
+        for key, value in six.iteritems(right):
+            merged[key] = _merge(merged[key], value) if key in merged else value
+        return merged
+    if isinstance(left, list) and isinstance(right, list) and len(left) == len(right):
+        return [_merge(l, r) for l, r in zip(left, right)]
+    return right
+
+
+def project(content, fields):
+    """
+    :param content: the message content ( dict )
+    :param fields: a list of field paths. If None, the content is returned unchanged.
+    :return: the projected content
+    """
+    if fields is None or content is None:
+        return content
+    projected = _MISSING
+    for path in fields:
+        value = _project(content, parse_path(path))
+        if value is _MISSING:
+            continue
+        projected = value if projected is _MISSING else _merge(projected, value)
+    return {} if projected is _MISSING else projected
@@ -0,0 +1,36 @@
+from __future__ import absolute_import
+
+from six.moves import cPickle as pickle
+
+"""
+Responses serialized once, on the node, and sent as many times as needed.
+Pickling a SerializedPayload only copies its bytes, and unpickling it on the client gives back the original
+content : clients see no difference, and need nothing to decode it.
+"""
+
+
+def _loads(data):
+    return pickle.loads(data)
+
+
+class SerializedPayload(object):
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        """
+        :param data: the pickled content
+        """
+        self.data = data
+
+    @classmethod
+    def of(cls, content, protocol=pickle.HIGHEST_PROTOCOL):
+        return cls(pickle.dumps(content, protocol))
+
+    def __reduce__(self):
+        return _loads, (self.data,)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __repr__(self):
+        return "SerializedPayload(<{0} bytes>)".format(len(self.data))
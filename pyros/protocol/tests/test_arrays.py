@@ -0,0 +1,55 @@
+from __future__ import absolute_import
+
+import pickle
+import unittest
+
+import six
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from pyros.protocol.arrays import TypedBuffer, pack_arrays, unpack_arrays
+
+
+class TestArrays(unittest.TestCase):
+    def setUp(self):
+        self.msg = {
+            'header': {'seq': 42, 'frame_id': 'laser'},
+            'ranges': [0.5 * i for i in range(32)],
+            'intensities': [1.0, 2.0],  # too short to be packed
+            'indexes': list(range(32)),
+            'flags': [True] * 32,  # booleans are not packed
+        }
+
+    def test_pack(self):
+        packed = pack_arrays(self.msg)
+        assert isinstance(packed['ranges'], TypedBuffer)
+        assert packed['intensities'] == [1.0, 2.0]
+        assert packed['flags'] == [True] * 32
+        assert packed['header'] == self.msg['header']
+
+    @unittest.skipIf(six.PY2, "the array module has no 64 bits typecode on python 2")
+    def test_pack_integers(self):
+        packed = pack_arrays(self.msg)
+        assert isinstance(packed['indexes'], TypedBuffer)
+        assert len(packed['indexes'].data) == 32 * 8  # the same width on every platform
+        assert packed['indexes'].to_list() == self.msg['indexes']
+
+    def test_pickle_roundtrip(self):
+        packed = pickle.loads(pickle.dumps(pack_arrays(self.msg), pickle.HIGHEST_PROTOCOL))
+        assert packed == pack_arrays(self.msg)
+
+    def test_unpack_lists(self):
+        assert unpack_arrays(pack_arrays(self.msg)) == self.msg
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_unpack_numpy(self):
+        unpacked = unpack_arrays(pack_arrays(self.msg), numpy)
+        assert isinstance(unpacked['ranges'], numpy.ndarray)
+        assert unpacked['ranges'].dtype == numpy.float64
+        assert unpacked['ranges'].tolist() == self.msg['ranges']
+        assert unpacked['indexes'].dtype == numpy.int64
+        assert unpacked['indexes'].tolist() == self.msg['indexes']
+        assert unpacked['intensities'] == [1.0, 2.0]
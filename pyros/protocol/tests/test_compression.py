@@ -0,0 +1,89 @@
+from __future__ import absolute_import
+
+import pickle
+import threading
+import unittest
+
+from pyros.protocol.arrays import TypedBuffer
+from pyros.protocol.compression import (
+    CompressedPayload, CompressionStats, _per_thread, available_codecs, compress, decompress, negotiate,
+)
+from pyros.protocol.encoding import encode
+
+MAP = {'info': {'width': 512, 'height': 512}, 'data': [0] * (512 * 512)}
+
+
+class TestCompression(unittest.TestCase):
+
+    def test_zlib_always_available(self):
+        assert 'zlib' in available_codecs()
+        assert negotiate(['unknown', 'zlib']) == 'zlib'
+        assert negotiate(['unknown']) is None
+
+    def test_small_content_unchanged(self):
+        stats = CompressionStats()
+        small = {'data': 'x' * 100}
+        assert compress(small, ['zlib'], threshold=1024, stats=stats) is small
+        assert stats.stats()['skipped'] == 1
+        assert stats.stats()['messages'] == 0
+
+    def test_large_content_compressed(self):
+        node_stats, client_stats = CompressionStats(), CompressionStats()
+        payload = compress(MAP, ['zlib'], threshold=1024, stats=node_stats)
+        assert isinstance(payload, CompressedPayload)
+        assert payload.codec == 'zlib'
+        frame = pickle.dumps(payload, pickle.HIGHEST_PROTOCOL)
+        assert len(frame) * 10 < len(pickle.dumps(MAP, pickle.HIGHEST_PROTOCOL))
+        assert decompress(pickle.loads(frame), client_stats) == MAP
+        assert node_stats.stats()['ratio'] > 10
+        assert client_stats.stats()['raw_bytes'] == node_stats.stats()['raw_bytes']
+
+    def test_size_estimate(self):
+        assert isinstance(compress({'image': b'\0' * 2048}, ['zlib'], threshold=1024), CompressedPayload)
+        assert isinstance(compress([{'x': 'y' * 100}] * 20, ['zlib'], threshold=1024), CompressedPayload)
+        buf = TypedBuffer.from_list('d', [0.0] * 256)
+        assert isinstance(compress({'ranges': buf}, ['zlib'], threshold=1024), CompressedPayload)
+
+    def test_decompress_uncompressed(self):
+        assert decompress({'data': 1}) == {'data': 1}
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            decompress(CompressedPayload('unknown', b'', 0))
+
+    def test_codec_objects_per_thread(self):
+        class Codec(object):
+            def compress(self, data):
+                return self, data
+
+        compress_here = _per_thread(Codec, 'compress')
+        used = []
+        threads = [threading.Thread(target=lambda: used.extend(compress_here(b'') for _ in range(2))) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert len(set(codec for codec, _ in used)) == 2  # one per thread, reused in the thread
+
+    @unittest.skipUnless('zstd' in available_codecs(), "zstandard is not installed")
+    def test_zstd_threads(self):
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(decompress(compress(MAP, ['zstd'], threshold=1024))))
+            for _ in range(4)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results == [MAP] * 4
+
+    def test_encode(self):
+        payload = encode(MAP, typed_buffers=True, compress={'codecs': ['zlib'], 'threshold': 1024})
+        assert isinstance(payload, CompressedPayload)
+        assert isinstance(decompress(payload)['data'], TypedBuffer)
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
@@ -0,0 +1,155 @@
+from __future__ import absolute_import
+
+import pickle
+import unittest
+
+from pyros.protocol.arrays import TypedBuffer, pack_arrays
+from pyros.protocol.compression import CompressedPayload, decompress
+from pyros.protocol.delta import BLOCK_SIZE, DeltaDecoder, DeltaEncoder, DeltaFrame, diff, patch
+from pyros.protocol.encoding import encode
+
+
+def make_map(cells):
+    return {'header': {'seq': 0, 'frame_id': 'map'}, 'info': {'width': 100, 'height': 100}, 'data': cells}
+
+
+class TestDiffPatch(unittest.TestCase):
+
+    def check(self, old, new):
+        change = diff(old, new)
+        assert patch(old, change) == new
+        return change
+
+    def test_equal(self):
+        assert diff({'a': [1, 2], 'b': 'x'}, {'a': [1, 2], 'b': 'x'}) is None
+        assert patch({'a': 1}, None) == {'a': 1}
+
+    def test_dict(self):
+        change = self.check({'a': 1, 'b': 2, 'c': 3}, {'a': 1, 'b': 5, 'd': 4})
+        assert change == ('dict', {'b': ('set', 5), 'd': ('set', 4)}, ['c'])
+
+    def test_nested_dict_shares_unchanged_parts(self):
+        old = make_map([0] * 10)
+        new = dict(old, header={'seq': 1, 'frame_id': 'map'})
+        change = self.check(old, new)
+        assert 'data' not in change[1]
+        assert patch(old, change)['data'] is old['data']
+
+    def test_list(self):
+        old = list(range(100))
+        new = list(old)
+        new[3], new[70] = -1, -2
+        assert self.check(old, new) == ('list', {3: ('set', -1), 70: ('set', -2)})
+
+    def test_list_mostly_changed(self):
+        assert self.check([1, 2, 3], [4, 5, 6]) == ('set', [4, 5, 6])
+        assert self.check([1, 2], [1, 2, 3]) == ('set', [1, 2, 3])
+
+    def test_tuple(self):
+        old = tuple(range(10))
+        new = old[:4] + (-1,) + old[5:]
+        assert isinstance(patch(old, self.check(old, new)), tuple)
+
+    def test_bytes(self):
+        old = b'\x00' * (BLOCK_SIZE * 10)
+        new = old[:BLOCK_SIZE * 3 + 5] + b'\x01' + old[BLOCK_SIZE * 3 + 6:]
+        change = self.check(old, new)
+        assert change[0] == 'bytes'
+        assert list(change[2]) == [3]
+
+    def test_short_strings_replaced(self):
+        assert self.check('abc', 'abd') == ('set', 'abd')
+
+    def test_typed_buffer(self):
+        old = pack_arrays({'data': [0] * 1000})['data']
+        cells = [0] * 1000
+        cells[500] = 100
+        new = pack_arrays({'data': cells})['data']
+        assert isinstance(old, TypedBuffer)
+        change = self.check(old, new)
+        assert change[0] == 'buffer'
+        assert len(pickle.dumps(change)) < len(pickle.dumps(new)) // 10
+
+    def test_type_change(self):
+        assert self.check({'a': 1}, [1]) == ('set', [1])
+
+
+class TestDeltaEncoding(unittest.TestCase):
+
+    def exchange(self, encoder, decoder, msg, topic='/map', **kwargs):
+        frame = encode(msg, delta=decoder.request(topic), deltas=encoder, topic=topic, **kwargs)
+        return frame, decoder.decode(topic, decompress(pickle.loads(pickle.dumps(frame))))
+
+    def test_keyframe_then_deltas(self):
+        encoder, decoder = DeltaEncoder(), DeltaDecoder('client')
+        cells = [0] * 10000
+        frame, msg = self.exchange(encoder, decoder, make_map(list(cells)))
+        assert frame.keyframe
+        assert msg == make_map(cells)
+
+        cells[42] = 100
+        frame, msg = self.exchange(encoder, decoder, make_map(list(cells)))
+        assert not frame.keyframe and frame.base == 0 and frame.seq == 1
+        assert msg == make_map(cells)
+        assert len(pickle.dumps(frame)) * 100 < len(pickle.dumps(make_map(cells)))
+        assert encoder.stats() == {'keyframes': 1, 'deltas': 1, 'entries': 1}
+
+    def test_keyframe_interval(self):
+        encoder, decoder = DeltaEncoder(), DeltaDecoder('client', keyframe_interval=3)
+        frames = [self.exchange(encoder, decoder, {'seq': i})[0] for i in range(7)]
+        assert [f.keyframe for f in frames] == [True, False, False, True, False, False, True]
+        assert [f.seq for f in frames] == list(range(7))
+
+    def test_no_message(self):
+        encoder, decoder = DeltaEncoder(), DeltaDecoder('client')
+        assert self.exchange(encoder, decoder, None) == (None, None)
+
+    def test_clients_and_topics_separate(self):
+        encoder = DeltaEncoder()
+        first, second = DeltaDecoder('first'), DeltaDecoder('second')
+        assert self.exchange(encoder, first, {'a': 1})[0].keyframe
+        assert self.exchange(encoder, second, {'a': 1})[0].keyframe
+        assert self.exchange(encoder, first, {'a': 1}, topic='/other')[0].keyframe
+        assert not self.exchange(encoder, first, {'a': 2})[0].keyframe
+
+    def test_lost_frame_gives_keyframe(self):
+        encoder, decoder = DeltaEncoder(), DeltaDecoder('client')
+        self.exchange(encoder, decoder, {'a': 1})
+        encode({'a': 2}, delta=decoder.request('/map'), deltas=encoder, topic='/map')  # never received
+        frame, msg = self.exchange(encoder, decoder, {'a': 3})
+        assert frame.keyframe
+        assert msg == {'a': 3}
+
+    def test_evicted_client_gets_keyframe(self):
+        encoder = DeltaEncoder(max_entries=2)
+        decoders = [DeltaDecoder(str(i)) for i in range(3)]
+        for decoder in decoders:
+            self.exchange(encoder, decoder, {'a': 1})
+        assert self.exchange(encoder, decoders[0], {'a': 2})[0].keyframe
+        assert not self.exchange(encoder, decoders[2], {'a': 2})[0].keyframe
+
+    def test_with_typed_buffers_and_compression(self):
+        encoder, decoder = DeltaEncoder(), DeltaDecoder('client')
+        options = {'typed_buffers': True, 'compress': {'codecs': ['zlib'], 'threshold': 1024}}
+        cells = [0] * 10000
+        frame, _ = self.exchange(encoder, decoder, make_map(list(cells)), **options)
+        assert isinstance(frame, CompressedPayload)
+        cells[7] = 1
+        frame, msg = self.exchange(encoder, decoder, make_map(list(cells)), **options)
+        assert isinstance(frame, DeltaFrame)  # small enough not to be compressed
+        assert msg['data'].to_list() == cells
+
+    def test_missing_encoder(self):
+        with self.assertRaises(ValueError):
+            encode({'a': 1}, delta={'client': 'c', 'base': None})
+
+    def test_decoder_errors(self):
+        decoder = DeltaDecoder('client')
+        with self.assertRaises(ValueError):
+            decoder.decode('/map', DeltaFrame(1, base=0, patch=('set', 1)))
+        assert decoder.decode('/map', {'a': 1}) == {'a': 1}  # older node, no delta frame
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
@@ -0,0 +1,74 @@
+from __future__ import absolute_import
+
+import collections
+import unittest
+
+from pyros.protocol.filters import compile_filter, first_match
+
+DIAGNOSTIC = {
+    'header': {'frame_id': 'base_link'},
+    'level': 2,
+    'name': 'motor_left',
+    'detections': [{'label': 'person', 'confidence': 0.9}, {'label': 'dog', 'confidence': 0.4}],
+}
+
+Point = collections.namedtuple('Point', ['x', 'y'])
+
+
+class TestFilters(unittest.TestCase):
+
+    def matches(self, expr, msg=DIAGNOSTIC):
+        return compile_filter(expr)(msg)
+
+    def test_comparisons(self):
+        assert self.matches(['>=', 'level', 2])
+        assert not self.matches(['>', 'level', 2])
+        assert self.matches(['==', 'header.frame_id', 'base_link'])
+        assert self.matches(['in', 'name', ['motor_left', 'motor_right']])
+        assert self.matches(['not_in', 'level', [0, 1]])
+        assert self.matches(['contains', 'name', 'motor'])
+        assert self.matches(['matches', 'name', '^motor_(left|right)$'])
+        assert self.matches(['==', 'detections[1].label', 'dog'])
+
+    def test_missing_fields(self):
+        assert not self.matches(['==', 'status', 'ok'])
+        assert not self.matches(['!=', 'status', 'ok'])
+        assert not self.matches(['>', 'name', 2])  # uncomparable types
+        assert self.matches(['not', ['exists', 'status']])
+
+    def test_combinations(self):
+        assert self.matches(['and', ['>=', 'level', 2], ['contains', 'name', 'motor']])
+        assert not self.matches(['and', ['>=', 'level', 2], ['contains', 'name', 'camera']])
+        assert self.matches(['or', ['>=', 'level', 3], ['contains', 'name', 'motor']])
+
+    def test_quantifiers(self):
+        assert self.matches(['any', 'detections', ['>', 'confidence', 0.8]])
+        assert not self.matches(['all', 'detections', ['>', 'confidence', 0.8]])
+        assert not self.matches(['any', 'name', ['==', 'x', 1]])  # not a list
+
+    def test_objects(self):
+        assert self.matches(['>', 'x', 1], Point(2, 3))  # raw messages, before conversion
+
+    def test_invalid(self):
+        for expr in (None, [], ['~', 'level', 2], ['and', 'level'], ['exists']):
+            with self.assertRaises(ValueError):
+                compile_filter(expr)
+
+    def test_invalid_patterns(self):
+        for pattern in ('x' * 257, '(a+)+$', '(a|aa*)*b', '(x+x+){2,}', '(', 42):
+            with self.assertRaises(ValueError):
+                compile_filter(['matches', 'name', pattern])
+        assert self.matches(['matches', 'name', '^(motor_)?(left|right)'])  # optional groups are fine
+        assert self.matches(['matches', 'name', '^(?:mo)+tor'])
+
+    def test_first_match(self):
+        queue = collections.deque({'level': level} for level in (0, 1, 2, 0))
+        pop = lambda: queue.popleft() if queue else None
+        assert first_match(pop, ['>=', 'level', 2]) == {'level': 2}
+        assert first_match(pop, ['>=', 'level', 2]) is None
+        assert not queue  # non matching messages were dropped
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
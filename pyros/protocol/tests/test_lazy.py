@@ -0,0 +1,53 @@
+from __future__ import absolute_import
+
+import pickle
+import unittest
+
+from pyros.protocol.arrays import unpack_arrays
+from pyros.protocol.encoding import encode
+from pyros.protocol.lazy import LazyMessage, LazyPayload, loads_lazy
+
+
+class TestLazy(unittest.TestCase):
+    def setUp(self):
+        self.msg = {
+            'header': {'seq': 42, 'frame_id': 'odom'},
+            'pose': {
+                'position': {'x': 1.0, 'y': 2.0, 'z': 0.0},
+                'covariance': [0.1] * 36,
+            },
+        }
+
+    def receive(self, content, decode=None):
+        # going through pickle like pyzmp does
+        return loads_lazy(pickle.loads(pickle.dumps(content)), decode)
+
+    def test_non_dict_unchanged(self):
+        assert encode('data_string', lazy=True) == 'data_string'
+        assert self.receive(encode('data_string', lazy=True)) == 'data_string'
+
+    def test_field_access(self):
+        lazy = self.receive(encode(self.msg, lazy=True))
+        assert isinstance(lazy, LazyMessage)
+        assert lazy['pose']['position']['x'] == 1.0
+        assert lazy.pose.position.y == 2.0
+        assert 'covariance' not in lazy['pose']._decoded  # never accessed, never decoded
+        assert sorted(lazy) == ['header', 'pose']
+        with self.assertRaises(KeyError):
+            lazy['twist']
+        with self.assertRaises(AttributeError):
+            lazy.twist
+
+    def test_to_dict(self):
+        lazy = self.receive(encode(self.msg, lazy=True))
+        assert lazy.to_dict() == self.msg
+        assert lazy == self.msg
+
+    def test_with_typed_buffers(self):
+        lazy = self.receive(encode(self.msg, typed_buffers=True, lazy=True), unpack_arrays)
+        assert lazy['pose']['covariance'] == [0.1] * 36
+
+    def test_payload_pickleable(self):
+        payload = pickle.loads(pickle.dumps(encode(self.msg, lazy=True)))
+        assert isinstance(payload, LazyPayload)
+        assert set(payload.fields) == {'header', 'pose'}
@@ -0,0 +1,66 @@
+from __future__ import absolute_import
+
+import unittest
+
+from pyros.protocol.encoding import encode
+from pyros.protocol.projection import parse_path, project, projected_value
+
+ODOMETRY = {
+    'header': {'seq': 42, 'frame_id': 'odom'},
+    'pose': {
+        'pose': {'position': {'x': 1.0, 'y': 2.0, 'z': 0.0}, 'orientation': {'x': 0.0, 'y': 0.0, 'z': 0.0, 'w': 1.0}},
+        'covariance': [float(i) for i in range(36)],
+    },
+    'points': [{'x': i, 'y': -i} for i in range(5)],
+}
+
+
+class TestProjection(unittest.TestCase):
+
+    def test_parse_path(self):
+        assert parse_path('pose.pose.position') == ['pose', 'pose', 'position']
+        assert parse_path('pose.covariance[0]') == ['pose', 'covariance', 0]
+        assert parse_path('ranges[1:10:2]') == ['ranges', slice(1, 10, 2)]
+        assert parse_path('matrix[0][:2]') == ['matrix', 0, slice(None, 2)]
+        with self.assertRaises(ValueError):
+            parse_path('ranges[0')
+
+    def test_nested_field(self):
+        assert project(ODOMETRY, ['pose.pose.position']) == {'pose': {'pose': {'position': {'x': 1.0, 'y': 2.0, 'z': 0.0}}}}
+
+    def test_merged_fields(self):
+        assert project(ODOMETRY, ['header.seq', 'pose.pose.position.x', 'pose.pose.orientation.w']) == {
+            'header': {'seq': 42},
+            'pose': {'pose': {'position': {'x': 1.0}, 'orientation': {'w': 1.0}}},
+        }
+
+    def test_index_and_slice(self):
+        assert project(ODOMETRY, ['pose.covariance[0]']) == {'pose': {'covariance': 0.0}}
+        assert project(ODOMETRY, ['pose.covariance[::7]']) == {'pose': {'covariance': [0.0, 7.0, 14.0, 21.0, 28.0, 35.0]}}
+
+    def test_fields_of_list_items(self):
+        assert project(ODOMETRY, ['points[0:2].x']) == {'points': [{'x': 0}, {'x': 1}]}
+        assert project(ODOMETRY, ['points[0:2].x', 'points[0:2].y']) == {'points': [{'x': 0, 'y': 0}, {'x': 1, 'y': -1}]}
+
+    def test_missing_fields_ignored(self):
+        assert project(ODOMETRY, ['twist.twist', 'header.seq', 'points[10].x']) == {'header': {'seq': 42}}
+        assert project(ODOMETRY, ['nothing']) == {}
+
+    def test_no_projection(self):
+        assert project(ODOMETRY, None) is ODOMETRY
+        assert project(None, ['header']) is None
+
+    def test_projected_value(self):
+        for path, value in (('pose.covariance[2:6]', [2.0, 3.0, 4.0, 5.0]), ('pose.covariance[3]', 3.0),
+                            ('points[0:2].x', [0, 1]), ('header.seq', 42)):
+            assert projected_value(project(ODOMETRY, [path]), path) == value
+        with self.assertRaises(KeyError):
+            projected_value({}, 'header.seq')
+
+    def test_encode(self):
+        assert encode(ODOMETRY, fields=['header.frame_id']) == {'header': {'frame_id': 'odom'}}
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
@@ -0,0 +1,103 @@
+from __future__ import absolute_import, division
+
+import threading
+import time
+
+import six
+
+from pyros.client.capture import read_capture
+from pyros.loadgen import percentile
+
+"""
+Replay of a traffic capture against a node, real or mock, for performance regression testing on real workloads.
+Requests are issued again as they were captured, from as many threads as the capture had,
+at the original pace or faster, and the replay latencies are compared with the captured ones.
+Used by `pyros replay`.
+
+Names resolved to compact ids are replayed as captured : the replay is faithful on a node started fresh,
+that assigns the same ids in the same resolution order.
+"""
+
+
+def _replay_thread(client, records, speed, start, results):
+    for record in records:
+        delay = start + record['start'] / speed - time.time()
+        if delay > 0:
+            time.sleep(delay)
+        svc = getattr(client, record['endpoint'] + '_svc', None)
+        sent = time.time()
+        try:
+            if svc is None:
+                raise AttributeError("Node does not provide the {0} service".format(record['endpoint']))
+            if record['request_size'] is None:
+                raise ValueError("The {0} request was not captured".format(record['endpoint']))
+            client._call(svc, record['args'], record['kwargs'], **record['call_kwargs'])
+        except Exception as exc:
+            results.append((record, time.time() - sent, type(exc).__name__))
+        else:
+            results.append((record, time.time() - sent, None))
+
+
+def replay(client, records, speed=1.0):
+    """
+    Replays captured requests.
+    :param client: the PyrosClient to send the requests with
+    :param records: the captured records, as returned by read_capture
+    :param speed: the replay speed factor. 2.0 replays twice as fast as captured. 0 replays as fast as possible.
+    :return: the comparison of captured and replayed latencies, as a JSON serializable dict
+    """
+    by_thread = {}
+    for record in records:
+        by_thread.setdefault(record['thread'], []).append(record)
+
+    results = []  # list.append is atomic
+    start = time.time()
+    threads = [
+        threading.Thread(target=_replay_thread, args=(client, thread_records, speed or float('inf'), start, results))
+        for thread_records in by_thread.values()
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.time() - start
+
+    per_endpoint = {}
+    for record, duration, error in results:
+        acc = per_endpoint.setdefault(record['endpoint'], {'captured': [], 'replayed': [], 'errors': 0, 'new_errors': 0})
+        acc['captured'].append(record['duration'])
+        acc['replayed'].append(duration)
+        if error is not None:
+            acc['errors'] += 1
+            if record['error'] is None:
+                acc['new_errors'] += 1
+
+    return {
+        'requests': len(results),
+        'threads': len(threads),
+        'speed': speed,
+        'elapsed': elapsed,
+        'endpoints': dict(
+            (endpoint, _compare(acc)) for endpoint, acc in six.iteritems(per_endpoint)
+        ),
+    }
+
+
+def _compare(acc):
+    captured = sorted(acc['captured'])
+    replayed = sorted(acc['replayed'])
+    comparison = {'requests': len(replayed), 'errors': acc['errors'], 'new_errors': acc['new_errors']}
+    for pct in (50, 90, 99):
+        before, after = percentile(captured, pct), percentile(replayed, pct)
+        comparison['p{0}'.format(pct)] = {'captured': before, 'replayed': after, 'delta': after - before}
+    return comparison
+
+
+def replay_file(path, client, speed=1.0):
+    """
+    Replays a capture file. See replay().
+    The capture is read as data only, so it is safe to replay a capture from elsewhere,
+    but its requests are sent as they are : only replay against a node you can afford to modify.
+    """
+    return replay(client, list(read_capture(path)), speed)
+
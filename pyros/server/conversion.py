@@ -0,0 +1,132 @@
+from __future__ import absolute_import
+
+import collections
+import threading
+
+import six
+
+from pyros.protocol.serialized import SerializedPayload
+
+"""
+Conversion cache, on the node side.
+Converting a backend message into a transferable structure, then encoding and pickling it, is done on every
+extraction. When several clients extract the same message, the cache does it once :
+
+    def topic(self, name, msg_content=None, **encoding):
+        seq, raw = self.subscribers[name].latest()
+        return self.conversion_cache.encoded(
+            name, seq, lambda: convert(raw),
+            lambda content, **options: encode(content, stats=self.compression_stats, deltas=self.delta_encoder,
+                                              topic=name, **options),
+            **encoding
+        )
+
+Messages are identified by their topic and a sequence number, unique per topic, like the header seq.
+The converted message is kept once, with one serialized response per set of encoding options asked for.
+Delta encoded responses depend on the client : they are encoded every time, from the cached converted message.
+Memory is bounded by the size of the serialized responses, and by the number of messages :
+the least recently used messages are forgotten first.
+"""
+
+
+def _freeze(options):
+    if isinstance(options, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in six.iteritems(options)))
+    if isinstance(options, (list, tuple)):
+        return tuple(_freeze(v) for v in options)
+    return options
+
+
+class _Entry(object):
+    __slots__ = ('content', 'payloads', 'size')
+
+    def __init__(self, content):
+        self.content = content
+        self.payloads = {}  # {frozen encoding options: SerializedPayload}
+        self.size = 0
+
+
+class ConversionCache(object):
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_messages=1024):
+        """
+        :param max_bytes: the maximum total size of the serialized responses kept
+        :param max_messages: the maximum number of converted messages kept
+        """
+        self.max_bytes = max_bytes
+        self.max_messages = max_messages
+        self._entries = collections.OrderedDict()  # {(topic, seq): _Entry}, least recently used first
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.conversions = 0
+        self.serializations = 0
+        self.evictions = 0
+
+    def converted(self, topic, seq, convert):
+        """
+        :param topic: the topic name
+        :param seq: the message sequence number
+        :param convert: the function converting the message, called only if it is not in the cache
+        :return: the converted message
+        """
+        return self._entry(topic, seq, convert).content
+
+    def encoded(self, topic, seq, convert, encode, **encoding):
+        """
+        :param topic: the topic name
+        :param seq: the message sequence number
+        :param convert: the function converting the message, called only if it is not in the cache
+        :param encode: the function encoding the converted message, called with the encoding options
+        :param encoding: the encoding options of the request
+        :return: the response to send : a SerializedPayload, shared by the requests with the same options
+        """
+        entry = self._entry(topic, seq, convert)
+        if encoding.get('delta') is not None:
+            return encode(entry.content, **encoding)  # depends on what this client received before
+        key = _freeze(encoding)
+        with self._lock:
+            payload = entry.payloads.get(key)
+        if payload is not None:
+            return payload
+        payload = SerializedPayload.of(encode(entry.content, **encoding))
+        with self._lock:
+            self.serializations += 1
+            if key not in entry.payloads and self._entries.get((topic, seq)) is entry:  # not evicted meanwhile
+                entry.payloads[key] = payload
+                entry.size += len(payload)
+                self.size += len(payload)
+                self._evict()
+        return payload
+
+    def _entry(self, topic, seq, convert):
+        key = (topic, seq)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = self._entries.pop(key)  # most recently used
+                self.hits += 1
+                return entry
+        entry = _Entry(convert())  # converting without the lock : it can take a while
+        with self._lock:
+            self.conversions += 1
+            self._entries.setdefault(key, entry)
+            entry = self._entries[key]
+            self._evict()
+        return entry
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self.max_messages or self.size > self.max_bytes):
+            _, entry = self._entries.popitem(last=False)
+            self.size -= entry.size
+            self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'messages': len(self._entries),
+                'bytes': self.size,
+                'hits': self.hits,
+                'conversions': self.conversions,
+                'serializations': self.serializations,
+                'evictions': self.evictions,
+            }
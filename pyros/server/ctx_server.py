@@ -2,14 +2,153 @@ from __future__ import absolute_import
 
 import logging
 import mock
+import threading
 from collections import namedtuple
 from contextlib import contextmanager
 
 from pyros.client import PyrosClient
 import pyros.config
+from pyros.log import QueueLogging
 from pyros_interfaces_mock.pyros_mock import PyrosMock
 
 
+def _config_value(pyros_config, key, default=None):
+    # pyros_config can be a module (like pyros.config) or a namespaced dict (like the one built by pyros_start)
+    if isinstance(pyros_config, dict):
+        return pyros_config.get(key, default)
+    return getattr(pyros_config, key, default)
+
+
+def _start_queue_logging(pyros_config):
+    # before starting nodes : their processes log through the same queue
+    options = _config_value(pyros_config, 'LOG_QUEUE')
+    return QueueLogging(**options).start() if options is not None else None
+
+
+class PyrosNodePool(object):
+    """
+    Keeps pre-started, pre-configured nodes ( and their clients ) warm, to be handed out by pyros_ctx(pool=...).
+    Starting a node process and discovering its services is what costs the most when entering pyros_ctx.
+
+    Reset semantics, applied when a node is given back to the pool :
+     - 'setup' : withdraws everything the previous user exposed, and forgets memoized service responses.
+     - 'restart' : shuts the node down and starts a fresh one, in the background.
+     - None : the node is handed out again as it is.
+    If a reset fails, the node is restarted.
+    """
+
+    RESETS = ('setup', 'restart', None)
+
+    def __init__(self, size=1, name='pyros', argv=None, node_impl=PyrosMock, pyros_config=None, reset='setup'):
+        if reset not in self.RESETS:
+            raise ValueError("Unknown reset {0}. Valid resets are {1}".format(reset, self.RESETS))
+        self.size = size
+        self.name = name
+        self.argv = argv
+        self.node_impl = node_impl
+        self.pyros_config = pyros_config or pyros.config  # using internal config if no other config passed
+        self.reset = reset
+
+        self._cond = threading.Condition()
+        self._count = 0
+        self._idle = []
+        self._busy = 0
+        self._restarting = 0
+        self._queue_logging = _start_queue_logging(self.pyros_config)
+        for _ in range(size):
+            self._idle.append(self._start_node())
+
+    def _start_node(self):
+        with self._cond:
+            node_name = "{0}_{1}".format(self.name, self._count)  # node names need to be unique
+            self._count += 1
+        logging.warning("Warming up pyros {0} node {1}...".format(self.node_impl, node_name))
+        subproc = self.node_impl(node_name, self.argv).configure(self.pyros_config)
+        client_conn = subproc.start()
+        client = PyrosClient(client_conn, service_cache=_config_value(self.pyros_config, 'SERVICE_CACHE'))
+        return subproc, client
+
+    def acquire(self):
+        """
+        :return: a tuple (node, client). A new node is started if none is idle, or being restarted.
+        """
+        with self._cond:
+            while not self._idle and self._restarting:
+                self._cond.wait()  # a node being restarted is ready sooner than a new one
+            node = self._idle.pop() if self._idle else None
+            self._busy += 1
+        return node or self._start_node()
+
+    def release(self, node):
+        """
+        Resets a node and gives it back to the pool. Nodes started beyond the pool size are shut down.
+        """
+        subproc, client = node
+        with self._cond:
+            self._busy -= 1
+            keep = len(self._idle) + self._busy + self._restarting < self.size
+        if not keep:
+            client.close()
+            subproc.shutdown()
+            return
+
+        if self.reset == 'setup':
+            try:
+                client.setup(publishers=[], subscribers=[], services=[], params=[])
+                client.service_invalidate()
+            except Exception:
+                logging.warning("Resetting pyros node {0} failed, restarting it...".format(subproc), exc_info=True)
+                self._restart_later(node)
+                return
+        elif self.reset == 'restart':
+            self._restart_later(node)
+            return
+
+        with self._cond:
+            self._idle.append(node)
+            self._cond.notify_all()
+
+    def _restart_later(self, node):
+        # not on the release path : it runs when the pyros_ctx user leaves the context
+        with self._cond:
+            self._restarting += 1
+        restart = threading.Thread(target=self._restart, args=(node,), name='pyros_pool_restart')
+        restart.daemon = True
+        restart.start()
+
+    def _restart(self, old_node):
+        subproc, client = old_node
+        node = None
+        try:
+            client.close()
+            subproc.shutdown()
+            node = self._start_node()
+        except Exception:
+            logging.warning("Restarting pyros node {0} failed".format(subproc), exc_info=True)
+        with self._cond:
+            self._restarting -= 1
+            if node is not None:
+                self._idle.append(node)
+            self._cond.notify_all()
+
+    def shutdown(self):
+        with self._cond:
+            while self._restarting:
+                self._cond.wait()
+            idle, self._idle = self._idle, []
+        for subproc, client in idle:
+            client.close()
+            subproc.shutdown()
+        if self._queue_logging is not None:
+            self._queue_logging.stop()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+
 # A context manager to handle server process launch and shutdown properly.
 # It also creates a communication channel and passes it to a client.
 @contextmanager
@@ -17,7 +156,13 @@ def pyros_ctx(name='pyros',
               argv=None,  # TODO : think about passing ros arguments http://wiki.ros.org/Remapping%20Arguments
               mock_client=False,
               node_impl=PyrosMock,
-              pyros_config=None):
+              pyros_config=None,
+              pool=None):
+    """
+    :param pyros_config: the config of the node. With a LOG_QUEUE setting, this process and the node log through a queue.
+    :param pool: an optional PyrosNodePool. If passed, a warm node is taken from it instead of starting one,
+                 and given back to it on exit. name, argv, node_impl and pyros_config are then the pool's ones.
+    """
 
     pyros_config = pyros_config or pyros.config  # using internal config if no other config passed
 
@@ -29,15 +174,27 @@ def pyros_ctx(name='pyros',
         logging.warning("Setting up pyros mock client...")
         with mock.patch('pyros.client.PyrosClient', autospec=True) as client:
             yield ctx(client=client)
+    elif pool is not None:
+
+        node = pool.acquire()
+        try:
+            yield ctx(client=node[1])
+        finally:
+            pool.release(node)
     else:
 
+        queue_logging = _start_queue_logging(pyros_config)
         logging.warning("Setting up pyros {0} node...".format(node_impl))
         subproc = node_impl(name, argv).configure(pyros_config)
 
         client_conn = subproc.start()
 
         logging.warning("Setting up pyros actual client...")
-        yield ctx(client=PyrosClient(client_conn))
+        client = PyrosClient(client_conn, service_cache=_config_value(pyros_config, 'SERVICE_CACHE'))
+        yield ctx(client=client)
+        client.close()
 
     if subproc is not None:
         subproc.shutdown()
+        if queue_logging is not None:
+            queue_logging.stop()
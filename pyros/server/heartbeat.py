@@ -0,0 +1,54 @@
+from __future__ import absolute_import
+
+import os
+import time
+import uuid
+
+"""
+Heartbeat answers, on the node side.
+Nodes providing a 'heartbeat' service let clients track their liveness continuously :
+
+    def heartbeat(self):
+        return self.heart.beat()
+
+The boot_id changes every time the node process starts, so clients can detect restarts,
+even when they happen between two heartbeats.
+
+The main loop of a node serves one request at a time, and cannot answer heartbeats during a long service call.
+Nodes also answer them on a lane of their own, in a background thread, advertised by the 'heartbeat_lane' service.
+See pyros.server.lanes :
+
+    self.heart_lane = ControlLane()
+    self.heart_lane.provides(self.heart.beat, 'heartbeat')
+
+    def heartbeat_lane(self):
+        return self.heart_lane.start()
+"""
+
+
+class Heart(object):
+    def __init__(self, node_name=None, load_tracker=None):
+        """
+        :param node_name: the name of the node
+        :param load_tracker: optional pyros.server.load.LoadTracker, to advertise the node queue depth with each beat
+        """
+        self.node_name = node_name
+        self.load_tracker = load_tracker
+        self.boot_id = uuid.uuid4().hex
+        self.pid = os.getpid()
+
+    def reboot(self):
+        """To be called in the node process when it starts, if the Heart was created before forking."""
+        self.boot_id = uuid.uuid4().hex
+        self.pid = os.getpid()
+
+    def beat(self):
+        beat = {
+            'node': self.node_name,
+            'boot_id': self.boot_id,
+            'pid': self.pid,
+            'time': time.time(),
+        }
+        if self.load_tracker is not None:
+            beat['queue_depth'] = self.load_tracker.load()['queue_depth']
+        return beat
@@ -0,0 +1,112 @@
+from __future__ import absolute_import
+
+import threading
+import time
+
+from pyros.protocol.lanes import CONTROL, DATA, LaneStats, dumps_error, dumps_response, loads_request
+
+"""
+Control lane, on the node side.
+The node main loop serves one request at a time : a setup taking seconds delays every inject and extract behind it.
+The control lane serves control-plane requests on its own socket, in a background thread,
+so the main loop only serves the data-plane :
+
+    self.lanes = ControlLane()
+    for svc in (self.setup, self.topics, self.services, self.params):
+        self.lanes.provides(svc)
+    for svc in (self.topic, self.service, self.param, ...):
+        self.provides(self.lanes.timed(svc), svc.__name__)
+
+    def control_lane(self):
+        return self.lanes.start()
+
+Control-plane services are still provided on the node socket too, for older clients.
+They run concurrently with the data-plane ones, so they must be safe to do so.
+"""
+
+
+class ControlLane(object):
+    def __init__(self, bind_address='tcp://127.0.0.1', poll_interval=0.1):
+        """
+        :param bind_address: where to bind the control socket, on a random port
+        :param poll_interval: how often, in seconds, the thread checks for stop
+        """
+        self.bind_address = bind_address
+        self.poll_interval = poll_interval
+        self.endpoint = None
+        self.stats = {CONTROL: LaneStats(), DATA: LaneStats()}
+        self._providers = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def provides(self, func, name=None):
+        self._providers[name or func.__name__] = func
+
+    def timed(self, func):
+        """Wraps a data-plane service callable, to measure its latency."""
+        stats = self.stats[DATA]
+
+        def wrapper(*args, **kwargs):
+            start = time.time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                stats.count_request(time.time() - start)
+        wrapper.__name__ = getattr(func, '__name__', 'timed')
+        wrapper.__doc__ = getattr(func, '__doc__', None)
+        return wrapper
+
+    def start(self):
+        """
+        Called by the 'control_lane' node service : the lane starts on first use, in the node process.
+        :return: the endpoint to send control-plane requests to
+        """
+        with self._lock:
+            if self._thread is None:
+                import zmq
+                socket = zmq.Context.instance().socket(zmq.REP)
+                port = socket.bind_to_random_port(self.bind_address)
+                self.endpoint = '{0}:{1}'.format(self.bind_address, port)
+                self._thread = threading.Thread(target=self._run, args=(socket,), name='pyros_control_lane')
+                self._thread.daemon = True
+                self._thread.start()
+        return self.endpoint
+
+    def _run(self, socket):
+        import zmq
+        poller = zmq.Poller()
+        poller.register(socket, zmq.POLLIN)
+        try:
+            while not self._stop.is_set():
+                if not poller.poll(int(self.poll_interval * 1000)):
+                    continue
+                socket.send(self.serve(socket.recv()))
+        finally:
+            socket.close(linger=0)
+
+    def serve(self, frame):
+        """
+        :param frame: a control lane request frame
+        :return: the response frame
+        """
+        start = time.time()
+        try:
+            endpoint, args, kwargs = loads_request(frame)
+            func = self._providers.get(endpoint)
+            if func is None:
+                raise ValueError("Unknown control-plane service {0}".format(endpoint))
+            return dumps_response(func(*args, **kwargs))
+        except Exception:  # sending back all errors, and keep serving
+            return dumps_error()
+        finally:
+            self.stats[CONTROL].count_request(time.time() - start)
+
+    def lane_stats(self):
+        return dict((lane, stats.stats()) for lane, stats in self.stats.items())
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
@@ -0,0 +1,67 @@
+from __future__ import absolute_import
+
+import time
+
+"""
+Load advertisement, on the node side.
+A node serves one request per loop iteration. When requests arrive faster than it can serve them,
+they wait in the socket, and the node serves one on every iteration, without waiting for it.
+The number of consecutive requests found already waiting is the estimate of the queue depth advertised to clients,
+through the 'load' service, and with each heartbeat, which clients poll off the node main loop :
+
+    def update(self, *args, **kwargs):
+        self.load_tracker.cycle()
+        ...
+
+    def load(self):
+        return self.load_tracker.load()
+
+and every service callable is wrapped in self.load_tracker.tracked(...)
+"""
+
+
+class LoadTracker(object):
+    def __init__(self, idle_threshold=0.001, clock=None):
+        """
+        :param idle_threshold: a loop iteration that spent less than this, in seconds, outside of requests,
+                               did not wait for its request : the request was queued.
+        """
+        self._clock = clock or time.time
+        self.idle_threshold = idle_threshold
+        self._served = False  # whether a request was served during the current loop iteration
+        self._cycle_busy = 0.0
+        self._last_cycle = self._clock()
+        self.queue_depth = 0
+        self.served = 0
+        self.busy_time = 0.0
+
+    def tracked(self, func):
+        """Wraps a service callable to account for the requests it serves."""
+        def wrapper(*args, **kwargs):
+            start = self._clock()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._cycle_busy += self._clock() - start
+                self.busy_time += self._clock() - start
+                self.served += 1
+                self._served = True
+        wrapper.__name__ = getattr(func, '__name__', 'tracked')
+        wrapper.__doc__ = getattr(func, '__doc__', None)
+        return wrapper
+
+    def cycle(self):
+        """To be called once per node loop iteration, after requests have been served."""
+        now = self._clock()
+        idle = (now - self._last_cycle) - self._cycle_busy
+        self.queue_depth = self.queue_depth + 1 if self._served and idle < self.idle_threshold else 0
+        self._served = False
+        self._cycle_busy = 0.0
+        self._last_cycle = now
+
+    def load(self):
+        return {
+            'queue_depth': self.queue_depth,
+            'served': self.served,
+            'busy_time': self.busy_time,
+        }
@@ -0,0 +1,76 @@
+from __future__ import absolute_import
+
+import six
+
+from pyros.protocol.params import in_tree
+
+"""
+Batched param operations, for the 'params' service of pyros nodes.
+Loading a configuration of hundreds of params one 'param' request at a time costs one round trip per param.
+With these, the 'params' service accepts optional arguments :
+ - params() lists the exposed params, as before
+ - params(names=[...]) returns {name: value} for these params
+ - params(prefix='/robot') returns {name: value} for all exposed params in this subtree
+ - params(values={name: value}) sets all these params, or none of them
+A node runs one request at a time, so a batch is also never interleaved with other requests.
+"""
+
+
+def get_many(get, names):
+    """
+    :param get: the node function getting the value of one param
+    :param names: the names of the params to get
+    :return: a dict {name: value}
+    """
+    return dict((name, get(name)) for name in names)
+
+
+def get_tree(get, exposed, prefix):
+    """
+    :param get: the node function getting the value of one param
+    :param exposed: the names of the params exposed on the node
+    :param prefix: the subtree to get
+    :return: a dict {name: value} with all exposed params in the subtree
+    """
+    return get_many(get, [name for name in exposed if in_tree(name, prefix)])
+
+
+def set_many(get, set, values, exists=None, delete=None):
+    """
+    Sets all params, or none of them : if setting one raises, the params already set are restored, and it reraises.
+    :param get: the node function getting the value of one param
+    :param set: the node function setting the value of one param
+    :param values: a dict {name: value}
+    :param exists: the node function telling if a param exists
+    :param delete: the node function deleting a param. With exists, the params created by the batch
+                   are deleted on rollback, instead of being set to their previous value, None.
+    """
+    previous = []
+    try:
+        for name, value in six.iteritems(values):
+            previous.append((name, exists is None or exists(name), get(name)))
+            set(name, value)
+    except Exception:
+        for name, existed, value in reversed(previous):
+            if existed or delete is None:
+                set(name, value)
+            else:
+                delete(name)
+        raise
+
+
+def params_request(list_params, get, set, exposed, names=None, prefix=None, values=None, delete=None):
+    """
+    Answers a 'params' request. Nodes can implement their 'params' service with it, see PyrosScenarioMock.
+    :param list_params: the node function listing exposed params
+    :param exposed: the names of the params exposed on the node
+    :param delete: the node function deleting a param, to undo the creation of params by a failed batch
+    """
+    if values is not None:
+        set_many(get, set, values, exists=lambda name: name in exposed, delete=delete)
+        return None
+    if names is not None:
+        return get_many(get, names)
+    if prefix is not None:
+        return get_tree(get, exposed, prefix)
+    return list_params()
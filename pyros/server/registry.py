@@ -0,0 +1,45 @@
+from __future__ import absolute_import
+
+"""
+Compact ids for exposed interfaces, on the node side.
+Nodes providing a 'resolve' service let clients exchange a name for an integer id once,
+and receive that id instead of the name on every following topic / service / param call :
+
+    def resolve(self, kind, name):
+        return self.registry.resolve(kind, name) if name in self.exposed(kind) else None
+
+    def topic(self, name, msg_content=None, **kwargs):
+        name = self.registry.lookup(name)
+        ...
+"""
+
+
+class InterfaceRegistry(object):
+    def __init__(self):
+        self._ids = {}
+        self._names = []
+
+    def resolve(self, kind, name):
+        """
+        :param kind: 'topic', 'service' or 'param'
+        :param name: the name of the interface
+        :return: the integer id of the interface. It never changes for the lifetime of the registry.
+        """
+        try:
+            return self._ids[(kind, name)]
+        except KeyError:
+            key = self._ids[(kind, name)] = len(self._names)
+            self._names.append(name)
+            return key
+
+    def lookup(self, key):
+        """
+        :param key: a name, or an id returned by resolve()
+        :return: the name of the interface
+        """
+        if isinstance(key, int) and not isinstance(key, bool):
+            try:
+                return self._names[key]
+            except IndexError:
+                raise KeyError("Unknown interface id {0}".format(key))
+        return key
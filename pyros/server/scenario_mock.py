@@ -0,0 +1,331 @@
+from __future__ import absolute_import
+
+import collections
+import json
+import os
+import threading
+import time
+
+import pyzmp
+
+from pyros.protocol.compression import CompressionStats
+from pyros.protocol.delta import DeltaEncoder
+from pyros.protocol.encoding import encode
+from pyros.protocol.filters import compile_filter, first_match
+
+from .conversion import ConversionCache
+
+from .heartbeat import Heart
+from .lanes import ControlLane
+from .load import LoadTracker
+from .params import params_request
+from .registry import InterfaceRegistry
+from .throttle import make_throttle
+from .watch import ParamWatcher
+
+"""
+A scriptable mock node, to load test clients and the node request path at production scale, without ROS.
+It simulates the topics, services and params described in a scenario :
+
+{
+    "topics": [{"name": "/sensor_{i}", "count": 1000, "rate": 10, "size": 256}, {"name": "/map", "fanout": true}],
+    "services": [{"name": "/svc_{i}", "count": 100, "latency": 0.005, "size": 64}],
+    "params": [{"name": "/param_{i}", "count": 5000, "size": 16}],
+    "setup": {"latency": 0.001}
+}
+
+ - name is a template, formatted with i from 0 to count - 1 ( count defaults to 1 ).
+ - topics publish messages of size bytes at rate Hz. Messages are generated on extraction, from the current time,
+   so thousands of simulated topics cost nothing until they are extracted.
+   Injected messages are queued, and extracted before generated ones, like the echo of PyrosMock.
+ - fanout topics are extracted by many clients : every extraction gets the latest generated message,
+   converted and serialized once for all clients, by the node conversion cache. See pyros.server.conversion.
+ - services answer after latency seconds with their request, plus a payload of size bytes.
+ - params start with a value of size bytes. param(name, delete=True) deletes one.
+ - subscribers exposed with a policy push their messages through a throttle, as a ROS node would. See pyros.server.throttle.
+ - setup takes latency seconds per interface it exposes, not counting those exposed by the previous setup.
+"""
+
+
+def _expand(entries):
+    for entry in entries or []:
+        entry = dict(entry)
+        template = entry.pop('name')
+        count = entry.pop('count', 1)
+        for i in range(count):
+            yield template.format(i=i), entry
+
+
+def load_scenario(path):
+    """
+    :param path: path of a JSON scenario file
+    :return: the scenario as a dict
+    """
+    with open(path) as scenario_file:
+        scenario = json.load(scenario_file)
+    unknown = set(scenario) - {'topics', 'services', 'params', 'setup'}
+    if unknown:
+        raise ValueError("Unknown scenario sections {0}".format(sorted(unknown)))
+    return scenario
+
+
+class SimulatedTopic(object):
+    __slots__ = ('rate', 'payload', 'start', 'delivered', 'injected', 'throttle', 'policy', 'stamp', 'fanout')
+
+    # the most messages a throttled topic hands to its throttle at once, like a subscriber queue would
+    max_backlog = 1000
+
+    def __init__(self, rate=1.0, size=0, queue_size=10, fanout=False):
+        self.rate = rate
+        self.payload = 'x' * size
+        self.start = time.time()
+        self.delivered = -1
+        self.injected = collections.deque(maxlen=queue_size)
+        self.throttle = None
+        self.policy = None
+        self.stamp = self.start  # the time the message being published was published at
+        self.fanout = fanout
+
+    def throttled(self, policy):
+        """
+        :param policy: the subscriber policy declared in setup(), or None. See pyros.server.throttle.
+        """
+        if policy != self.policy:  # keeping the throttle state when the same policy is declared again
+            self.policy = policy
+            self.throttle = make_throttle(policy, clock=lambda: self.stamp) if policy is not None else None
+
+    def _message(self, seq):
+        return {'seq': seq, 'stamp': self.start + seq / self.rate, 'data': self.payload}
+
+    def latest(self, now):
+        """:return: the sequence number of the latest generated message, or None if the topic does not publish"""
+        return int((now - self.start) * self.rate) if self.rate else None
+
+    def _publish(self, now):
+        # what the backend subscriber callback would have received since the last extraction
+        while self.injected:
+            self.stamp = now
+            self.throttle.push(self.injected.popleft())
+        last = int((now - self.start) * self.rate) if self.rate else -1
+        for seq in range(max(self.delivered + 1, last + 1 - self.max_backlog), last + 1):
+            msg = self._message(seq)
+            self.stamp = msg['stamp']
+            self.throttle.push(msg)
+        self.delivered = max(self.delivered, last)
+
+    def extract(self, now):
+        if self.throttle is not None:
+            self._publish(now)
+            return self.throttle.pop()
+        if self.injected:
+            return self.injected.popleft()
+        seq = self.latest(now)
+        if seq is None or seq <= self.delivered:
+            return None  # nothing published since the last extraction
+        self.delivered = seq
+        return self._message(seq)
+
+
+class PyrosScenarioMock(pyzmp.Node):
+    """
+    Mock node simulating a scenario. Same interface as the other pyros nodes :
+    configure() it, start() it, and connect a PyrosClient to it.
+    It also provides the optional 'resolve', 'load', 'heartbeat', 'heartbeat_lane', 'param_watch' and 'control_lane'
+    services.
+    """
+    watch_poll_interval = 0.5  # seconds between checks of watched params for changes made outside of the node
+
+    def __init__(self, name='pyros_mock', argv=None, scenario=None,
+                 watch_bind_address='tcp://127.0.0.1', watch_advertise_address=None):
+        """
+        :param scenario: the scenario, as returned by load_scenario
+        :param watch_bind_address: where to bind the param watch events socket. See ParamWatcher.
+        :param watch_advertise_address: the address clients connect to for param watch events. See ParamWatcher.
+        """
+        super(PyrosScenarioMock, self).__init__(name)
+        self.argv = argv
+        self.scenario = scenario or {}
+
+        self.registry = InterfaceRegistry()
+        self.load_tracker = LoadTracker()
+        self.heart = Heart(name, self.load_tracker)
+        self.heart_lane = ControlLane()  # answering heartbeats while the main loop is busy
+        self.heart_lane.provides(self.heart.beat, 'heartbeat')
+        self.param_watcher = ParamWatcher(watch_bind_address, watch_advertise_address)
+        self._watch_polled = 0.0
+        self.compression_stats = CompressionStats()
+        self.delta_encoder = DeltaEncoder()
+        self.conversion_cache = ConversionCache()
+        self.lanes = ControlLane()
+        self.setup_latency = self.scenario.get('setup', {}).get('latency', 0.0)
+        self._setup_done = set()  # (kind, name) already exposed by a setup
+        # setup runs in the control lane thread, while the main loop extracts : guarding topics_sim and their throttles
+        self._topics_lock = threading.Lock()
+
+        self.topics_sim = dict(
+            (n, SimulatedTopic(rate=e.get('rate', 1.0), size=e.get('size', 0), fanout=e.get('fanout', False)))
+            for n, e in _expand(self.scenario.get('topics'))
+        )
+        self.services_sim = dict(
+            (n, (e.get('latency', 0.0), 'x' * e.get('size', 0)))
+            for n, e in _expand(self.scenario.get('services'))
+        )
+        self.params_sim = dict(
+            (n, 'x' * e.get('size', 0)) for n, e in _expand(self.scenario.get('params'))
+        )
+
+        for svc in (self.msg_build, self.topic, self.service, self.param, self.resolve, self.load, self.param_watch):
+            self.provides(self.load_tracker.tracked(self.lanes.timed(svc)), svc.__name__)
+        for svc in (self.setup, self.topics, self.services, self.params):
+            self.provides(self.load_tracker.tracked(svc), svc.__name__)  # for clients not using the control lane
+            self.lanes.provides(svc)
+        self.provides(self.control_lane)
+        self.provides(self.heartbeat)  # not tracked : heartbeats are not load
+        self.provides(self.heartbeat_lane)
+
+    def configure(self, config=None):
+        # Nothing to configure, everything comes from the scenario
+        return self
+
+    def update(self, *args, **kwargs):
+        if self.heart.pid != os.getpid():  # first update in the node process
+            self.heart.reboot()
+        self.load_tracker.cycle()
+        now = time.time()
+        if now - self._watch_polled >= self.watch_poll_interval:
+            self._watch_polled = now
+            self.param_watcher.poll(self.params_sim.get, list(self.params_sim))
+        return super(PyrosScenarioMock, self).update(*args, **kwargs)
+
+    def msg_build(self, connection_name):
+        name = self.registry.lookup(connection_name)
+        with self._topics_lock:
+            exposed = name in self.topics_sim
+        if exposed:
+            return {'seq': 0, 'stamp': 0.0, 'data': ''}
+        return {}
+
+    def setup(self, publishers=None, subscribers=None, services=None, params=None, subscriber_policies=None, **kwargs):
+        # Everything in the scenario is always exposed. Exposing something else creates it.
+        kinds = {'publisher': publishers, 'subscriber': subscribers, 'service': services, 'param': params}
+        requested = set((kind, name) for kind, names in kinds.items() for name in names or [])
+        if self.setup_latency:
+            # a real node waits on the ROS master the same way, for each interface it did not expose yet
+            time.sleep(self.setup_latency * len(requested - self._setup_done))
+        # kinds passed as None are left as they are
+        self._setup_done = requested | set(item for item in self._setup_done if kinds[item[0]] is None)
+        with self._topics_lock:
+            for name in (publishers or []) + (subscribers or []):
+                self.topics_sim.setdefault(name, SimulatedTopic(rate=0))
+            for name in subscribers or []:
+                self.topics_sim[name].throttled((subscriber_policies or {}).get(name))
+        for name in services or []:
+            self.services_sim.setdefault(name, (0.0, ''))
+        for name in params or []:
+            self.params_sim.setdefault(name, None)
+        return None
+
+    def topic(self, name, msg_content=None, where=None, **encoding):
+        name = self.registry.lookup(name)
+        with self._topics_lock:
+            topic = self.topics_sim.get(name)
+            if msg_content is not None:
+                if topic is None:
+                    topic = self.topics_sim[name] = SimulatedTopic(rate=0)
+                topic.injected.append(msg_content)
+                return None  # consumed
+            if topic is None:
+                return None
+            now = time.time()
+            fanout = topic.fanout and topic.throttle is None and not topic.injected
+            if not fanout:
+                msg = first_match(lambda: topic.extract(now), where) if where is not None else topic.extract(now)
+        if fanout:
+            return self._fanout(name, topic, topic.latest(now), where, **encoding)
+        return encode(msg, stats=self.compression_stats, deltas=self.delta_encoder, topic=name, **encoding)
+
+    def _fanout(self, name, topic, seq, where=None, **encoding):
+        if seq is None:
+            return None
+        convert = lambda: topic._message(seq)
+        if where is not None and not compile_filter(where)(self.conversion_cache.converted(name, seq, convert)):
+            return None
+        return self.conversion_cache.encoded(
+            name, seq, convert,
+            lambda content, **options: encode(
+                content, stats=self.compression_stats, deltas=self.delta_encoder, topic=name, **options
+            ),
+            **encoding
+        )
+
+    def service(self, name, rqst_content=None, **encoding):
+        name = self.registry.lookup(name)
+        latency, payload = self.services_sim.get(name, (0.0, ''))
+        if latency:
+            time.sleep(latency)  # a real service blocks the node the same way
+        if payload:
+            resp = {'request': rqst_content, 'data': payload}
+        else:
+            resp = rqst_content  # echo, like PyrosMock
+        return encode(resp, stats=self.compression_stats, **encoding)
+
+    def _set_param(self, name, value, source):
+        old = self.params_sim.get(name)
+        self.params_sim[name] = value
+        self.param_watcher.changed(name, old, value, source)
+
+    def _delete_param(self, name, source):
+        old = self.params_sim.pop(name, None)
+        self.param_watcher.changed(name, old, None, source)
+
+    def param(self, name, value=None, delete=False, **encoding):
+        name = self.registry.lookup(name)
+        if delete:
+            self._delete_param(name, 'param')
+            return None
+        if value is not None:
+            self._set_param(name, value, 'param')
+            return None  # set
+        return encode(self.params_sim.get(name), stats=self.compression_stats, **encoding)
+
+    # listings run in the control lane thread, while the main loop may add interfaces : iterating on copies
+    def topics(self):
+        with self._topics_lock:
+            return dict((n, {'rate': t.rate}) for n, t in self.topics_sim.items())
+
+    def services(self):
+        return dict((n, {'latency': l}) for n, (l, _) in list(self.services_sim.items()))
+
+    def params(self, names=None, prefix=None, values=None):
+        return params_request(
+            lambda: dict((n, {}) for n in list(self.params_sim)), self.params_sim.get,
+            lambda n, v: self._set_param(n, v, 'params'), self.params_sim, names=names, prefix=prefix, values=values,
+            delete=lambda n: self._delete_param(n, 'params'),
+        )
+
+    def resolve(self, kind, name):
+        exposed = {'topic': self.topics_sim, 'service': self.services_sim, 'param': self.params_sim}.get(kind, {})
+        return self.registry.resolve(kind, name) if name in exposed else None
+
+    def param_watch(self, prefix, watch=True):
+        if watch:
+            return self.param_watcher.watch(prefix)
+        self.param_watcher.unwatch(prefix)
+        return self.param_watcher.endpoint
+
+    def control_lane(self):
+        return self.lanes.start()
+
+    def load(self):
+        load = self.load_tracker.load()
+        load['compression'] = self.compression_stats.stats()
+        load['delta'] = self.delta_encoder.stats()
+        load['conversion'] = self.conversion_cache.stats()
+        load['lanes'] = self.lanes.lane_stats()
+        return load
+
+    def heartbeat(self):
+        return self.heart.beat()
+
+    def heartbeat_lane(self):
+        return self.heart_lane.start()
@@ -0,0 +1,106 @@
+from __future__ import absolute_import
+
+import pickle
+import unittest
+
+from pyros.protocol.compression import CompressedPayload, decompress
+from pyros.protocol.delta import DeltaDecoder, DeltaEncoder
+from pyros.protocol.encoding import encode
+from pyros.protocol.serialized import SerializedPayload
+from pyros.server.conversion import ConversionCache
+
+
+class TestSerializedPayload(unittest.TestCase):
+
+    def test_unpickled_as_content(self):
+        content = {'data': [1, 2, 3], 'frame_id': 'map'}
+        payload = SerializedPayload.of(content)
+        assert pickle.loads(pickle.dumps(payload, pickle.HIGHEST_PROTOCOL)) == content
+        assert len(payload) == len(pickle.dumps(content, pickle.HIGHEST_PROTOCOL))
+
+
+class TestConversionCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = ConversionCache()
+        self.converted = []
+
+    def convert(self, seq):
+        def convert():
+            self.converted.append(seq)
+            return {'seq': seq, 'data': 'x' * 100}
+        return convert
+
+    def extract(self, seq, topic='/scan', **encoding):
+        payload = self.cache.encoded(topic, seq, self.convert(seq), encode, **encoding)
+        return pickle.loads(pickle.dumps(payload, pickle.HIGHEST_PROTOCOL))  # as the client gets it
+
+    def test_converted_once(self):
+        for _ in range(5):
+            assert self.extract(1) == {'seq': 1, 'data': 'x' * 100}
+        assert self.converted == [1]
+        stats = self.cache.stats()
+        assert stats['hits'] == 4
+        assert stats['conversions'] == 1
+        assert stats['serializations'] == 1
+
+    def test_keyed_by_topic_and_seq(self):
+        self.extract(1)
+        self.extract(2)
+        self.extract(1, topic='/other')
+        assert self.converted == [1, 2, 1]
+        assert self.cache.converted('/scan', 2, self.convert(2)) == {'seq': 2, 'data': 'x' * 100}
+        assert self.converted == [1, 2, 1]
+
+    def test_one_serialization_per_options(self):
+        assert self.extract(1, fields=['seq']) == {'seq': 1}
+        assert self.extract(1) == {'seq': 1, 'data': 'x' * 100}
+        assert self.extract(1, fields=['seq']) == {'seq': 1}
+        assert self.converted == [1]
+        assert self.cache.stats()['serializations'] == 2
+
+    def test_compressed(self):
+        compress = {'codecs': ['zlib'], 'threshold': 10}
+        res = self.extract(1, compress=compress)
+        assert isinstance(res, CompressedPayload)
+        assert decompress(res) == {'seq': 1, 'data': 'x' * 100}
+        assert decompress(self.extract(1, compress=compress)) == decompress(res)
+        assert self.cache.stats()['serializations'] == 1
+
+    def test_delta_not_shared(self):
+        deltas = DeltaEncoder()
+
+        def encode_delta(content, **options):
+            return encode(content, deltas=deltas, topic='/scan', **options)
+        first, second = DeltaDecoder('first'), DeltaDecoder('second')
+        for decoder in (first, second, first):
+            frame = self.cache.encoded('/scan', 1, self.convert(1), encode_delta, delta=decoder.request('/scan'))
+            assert decoder.decode('/scan', frame) == {'seq': 1, 'data': 'x' * 100}
+        assert deltas.stats()['keyframes'] == 2
+        assert self.converted == [1]
+        assert self.cache.stats()['serializations'] == 0
+
+    def test_bounded_messages(self):
+        self.cache.max_messages = 2
+        for seq in (1, 2, 1, 3):
+            self.extract(seq)
+        self.extract(1)  # most recently used : kept
+        self.extract(2)  # evicted
+        assert self.converted == [1, 2, 3, 2]
+        assert self.cache.stats()['messages'] == 2
+
+    def test_bounded_bytes(self):
+        size = len(SerializedPayload.of({'seq': 1, 'data': 'x' * 100}))
+        self.cache.max_bytes = size * 2
+        for seq in (1, 2, 3):
+            self.extract(seq)
+        stats = self.cache.stats()
+        assert stats['messages'] == 2
+        assert stats['bytes'] == size * 2
+        assert stats['evictions'] == 1
+        self.extract(1)
+        assert self.converted == [1, 2, 3, 1]
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
@@ -0,0 +1,87 @@
+from __future__ import absolute_import
+
+import time
+import unittest
+
+import pyzmp
+
+from pyros.client.lanes import ControlLaneClient
+from pyros.protocol.lanes import CONTROL, DATA, LaneStats, dumps_request, lane_of, loads_response
+from pyros.server.lanes import ControlLane
+
+
+class TestLanes(unittest.TestCase):
+
+    def test_lane_of(self):
+        assert lane_of('setup') == CONTROL
+        assert lane_of('topics') == CONTROL
+        assert lane_of('params') == CONTROL
+        assert lane_of('params', {'names': ['/a']}) == DATA  # batched param get
+        assert lane_of('topic') == DATA
+        assert lane_of('service', {'fields': ['a']}) == DATA
+
+    def test_lane_stats(self):
+        stats = LaneStats(window=100)
+        assert stats.stats() == {'count': 0, 'mean': None, 'max': 0.0, 'p50': None, 'p99': None}
+        for ms in range(1, 201):
+            stats.count_request(ms / 1000.0)
+        res = stats.stats()
+        assert res['count'] == 200
+        assert res['max'] == 0.2
+        assert res['p50'] == 0.151  # on the last 100 only
+        assert res['p99'] == 0.2
+
+
+class TestControlLane(unittest.TestCase):
+    def setUp(self):
+        self.lane = ControlLane()
+        self.lane.provides(lambda names=None: sorted(names or []), 'topics')
+        self.lane.provides(self.slow_setup, 'setup')
+
+    def tearDown(self):
+        self.lane.stop()
+
+    def slow_setup(self, delay=0.0):
+        time.sleep(delay)
+        return delay
+
+    def test_serve(self):
+        assert loads_response(self.lane.serve(dumps_request('topics', kwargs={'names': ['b', 'a']}))) == ['a', 'b']
+        assert self.lane.lane_stats()[CONTROL]['count'] == 1
+
+    def test_errors_sent_back(self):
+        with self.assertRaises(ValueError):
+            loads_response(self.lane.serve(dumps_request('unknown')))
+        with self.assertRaises(TypeError):
+            loads_response(self.lane.serve(dumps_request('topics', args=(1, 2, 3))))
+
+    def test_timed(self):
+        echo = self.lane.timed(lambda msg: msg)
+        assert echo('data') == 'data'
+        assert self.lane.lane_stats()[DATA]['count'] == 1
+        assert self.lane.lane_stats()[CONTROL]['count'] == 0
+
+    def test_client(self):
+        client = ControlLaneClient(self.lane.start())
+        try:
+            assert client.call('topics', kwargs={'names': ['b', 'a']}) == ['a', 'b']
+            with self.assertRaises(ValueError):
+                client.call('unknown')
+            assert client.call('setup') == 0.0
+        finally:
+            client.close()
+
+    def test_client_timeout(self):
+        client = ControlLaneClient(self.lane.start())
+        try:
+            with self.assertRaises(pyzmp.service.ServiceCallTimeout):
+                client.call('setup', kwargs={'delay': 0.3}, recv_timeout=50)
+            time.sleep(0.3)
+            assert client.call('setup') == 0.0  # usable again
+        finally:
+            client.close()
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
@@ -0,0 +1,40 @@
+from __future__ import absolute_import
+
+import unittest
+
+from pyros.server.load import LoadTracker
+from pyros.testing import FakeClock
+
+
+class TestLoadTracker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.tracker = LoadTracker(idle_threshold=0.001, clock=self.clock)
+
+        def service(x):
+            self.clock.now += 0.01  # serving takes time
+            return x
+        self.service = self.tracker.tracked(service)
+
+    def test_waited_requests_are_not_queued(self):
+        for _ in range(3):
+            self.clock.now += 0.05  # the node waited for the request
+            assert self.service(42) == 42
+            self.tracker.cycle()
+        assert self.tracker.load()['queue_depth'] == 0
+        assert self.tracker.load()['served'] == 3
+
+    def test_queued_requests(self):
+        for _ in range(3):
+            self.service(42)  # the request was already there
+            self.tracker.cycle()
+        assert self.tracker.load()['queue_depth'] == 3
+        self.clock.now += 0.1
+        self.tracker.cycle()  # idle iteration : the backlog is gone
+        assert self.tracker.load()['queue_depth'] == 0
+
+
+if __name__ == '__main__':
+
+    import nose
+    nose.runmodule()
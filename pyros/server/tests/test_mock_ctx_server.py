@@ -1,7 +1,12 @@
 from __future__ import absolute_import
 
+import logging
+
+import mock
+
 from pyros.client.client import PyrosClient
-from pyros.server.ctx_server import pyros_ctx
+from pyros.log import DroppingQueueHandler
+from pyros.server.ctx_server import pyros_ctx, PyrosNodePool
 from pyros_interfaces_mock import PyrosMock
 
 
@@ -12,6 +17,51 @@ def testPyrosMockCtx():
     # TODO : assert the context manager does his job ( HOW ? )
 
 
+def testPyrosMockCtxLogQueue():
+    logger = logging.getLogger('pyros.test_ctx')
+    with pyros_ctx(node_impl=PyrosMock, pyros_config={'LOG_QUEUE': {'loggers': ['pyros.test_ctx']}}):
+        assert [type(h) for h in logger.handlers] == [DroppingQueueHandler]
+    assert logger.handlers == []
+
+
+def testPyrosMockCtxPool():
+    with PyrosNodePool(size=1, node_impl=PyrosMock) as pool:
+        with pyros_ctx(pool=pool) as ctx:
+            assert isinstance(ctx.client, PyrosClient)
+            first_client = ctx.client
+
+        # the same warm node and client are handed out again
+        with pyros_ctx(pool=pool) as ctx:
+            assert ctx.client is first_client
+
+
+def testPyrosMockCtxPoolRestart():
+    with PyrosNodePool(size=1, node_impl=PyrosMock, reset='restart') as pool:
+        with pyros_ctx(pool=pool) as ctx:
+            first_client = ctx.client
+        # the node is restarted in the background, and handed out once started
+        with pyros_ctx(pool=pool) as ctx:
+            assert isinstance(ctx.client, PyrosClient)
+            assert ctx.client is not first_client
+        assert pool._count == 2
+
+
+def testPyrosMockCtxPoolClosesClients():
+    with mock.patch.object(PyrosClient, 'close', autospec=True, side_effect=PyrosClient.close) as close:
+        with PyrosNodePool(size=1, node_impl=PyrosMock, reset='restart') as pool:
+            with pyros_ctx(pool=pool) as ctx:
+                first_client = ctx.client
+                with pyros_ctx(pool=pool) as extra:  # beyond the pool size
+                    extra_client = extra.client
+                assert [c[0][0] for c in close.call_args_list] == [extra_client]
+            with pyros_ctx(pool=pool) as ctx:  # once the first node is restarted
+                last_client = ctx.client
+        # the clients of the restarted nodes, then the idle one, when the pool shuts down
+        closed = [c[0][0] for c in close.call_args_list]
+        assert closed[:3] == [extra_client, first_client, last_client]
+        assert len(closed) == 4 and closed[3] not in closed[:3]
+
+
 if __name__ == '__main__':
 
     import nose
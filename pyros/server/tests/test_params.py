@@ -0,0 +1,62 @@
+from __future__ import absolute_import
+
+import unittest
+
+from pyros.protocol.params import in_tree
+from pyros.server.params import params_request
+
+
+class FailingParams(dict):
+    """Params of a node, refusing some values."""
+    def set(self, name, value):
+        if value == 'invalid':
+            raise ValueError(value)
+        self[name] = value
+
+
+class TestParamsBatch(unittest.TestCase):
+    def setUp(self):
+        self.params = FailingParams({'/robot/arm/length': 1.2, '/robot/name': 'r2', '/robot2/name': 'c3'})
+
+    def request(self, **batch):
+        return params_request(
+            lambda: sorted(self.params), self.params.get, self.params.set, list(self.params),
+            delete=self.params.pop, **batch
+        )
+
+    def test_in_tree(self):
+        assert in_tree('/robot/arm', '/robot')
+        assert in_tree('/robot', '/robot/')
+        assert not in_tree('/robot2', '/robot')
+        assert in_tree('/anything', '/')
+
+    def test_list(self):
+        assert self.request() == sorted(self.params)
+
+    def test_get_many(self):
+        assert self.request(names=['/robot/name', '/robot2/name']) == {'/robot/name': 'r2', '/robot2/name': 'c3'}
+
+    def test_get_tree(self):
+        assert self.request(prefix='/robot') == {'/robot/arm/length': 1.2, '/robot/name': 'r2'}
+
+    def test_set_many(self):
+        assert self.request(values={'/robot/name': 'r3', '/robot2/name': 'c4'}) is None
+        assert self.params['/robot/name'] == 'r3'
+        assert self.params['/robot2/name'] == 'c4'
+
+    def test_set_many_atomic(self):
+        before = dict(self.params)
+        with self.assertRaises(ValueError):
+            self.request(values={'/robot/name': 'r3', '/robot/arm/length': 'invalid', '/robot2/name': 'c4'})
+        assert self.params == before
+
+    def test_set_many_atomic_deletes_created(self):
+        before = dict(self.params)
+        with self.assertRaises(ValueError):
+            self.request(values={'/robot/new': 0, '/robot/name': 'invalid'})
+        assert self.params == before
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
@@ -0,0 +1,33 @@
+from __future__ import absolute_import
+
+import unittest
+
+from pyros.server.registry import InterfaceRegistry
+
+
+class TestInterfaceRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = InterfaceRegistry()
+
+    def test_resolve_is_stable(self):
+        key = self.registry.resolve('topic', '/chatter')
+        assert isinstance(key, int)
+        assert self.registry.resolve('topic', '/chatter') == key
+        assert self.registry.resolve('service', '/chatter') != key
+
+    def test_lookup(self):
+        topic_key = self.registry.resolve('topic', '/chatter')
+        param_key = self.registry.resolve('param', '/rate')
+        assert self.registry.lookup(topic_key) == '/chatter'
+        assert self.registry.lookup(param_key) == '/rate'
+        assert self.registry.lookup('/other') == '/other'  # names pass through
+
+    def test_unknown_id(self):
+        with self.assertRaises(KeyError):
+            self.registry.lookup(42)
+
+
+if __name__ == '__main__':
+
+    import nose
+    nose.runmodule()
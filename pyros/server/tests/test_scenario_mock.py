@@ -0,0 +1,502 @@
+from __future__ import absolute_import
+
+import threading
+import time
+import unittest
+
+import pyzmp
+
+from pyros.client.client import PyrosClient, PyrosServiceOverloaded
+from pyros.server.scenario_mock import PyrosScenarioMock, SimulatedTopic
+
+SCENARIO = {
+    'topics': [{'name': '/sensor_{i}', 'count': 100, 'rate': 100, 'size': 64}],
+    'services': [{'name': '/slow_service', 'latency': 0.05}],
+    'params': [{'name': '/param_{i}', 'count': 10, 'size': 4}, {'name': '/map', 'size': 100000}],
+    'setup': {'latency': 0.01},
+}
+
+
+class TestSimulatedTopic(unittest.TestCase):
+
+    def drain(self, topic, now):
+        msgs = []
+        msg = topic.extract(now)
+        while msg is not None:
+            msgs.append(msg)
+            msg = topic.extract(now)
+        return msgs
+
+    def test_latest_generated(self):
+        topic = SimulatedTopic(rate=100)
+        assert [msg['seq'] for msg in self.drain(topic, topic.start + 0.995)] == [99]
+        assert topic.extract(topic.start + 0.995) is None  # nothing new published yet
+        assert topic.extract(topic.start + 1.005)['seq'] == 100
+
+    def test_throttled_generated(self):
+        topic = SimulatedTopic(rate=100)
+        topic.throttled({'policy': 'every_nth', 'n': 10, 'queue_size': 20})
+        assert [msg['seq'] for msg in self.drain(topic, topic.start + 0.995)] == list(range(9, 100, 10))
+        assert topic.throttle.received == 100
+        topic.throttled({'policy': 'every_nth', 'n': 10, 'queue_size': 20})  # same policy : same throttle
+        assert topic.throttle.received == 100
+        topic.throttled(None)
+        assert topic.throttle is None
+
+
+class RecordingSocket(object):
+    def __init__(self):
+        self.sent = []
+
+    def send_multipart(self, frames):
+        self.sent.append(frames)
+
+
+class TestScenarioMockWatch(unittest.TestCase):
+
+    def test_poll_on_update(self):
+        node = PyrosScenarioMock(scenario={'params': [{'name': '/param_{i}', 'count': 2, 'size': 1}]})
+        node.watch_poll_interval = 0
+        node.param_watcher._socket = socket = RecordingSocket()  # no zmq needed, the node is not started
+        node.param_watch('/param_0')
+        node.update()  # first values seen
+        node.params_sim['/param_0'] = 'external'
+        node.params_sim['/param_1'] = 'external'
+        node.update()
+        assert [frames[0] for frames in socket.sent] == [b'/param_0']
+
+
+class BlockingThrottle(object):
+    """Keeps the first message pushed until released, to interleave a setup with an extraction."""
+    def __init__(self):
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        self.msg = None
+
+    def push(self, msg):
+        if not self.entered.is_set():
+            self.entered.set()
+            self.release.wait(5)
+        self.msg = msg
+
+    def pop(self):
+        return self.msg
+
+
+class TestScenarioMockSetupConcurrency(unittest.TestCase):
+
+    def test_setup_while_extracting(self):
+        node = PyrosScenarioMock(scenario={'topics': [{'name': '/imu', 'rate': 100}]})  # not started
+        topic = node.topics_sim['/imu']
+        topic.start -= 1  # messages to publish
+        topic.policy, topic.throttle = {'policy': 'blocking'}, BlockingThrottle()
+        throttle = topic.throttle
+        results = []
+
+        def run(func, *args, **kwargs):
+            try:
+                results.append(func(*args, **kwargs))
+            except Exception as exc:
+                results.append(exc)
+
+        extract = threading.Thread(target=run, args=(node.topic, '/imu'))  # as the main loop does
+        extract.start()
+        assert throttle.entered.wait(5)
+        setup = threading.Thread(target=run, args=(node.setup,), kwargs={'subscribers': ['/imu', '/new']})
+        setup.start()  # as the control lane thread does
+        setup.join(0.2)
+        throttle.release.set()
+        extract.join()
+        setup.join()
+        assert not [r for r in results if isinstance(r, Exception)]
+        assert topic.throttle is None  # the policy was dropped after the extraction
+        assert '/new' in node.topics()
+
+
+class OlderScenarioMock(PyrosScenarioMock):
+    """Like a node from before encoding options : its topic and param services take none."""
+    def topic(self, name, msg_content=None):
+        return super(OlderScenarioMock, self).topic(name, msg_content)
+
+    def param(self, name, value=None):
+        return super(OlderScenarioMock, self).param(name, value)
+
+    def service(self, name, rqst_content=None, **encoding):
+        if rqst_content == 'bad':
+            raise TypeError("bad request type")
+        return super(OlderScenarioMock, self).service(name, rqst_content, **encoding)
+
+
+class TestOlderNode(unittest.TestCase):
+    def setUp(self):
+        self.node = OlderScenarioMock('pyros_older_mock', scenario=SCENARIO)
+        self.node.start()
+        self.client = PyrosClient('pyros_older_mock', compression=True)
+
+    def tearDown(self):
+        self.client.close()
+        self.node.shutdown()
+
+    def test_options_dropped(self):
+        assert self.client.param_get('/param_0') == 'xxxx'
+        for level in (0, 2):
+            assert self.client.topic_inject('/diagnostics', level=level, name='motor')
+        # projected and filtered here
+        assert self.client.topic_extract('/diagnostics', fields=['name'], where=['>=', 'level', 2]) == {'name': 'motor'}
+        assert self.client._node_lacks == set([
+            ('param', 'compress'), ('topic', 'compress'), ('topic', 'fields'), ('topic', 'where'),
+        ])
+        assert self.client.param_get('/param_1') == 'xxxx'  # without trying again
+
+    def test_service_errors_raised(self):
+        with self.assertRaises(TypeError):  # not an option the node rejected : not sent again without options
+            self.client.service_call('/slow_service', 'bad', _fields=['data'])
+        assert self.client._node_lacks == set()
+        assert self.client.service_call('/slow_service', {'data': 'x'}, _fields=['data']) == {'data': 'x'}
+
+
+class TestFanoutTopic(unittest.TestCase):
+    def setUp(self):
+        # one message every 100 s : all extractions in the test get message 0
+        self.node = PyrosScenarioMock('pyros_fanout_mock', scenario={
+            'topics': [{'name': '/scan', 'rate': 0.01, 'size': 100000, 'fanout': True}],
+        })
+        self.node.start()
+        self.clients = [PyrosClient('pyros_fanout_mock') for _ in range(3)]
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close()
+        self.node.shutdown()
+
+    def conversion_stats(self):
+        return pyzmp.Service.discover('load').call(node='pyros_fanout_mock')['conversion']
+
+    def test_converted_once_for_all_clients(self):
+        for client in self.clients:
+            for _ in range(2):
+                msg = client.topic_extract('/scan')
+                assert msg['seq'] == 0 and len(msg['data']) == 100000
+        stats = self.conversion_stats()
+        assert stats['conversions'] == 1
+        assert stats['serializations'] == 1
+        assert stats['hits'] == 5
+
+        compressed = PyrosClient('pyros_fanout_mock', compression=True)
+        try:
+            assert compressed.topic_extract('/scan')['seq'] == 0
+        finally:
+            compressed.close()
+        stats = self.conversion_stats()
+        assert stats['conversions'] == 1
+        assert stats['serializations'] == 2  # one per set of encoding options
+
+    def test_filter_and_injected(self):
+        assert self.clients[0].topic_extract('/scan', where=['>', 'seq', 0]) is None
+        assert self.clients[0].topic_extract('/scan', fields=['seq']) == {'seq': 0}
+        assert self.clients[0].topic_inject('/scan', seq=42)
+        assert self.clients[1].topic_extract('/scan') == {'seq': 42}  # injected messages are queued, as on other topics
+        assert self.clients[2].topic_extract('/scan')['seq'] == 0
+
+
+class StrictScenarioMock(PyrosScenarioMock):
+    """Refuses param values that are not strings, like a node with typed params."""
+    def _set_param(self, name, value, source):
+        if not isinstance(value, str):
+            raise TypeError("param value must be a string")
+        super(StrictScenarioMock, self)._set_param(name, value, source)
+
+
+class TestRejectedBatch(unittest.TestCase):
+    def setUp(self):
+        self.node = StrictScenarioMock('pyros_strict_mock', scenario=SCENARIO)
+        self.node.start()
+        self.client = PyrosClient('pyros_strict_mock')
+
+    def tearDown(self):
+        self.client.close()
+        self.node.shutdown()
+
+    def test_batch_not_replayed(self):
+        with self.assertRaises(TypeError):
+            self.client.param_set_many({'/param_0': 'a', '/param_1': 1})
+        assert self.client._batch_params  # the node supports batches, it refused the values
+        assert self.client.param_get_many(['/param_0', '/param_1']) == {'/param_0': 'xxxx', '/param_1': 'xxxx'}
+
+
+class TestBusyNode(unittest.TestCase):
+    def setUp(self):
+        self.node = PyrosScenarioMock('pyros_busy_mock', scenario={
+            'services': [{'name': '/long_service', 'latency': 1.5}],
+            'params': [{'name': '/param', 'size': 4}],
+        })
+        self.node.start()
+        self.client = PyrosClient('pyros_busy_mock', heartbeat_interval=0.2, heartbeat_max_missed=2)
+
+    def tearDown(self):
+        self.client.close()
+        self.node.shutdown()
+
+    def test_alive_during_long_call(self):
+        deadline = time.time() + 5
+        while self.client.liveness.boot_id is None and time.time() < deadline:  # until the first heartbeat
+            time.sleep(0.05)
+        other = PyrosClient('pyros_busy_mock')
+        try:
+            call = threading.Thread(target=other.service_call, args=('/long_service', {'data': 'x'}))
+            call.start()
+            alive = []
+            while call.is_alive():
+                alive.append(self.client.liveness.alive)
+                time.sleep(0.05)
+            call.join()
+        finally:
+            other.close()
+        assert all(alive)  # heartbeats are answered off the main loop
+        assert self.client.param_get('/param') == 'xxxx'
+        assert self.client.resolve_epoch == 0  # no restart
+
+
+class QueuedScenarioMock(PyrosScenarioMock):
+    """A node always advertising a deep queue."""
+    def __init__(self, *args, **kwargs):
+        super(QueuedScenarioMock, self).__init__(*args, **kwargs)
+        self.heart_lane.provides(lambda: dict(self.heart.beat(), queue_depth=5), 'heartbeat')
+
+
+class TestQueuedNode(unittest.TestCase):
+    def setUp(self):
+        self.node = QueuedScenarioMock('pyros_queued_mock', scenario={'params': [{'name': '/param', 'size': 4}]})
+        self.node.start()
+        self.client = PyrosClient('pyros_queued_mock', admission={'max_node_queue': 2}, load_interval=0.1)
+
+    def tearDown(self):
+        self.client.close()
+        self.node.shutdown()
+
+    def test_refused_from_heartbeat_queue_depth(self):
+        deadline = time.time() + 5
+        while self.client._load_monitor.boot_id is None and time.time() < deadline:  # until the first heartbeat
+            time.sleep(0.05)
+        with self.assertRaises(PyrosServiceOverloaded):
+            self.client.param_get('/param')
+
+
+class TestPyrosScenarioMock(unittest.TestCase):
+    def setUp(self):
+        self.node = PyrosScenarioMock('pyros_scenario_mock', scenario=SCENARIO)
+        self.node.start()
+        self.client = PyrosClient('pyros_scenario_mock')
+
+    def tearDown(self):
+        self.client.close()
+        self.node.shutdown()
+
+    def test_listings(self):
+        assert len(self.client.topics()) == 100
+        assert '/slow_service' in self.client.services()
+        assert len(self.client.params()) == 11
+
+    def test_published_messages(self):
+        time.sleep(0.05)
+        msg = self.client.topic_extract('/sensor_42')
+        assert msg['data'] == 'x' * 64
+
+    def test_inject_extract_echo(self):
+        assert self.client.topic_inject('/sensor_0', data='data_string')
+        assert self.client.topic_extract('/sensor_0') == {'data': 'data_string'}
+
+    def test_subscriber_policies(self):
+        self.client.setup(subscribers=['/imu', '/odom', '/wrench'], subscriber_policies={
+            '/imu': {'policy': 'every_nth', 'n': 3},
+            '/odom': {'policy': 'latest'},
+            '/wrench': {'policy': 'mean', 'window': 4, 'fields': ['force']},
+        })
+        for i in range(9):
+            for name in ('/imu', '/odom', '/wrench'):
+                assert self.client.topic_inject(name, seq=i, force=float(i))
+        assert self.client.topic_extract('/imu')['seq'] == 2
+        assert self.client.topic_extract('/imu')['seq'] == 5
+        assert self.client.topic_extract('/imu')['seq'] == 8
+        assert self.client.topic_extract('/imu') is None  # dropped
+        assert self.client.topic_extract('/odom')['seq'] == 8
+        assert self.client.topic_extract('/odom') is None
+        assert self.client.topic_extract('/wrench') == {'seq': 3, 'force': 1.5}  # coalesced
+        assert self.client.topic_extract('/wrench') == {'seq': 7, 'force': 5.5}
+        assert self.client.topic_extract('/wrench') is None
+
+    def test_subscriber_filter(self):
+        self.client.setup(subscribers=['/diagnostics'], subscriber_policies={
+            '/diagnostics': {'policy': 'all', 'filter': ['>=', 'level', 2]},
+        })
+        for level in (0, 2, 1, 3):
+            assert self.client.topic_inject('/diagnostics', level=level)
+        assert self.client.topic_extract('/diagnostics') == {'level': 2}
+        assert self.client.topic_extract('/diagnostics') == {'level': 3}
+        assert self.client.topic_extract('/diagnostics') is None  # dropped before the policy
+
+    def test_fields_projection(self):
+        time.sleep(0.05)
+        assert self.client.topic_extract('/sensor_1', fields=['seq', 'data[0:3]']).get('data') == 'xxx'
+        assert self.client.service_call('/slow_service', _fields=['b'], a=1, b=2) == {'b': 2}
+
+    def test_extract_array(self):
+        client = PyrosClient('pyros_scenario_mock', numpy_arrays=True)
+        try:
+            for i in range(3):
+                assert client.topic_inject('/sensor_5', ranges=[float(i + r) for r in range(100)])
+                arrays = client.topic_extract_array('/sensor_5', ['ranges[5:10]'], n=2)
+            assert arrays['ranges[5:10]'].tolist() == [[6.0, 7.0, 8.0, 9.0, 10.0], [7.0, 8.0, 9.0, 10.0, 11.0]]
+        finally:
+            client.close()
+
+    def test_filter(self):
+        for level in (0, 1, 2, 0, 3):
+            assert self.client.topic_inject('/sensor_2', level=level)
+        assert self.client.topic_extract('/sensor_2', where=['>=', 'level', 2]) == {'level': 2}
+        assert self.client.topic_extract('/sensor_2', where=['>=', 'level', 2]) == {'level': 3}
+        assert self.client.topic_extract('/sensor_2', where=['==', 'seq', -1]) is None
+
+    def test_compression(self):
+        client = PyrosClient('pyros_scenario_mock', compression={'threshold': 1024})
+        try:
+            assert client.param_get('/map') == 'x' * 100000
+            assert client.param_get('/param_0') == 'xxxx'
+            assert client.compression_stats.stats()['messages'] == 1
+            assert client.compression_stats.stats()['ratio'] > 10
+        finally:
+            client.close()
+
+    def test_delta_topic(self):
+        client = PyrosClient('pyros_scenario_mock', delta_topics=['/sensor_3'], keyframe_interval=3)
+        try:
+            cells = [0] * 10000
+            for i in range(4):
+                cells[i] = 100
+                assert client.topic_inject('/sensor_3', {'info': {'width': 100}, 'data': list(cells)})
+                assert client.topic_extract('/sensor_3') == {'info': {'width': 100}, 'data': cells}
+            load = pyzmp.Service.discover('load').call(node='pyros_scenario_mock')
+            assert load['delta'] == {'keyframes': 2, 'deltas': 2, 'entries': 1}
+        finally:
+            client.close()
+
+    def inject_latencies(self, client, duration):
+        latencies = []
+        end = time.time() + duration
+        while time.time() < end:
+            start = time.time()
+            client.topic_inject('/sensor_4', data='data_string')
+            latencies.append(time.time() - start)
+        return latencies
+
+    def slow_setup_inject_latency(self, client):
+        setup = threading.Thread(target=client.setup, kwargs={'publishers': ['/new_{0}'.format(i) for i in range(100)]})
+        setup.start()  # takes 1 s on the node
+        time.sleep(0.1)
+        latencies = self.inject_latencies(client, 0.6)
+        setup.join()
+        return max(latencies)
+
+    # the thresholds leave a wide margin around the 1 s setup, for slow test machines
+    def test_control_lane(self):
+        assert self.slow_setup_inject_latency(self.client) < 0.5
+        assert self.client.lane_stats['control'].stats()['max'] >= 1.0
+        assert '/new_99' in self.client.topics()
+        lanes = self.client._call(pyzmp.Service.discover('load'))['lanes']
+        assert lanes['control']['count'] == 2
+        assert lanes['data']['count'] > 0
+
+    def test_without_control_lane(self):
+        client = PyrosClient('pyros_scenario_mock', control_lane=False)
+        try:
+            assert self.slow_setup_inject_latency(client) >= 0.5  # injects wait for the setup
+        finally:
+            client.close()
+
+    def test_setup_async(self):
+        names = ['/new_{0}'.format(i) for i in range(100)]
+        start = time.time()
+        handle = self.client.setup_async(publishers=names, batch_size=10)
+        assert handle.wait(['/new_42'], timeout=1)
+        assert time.time() - start < 0.6  # first batch only, not the 1 s of the whole setup
+        assert self.client.topic_inject('/new_42', data='data_string')
+        assert self.client.topic_extract('/new_42') == {'data': 'data_string'}
+        assert handle.wait(timeout=5)
+        assert handle.progress() == (100, 100)
+
+    def test_service_latency(self):
+        start = time.time()
+        assert self.client.service_call('/slow_service', data='data_string') == {'data': 'data_string'}
+        assert time.time() - start >= 0.05
+
+    def test_params(self):
+        assert self.client.param_get('/param_0') == 'xxxx'
+        assert self.client.param_set('/param_0', 'data_string')
+        assert self.client.param_get('/param_0') == 'data_string'
+
+    def test_params_batch(self):
+        assert self.client.param_get_many(['/param_0', '/param_1']) == {'/param_0': 'xxxx', '/param_1': 'xxxx'}
+        assert self.client.param_set_many({'/param_0': 'a', '/param_1': 'b'})
+        assert len(self.client.param_get_tree('/')) == 11
+        assert self.client.param_get_tree('/param_1') == {'/param_1': 'b'}
+
+    def test_params_set_many_fallback(self):
+        self.client._batch_params = False  # like with a node without batches
+        assert self.client.param_set_many({'/param_0': 0, '/param_1': ''})
+        assert self.client.param_get_many(['/param_0', '/param_1']) == {'/param_0': 0, '/param_1': ''}
+        with self.assertRaises(ValueError):  # None cannot be set : a single param request with None gets
+            self.client.param_set_many({'/param_0': 'a', '/param_new': 'n', '/param_1': None})
+        assert self.client.param_get_many(['/param_0', '/param_1']) == {'/param_0': 0, '/param_1': ''}
+        assert '/param_new' not in self.client.params()
+
+    def test_param_watch(self):
+        changes = []
+        watch_id = self.client.param_watch('/param_2', lambda *change: changes.append(change))
+        deadline = time.time() + 5
+        value = 0
+        while not changes and time.time() < deadline:  # until the subscription reaches the node
+            value += 1
+            self.client.param_set('/param_2', str(value))
+            time.sleep(0.05)
+        self.client.param_set('/param_3', 'unwatched')
+        self.client.param_unwatch(watch_id)
+        assert changes[0][0] == '/param_2'
+        assert changes[0][3] == 'param'
+        assert all(change[0] == '/param_2' for change in changes)
+        with self.assertRaises(KeyError):
+            self.client.param_unwatch(watch_id)
+
+    def test_param_unwatch_unknown(self):
+        with self.assertRaises(KeyError):  # no watch was ever made
+            self.client.param_unwatch(1)
+
+    def test_handles(self):
+        handle = self.client.topic('/sensor_1')
+        assert isinstance(handle.key, int)
+        assert handle.inject(data='data_string')
+        assert handle.extract() == {'data': 'data_string'}
+
+    def test_handles_after_restart(self):
+        client = PyrosClient('pyros_scenario_mock', heartbeat_interval=0.1)
+        try:
+            handle = client.param('/param_9')
+            deadline = time.time() + 5
+            while client.liveness.boot_id is None and time.time() < deadline:  # until the first heartbeat
+                time.sleep(0.05)
+            self.node.shutdown()
+            self.node = PyrosScenarioMock('pyros_scenario_mock', scenario=SCENARIO)
+            self.node.start()
+            deadline = time.time() + 5
+            while client.resolve_epoch == 0 and time.time() < deadline:  # until the client notices the restart
+                time.sleep(0.05)
+            assert client.param('/param_0').key == 0  # issued first by the new node
+            assert handle.get() == 'xxxx'
+            assert handle.key == 1
+        finally:
+            client.close()
+
+
+if __name__ == '__main__':
+
+    import nose
+    nose.runmodule()
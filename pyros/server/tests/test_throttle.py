@@ -0,0 +1,73 @@
+from __future__ import absolute_import
+
+import unittest
+
+from pyros.server.throttle import make_throttle, LatestOnly, EveryNth, TimeDecimated, WindowedMean
+from pyros.testing import FakeClock
+
+
+class TestThrottle(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+
+    def drain(self, throttle):
+        msgs = []
+        msg = throttle.pop()
+        while msg is not None:
+            msgs.append(msg)
+            msg = throttle.pop()
+        return msgs
+
+    def test_make_throttle(self):
+        assert isinstance(make_throttle({'policy': 'latest'}), LatestOnly)
+        assert isinstance(make_throttle({'policy': 'every_nth', 'n': 3}), EveryNth)
+        assert isinstance(make_throttle({'policy': 'decimate', 'rate': 10}), TimeDecimated)
+        assert isinstance(make_throttle({'policy': 'mean', 'window': 2, 'fields': ['x']}), WindowedMean)
+        with self.assertRaises(ValueError):
+            make_throttle({'policy': 'unknown'})
+
+    def test_default_keeps_all_up_to_queue_size(self):
+        throttle = make_throttle({'queue_size': 3})
+        for i in range(5):
+            throttle.push(i)
+        assert self.drain(throttle) == [2, 3, 4]
+        assert throttle.dropped == 2
+
+    def test_latest(self):
+        throttle = make_throttle({'policy': 'latest'})
+        for i in range(5):
+            throttle.push(i)
+        assert self.drain(throttle) == [4]
+
+    def test_every_nth(self):
+        throttle = make_throttle({'policy': 'every_nth', 'n': 3, 'queue_size': 10})
+        for i in range(9):
+            throttle.push(i)
+        assert self.drain(throttle) == [2, 5, 8]
+
+    def test_filter_before_policy(self):
+        throttle = make_throttle({'policy': 'every_nth', 'n': 2, 'filter': ['>=', 'level', 2]})
+        for i in range(8):
+            throttle.push({'level': i % 4})
+        assert self.drain(throttle) == [{'level': 3}, {'level': 3}]  # every 2nd of the matching ones
+        assert throttle.filtered == 4
+
+    def test_decimate(self):
+        throttle = make_throttle({'policy': 'decimate', 'rate': 10}, clock=self.clock)
+        for i in range(10):
+            self.clock.now = i * 0.04  # 25 Hz
+            throttle.push(i)
+        assert self.drain(throttle) == [0, 3, 6, 9]
+
+    def test_mean(self):
+        throttle = make_throttle({'policy': 'mean', 'window': 2, 'fields': ['force.x', 'position']})
+        throttle.push({'force': {'x': 1.0}, 'position': [0.0, 2.0], 'seq': 1})
+        throttle.push({'force': {'x': 3.0}, 'position': [2.0, 4.0], 'seq': 2})
+        throttle.push({'force': {'x': 5.0}, 'position': [0.0, 0.0], 'seq': 3})
+        assert self.drain(throttle) == [{'force': {'x': 2.0}, 'position': [1.0, 3.0], 'seq': 2}]
+
+
+if __name__ == '__main__':
+
+    import nose
+    nose.runmodule()
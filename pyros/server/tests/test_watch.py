@@ -0,0 +1,62 @@
+from __future__ import absolute_import
+
+import unittest
+
+from pyros.server.watch import ParamWatcher
+
+
+class RecordingSocket(object):
+    def __init__(self):
+        self.sent = []
+
+    def send_multipart(self, frames):
+        self.sent.append(frames)
+
+
+class TestParamWatcher(unittest.TestCase):
+    def setUp(self):
+        self.watcher = ParamWatcher()
+        self.watcher._socket = self.socket = RecordingSocket()  # no zmq needed to test watch tracking
+        self.watcher.endpoint = 'tcp://127.0.0.1:5555'
+
+    def test_unwatched_not_published(self):
+        self.watcher.changed('/robot/speed', 1, 2, 'param')
+        assert self.socket.sent == []
+
+    def test_watched_published(self):
+        assert self.watcher.watch('/robot') == 'tcp://127.0.0.1:5555'
+        self.watcher.changed('/robot/speed', 1, 2, 'param')
+        self.watcher.changed('/robot/speed', 2, 2, 'param')  # not a change
+        self.watcher.changed('/robot2/speed', 1, 2, 'param')
+        assert [frames[0] for frames in self.socket.sent] == [b'/robot/speed']
+
+    def test_watch_counted(self):
+        self.watcher.watch('/robot')
+        self.watcher.watch('/robot')
+        self.watcher.unwatch('/robot')
+        assert self.watcher.watched('/robot/speed')
+        self.watcher.unwatch('/robot')
+        assert not self.watcher.watched('/robot/speed')
+
+    def test_poll_external_changes(self):
+        params = {'/robot/speed': 1, '/other': 1}
+        self.watcher.watch('/robot')
+        self.watcher.poll(params.get, params)
+        assert self.socket.sent == []  # first values seen
+        params['/robot/speed'] = 2
+        params['/other'] = 2
+        self.watcher.poll(params.get, params)
+        assert [frames[0] for frames in self.socket.sent] == [b'/robot/speed']
+
+
+    def test_advertise_address(self):
+        watcher = ParamWatcher('tcp://*', 'tcp://localhost')
+        try:
+            assert watcher.watch('/robot').startswith('tcp://localhost:')
+        finally:
+            watcher.close()
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
@@ -0,0 +1,197 @@
+from __future__ import absolute_import, division
+
+import collections
+import copy
+import time
+
+import six
+
+from pyros.protocol.filters import compile_filter
+
+"""
+Rate limiting and downsampling of exposed subscribers, on the node side.
+
+A throttle sits between the backend subscriber callback and the node storage :
+ - the backend callback pushes raw (unconverted) messages into it, which is cheap,
+ - the node pops from it when a client extracts, and only converts what it pops.
+This way dropped messages are never converted, and memory is bounded by the throttle queue size.
+
+Policies are declared by clients in setup(subscriber_policies={...}), as plain pickleable dicts :
+
+{
+    '/imu': {'policy': 'decimate', 'rate': 10},  # at most 10 messages per second
+    '/joint_states': {'policy': 'every_nth', 'n': 100},  # one message out of 100
+    '/odom': {'policy': 'latest'},  # only keep the latest message
+    '/wrench': {'policy': 'mean', 'window': 40, 'fields': ['force.x', 'force.y']},  # mean over 40 messages
+    '/diagnostics': {'policy': 'all', 'filter': ['>=', 'level', 2]},  # only warnings and errors
+}
+
+A 'filter' can be added to any policy. It is evaluated on raw messages, before the policy,
+so non matching messages are neither converted, nor counted by the policy. See pyros.protocol.filters.
+"""
+
+
+class Throttle(object):
+    """
+    Default policy : keeps every message, up to queue_size.
+    """
+    predicate = None  # the compiled subscription filter, if any
+
+    def __init__(self, queue_size=10, clock=None):
+        self._clock = clock or time.time
+        self._queue = collections.deque(maxlen=queue_size)
+        self.received = 0
+        self.dropped = 0
+        self.filtered = 0
+
+    def accept(self, msg, now):
+        """
+        Decides if a message is kept.
+        :return: the message to store (possibly a different one), or None to drop it.
+        """
+        return msg
+
+    def push(self, msg):
+        """Called from the backend subscriber callback, with the raw message."""
+        self.received += 1
+        if self.predicate is not None and not self.predicate(msg):
+            self.filtered += 1
+            return
+        kept = self.accept(msg, self._clock())
+        if kept is None:
+            self.dropped += 1
+        else:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+            self._queue.append(kept)
+
+    def pop(self):
+        """Called when a client extracts. Returns the oldest kept raw message, or None."""
+        try:
+            return self._queue.popleft()
+        except IndexError:
+            return None
+
+    def __len__(self):
+        return len(self._queue)
+
+
+class LatestOnly(Throttle):
+    """Only the latest message is kept, older ones are never converted."""
+    def __init__(self, clock=None):
+        super(LatestOnly, self).__init__(queue_size=1, clock=clock)
+
+
+class EveryNth(Throttle):
+    """Keeps one message out of n."""
+    def __init__(self, n, queue_size=10, clock=None):
+        super(EveryNth, self).__init__(queue_size=queue_size, clock=clock)
+        self.n = int(n)
+        if self.n < 1:
+            raise ValueError("every_nth policy requires n >= 1")
+        self._count = 0
+
+    def accept(self, msg, now):
+        self._count += 1
+        if self._count >= self.n:
+            self._count = 0
+            return msg
+        return None
+
+
+class TimeDecimated(Throttle):
+    """Keeps at most rate messages per second."""
+    def __init__(self, rate, queue_size=10, clock=None):
+        super(TimeDecimated, self).__init__(queue_size=queue_size, clock=clock)
+        if rate <= 0:
+            raise ValueError("decimate policy requires a positive rate")
+        self.period = 1.0 / rate
+        self._last = None
+
+    def accept(self, msg, now):
+        if self._last is None or now - self._last >= self.period:
+            self._last = now
+            return msg
+        return None
+
+
+def _get_field(msg, path):
+    for part in path.split('.'):
+        msg = msg[part] if isinstance(msg, dict) else getattr(msg, part)
+    return msg
+
+
+def _set_field(msg, path, value):
+    parts = path.split('.')
+    for part in parts[:-1]:
+        msg = msg[part] if isinstance(msg, dict) else getattr(msg, part)
+    if isinstance(msg, dict):
+        msg[parts[-1]] = value
+    else:
+        setattr(msg, parts[-1], value)
+
+
+class WindowedMean(Throttle):
+    """
+    Emits one message per window of messages, where the numeric fields listed are replaced by their mean over the window.
+    Other fields are the ones of the last message in the window.
+    """
+    def __init__(self, window, fields, queue_size=10, clock=None):
+        super(WindowedMean, self).__init__(queue_size=queue_size, clock=clock)
+        self.window = int(window)
+        if self.window < 1:
+            raise ValueError("mean policy requires window >= 1")
+        self.fields = list(fields)
+        self._sums = {}
+        self._count = 0
+
+    def accept(self, msg, now):
+        for f in self.fields:
+            value = _get_field(msg, f)
+            acc = self._sums.get(f)
+            if isinstance(value, (list, tuple)):
+                self._sums[f] = list(value) if acc is None else [a + v for a, v in zip(acc, value)]
+            else:
+                self._sums[f] = value if acc is None else acc + value
+        self._count += 1
+
+        if self._count < self.window:
+            return None
+
+        mean_msg = copy.deepcopy(msg)
+        for f, acc in six.iteritems(self._sums):
+            if isinstance(acc, list):
+                _set_field(mean_msg, f, type(_get_field(msg, f))(a / self._count for a in acc))
+            else:
+                _set_field(mean_msg, f, acc / self._count)
+        self._sums = {}
+        self._count = 0
+        return mean_msg
+
+
+POLICIES = {
+    'all': Throttle,
+    'latest': LatestOnly,
+    'every_nth': EveryNth,
+    'decimate': TimeDecimated,
+    'mean': WindowedMean,
+}
+
+
+def make_throttle(spec, clock=None):
+    """
+    Builds a throttle from its declaration, as received from setup()
+    :param spec: a dict with a 'policy' key, one of POLICIES, the policy arguments, and an optional 'filter'.
+    :return: a Throttle instance
+    """
+    spec = dict(spec or {})
+    policy = spec.pop('policy', 'all')
+    expr = spec.pop('filter', None)
+    try:
+        policy_cls = POLICIES[policy]
+    except KeyError:
+        raise ValueError("Unknown subscriber policy {0}. Valid policies are {1}".format(policy, sorted(POLICIES)))
+    throttle = policy_cls(clock=clock, **spec)
+    if expr is not None:
+        throttle.predicate = compile_filter(expr)
+    return throttle
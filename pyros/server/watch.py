@@ -0,0 +1,87 @@
+from __future__ import absolute_import
+
+from pyros.protocol.params import in_tree, dumps_event
+
+"""
+Param watches, on the node side.
+Instead of clients polling params, the node tracks the param subtrees clients watch,
+and publishes an event when a watched param changes, on a zmq PUB socket clients subscribe to.
+Event traffic is then proportional to actual changes, and unwatched params cost nothing.
+"""
+
+
+class ParamWatcher(object):
+    def __init__(self, bind_address='tcp://127.0.0.1', advertise_address=None):
+        """
+        :param bind_address: where to bind the PUB socket, on a random port, like 'tcp://*' for all interfaces
+        :param advertise_address: the address clients connect to, like 'tcp://robot.local'.
+                                  Defaults to bind_address, which must then be reachable as it is.
+        """
+        self.bind_address = bind_address
+        self.advertise_address = advertise_address or bind_address
+        self.endpoint = None
+        self.watches = {}  # {prefix: number of watches}
+        self._socket = None
+        self._last = {}  # last values seen by poll()
+
+    def _publisher(self):
+        # created on first watch : in the node process, and only if someone watches
+        if self._socket is None:
+            import zmq
+            self._socket = zmq.Context.instance().socket(zmq.PUB)
+            port = self._socket.bind_to_random_port(self.bind_address)
+            self.endpoint = '{0}:{1}'.format(self.advertise_address, port)
+        return self._socket
+
+    def watch(self, prefix):
+        """
+        :return: the endpoint to subscribe to, for events
+        """
+        self._publisher()
+        self.watches[prefix] = self.watches.get(prefix, 0) + 1
+        return self.endpoint
+
+    def unwatch(self, prefix):
+        count = self.watches.get(prefix, 0) - 1
+        if count > 0:
+            self.watches[prefix] = count
+        else:
+            self.watches.pop(prefix, None)
+
+    def watched(self, name):
+        return any(in_tree(name, prefix) for prefix in self.watches)
+
+    def changed(self, name, old, new, source):
+        """
+        To be called by the node whenever it sets a param.
+        :param source: what changed the param, like the name of the node service that set it
+        """
+        if old == new or not self.watched(name):
+            return
+        self._last[name] = new
+        self._socket.send_multipart(dumps_event(name, old, new, source))
+
+    def poll(self, get, exposed):
+        """
+        Detects changes made outside of the node, like on a ROS parameter server. To be called periodically.
+        :param get: the node function getting the value of one param
+        :param exposed: the names of the params exposed on the node
+        """
+        if not self.watches:
+            self._last.clear()
+            return
+        for name in exposed:
+            if not self.watched(name):
+                continue
+            new = get(name)
+            if name in self._last:
+                self.changed(name, self._last[name], new, 'external')
+            self._last[name] = new
+        for name in [n for n in self._last if not self.watched(n)]:
+            del self._last[name]
+
+    def close(self):
+        if self._socket is not None:
+            self._socket.close(linger=0)
+            self._socket = None
+
@@ -0,0 +1,14 @@
+from __future__ import absolute_import
+
+"""
+Helpers shared by the pyros tests.
+"""
+
+
+class FakeClock(object):
+    """A clock for the classes accepting a clock function : time only passes when the test moves now."""
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+from __future__ import absolute_import, division, print_function
+
+"""
+Benchmark of memory per message and construction time,
+for messages stored as nested dicts versus compact __slots__ messages.
+Run with : python pyros/tests/profile_compact_messages.py
+"""
+
+import sys
+import timeit
+
+from pyros.client.compact import CompactMessage, CompactMessageFactory
+
+MESSAGE_COUNT = 10000
+
+# Looks like a sensor_msgs/JointState, as converted by the node
+SKELETON = {
+    'header': {'seq': 0, 'stamp': {'secs': 0, 'nsecs': 0}, 'frame_id': ''},
+    'name': [],
+    'position': [],
+    'velocity': [],
+    'effort': [],
+}
+
+
+def make_msg(seq):
+    return {
+        'header': {'seq': seq, 'stamp': {'secs': seq // 1000, 'nsecs': seq % 1000}, 'frame_id': 'base_link'},
+        'name': ['joint_1', 'joint_2', 'joint_3'],
+        'position': [0.1 * seq, 0.2, 0.3],
+        'velocity': [0.0, 0.0, 0.0],
+        'effort': [1.0, 2.0, 3.0],
+    }
+
+
+def deep_sizeof(obj, seen=None):
+    """Size of an object and everything it references, counting shared objects once."""
+    seen = seen if seen is not None else set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_sizeof(v, seen) for v in obj)
+    elif isinstance(obj, CompactMessage):
+        size += sum(deep_sizeof(getattr(obj, name), seen) for name in obj.__slots__)
+    return size
+
+
+def collect_values(content, values):
+    for k, v in content.items():
+        values.add(id(k))
+        if isinstance(v, dict):
+            collect_values(v, values)
+        else:
+            deep_sizeof(v, values)
+
+
+def rebuild_dict(content):
+    # what building the current representation costs, for comparison
+    return dict((k, rebuild_dict(v) if isinstance(v, dict) else v) for k, v in content.items())
+
+
+def main():
+    factory = CompactMessageFactory()
+    factory.register('/joint_states', SKELETON)
+
+    received = [make_msg(i) for i in range(MESSAGE_COUNT)]
+
+    # The leaf values ( strings, numbers, lists ) are shared by both representations, only the containers differ.
+    values = set()
+    for m in received:
+        collect_values(m, values)
+
+    compact = [factory.convert('/joint_states', m) for m in received]
+
+    dict_size = deep_sizeof(received, set(values)) / MESSAGE_COUNT
+    compact_size = deep_sizeof(compact, set(values)) / MESSAGE_COUNT
+
+    dict_time = timeit.timeit(lambda: [rebuild_dict(m) for m in received], number=10) / 10
+    convert_time = timeit.timeit(lambda: [factory.convert('/joint_states', m) for m in received], number=10) / 10
+
+    print("{0} messages".format(MESSAGE_COUNT))
+    print("dict    : {0:8.1f} bytes/message (containers only)".format(dict_size))
+    print("compact : {0:8.1f} bytes/message (containers only)".format(compact_size))
+    print("dict    construction : {0:8.2f} us/message".format(dict_time * 1e6 / MESSAGE_COUNT))
+    print("compact construction : {0:8.2f} us/message".format(convert_time * 1e6 / MESSAGE_COUNT))
+
+
+if __name__ == '__main__':
+    main()
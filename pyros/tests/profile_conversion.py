@@ -0,0 +1,88 @@
+#!/usr/bin/env python
+from __future__ import absolute_import, division, print_function
+
+"""
+Benchmark of the node cost to send the same message to N clients,
+converting and pickling it for each client, versus once with the conversion cache.
+Serialization is pickle, as used by pyzmp between client and node.
+Run with : python pyros/tests/profile_conversion.py
+"""
+
+import timeit
+
+from six.moves import cPickle as pickle
+
+from pyros.protocol.encoding import encode
+from pyros.server.conversion import ConversionCache
+
+CLIENTS = (1, 4, 16)
+
+ROUNDS = 200
+
+
+class Msg(object):
+    """Looks like a backend message : fields are attributes, listed in __slots__."""
+    __slots__ = ()
+
+    def __init__(self, **fields):
+        for name, value in fields.items():
+            setattr(self, name, value)
+
+
+class Header(Msg):
+    __slots__ = ('seq', 'stamp', 'frame_id')
+
+
+class LaserScan(Msg):
+    __slots__ = ('header', 'angle_min', 'angle_max', 'angle_increment', 'range_min', 'range_max', 'ranges',
+                 'intensities')
+
+
+def convert(msg):
+    # the generic conversion of a node : walking the message fields
+    if isinstance(msg, Msg):
+        return dict((name, convert(getattr(msg, name))) for name in msg.__slots__)
+    if isinstance(msg, (list, tuple)):
+        return [convert(v) for v in msg]
+    return msg
+
+
+def make_scan(seq):
+    return LaserScan(
+        header=Header(seq=seq, stamp=seq * 0.025, frame_id='laser'),
+        angle_min=-2.35, angle_max=2.35, angle_increment=0.0043, range_min=0.02, range_max=30.0,
+        ranges=[1.0 + (i % 100) / 10.0 for i in range(1081)], intensities=[float(i % 7) for i in range(1081)],
+    )
+
+
+def uncached(scans, clients):
+    for seq, scan in enumerate(scans):
+        for _ in range(clients):
+            pickle.loads(pickle.dumps(encode(convert(scan)), pickle.HIGHEST_PROTOCOL))
+
+
+def cached(scans, clients):
+    cache = ConversionCache()
+    for seq, scan in enumerate(scans):
+        for _ in range(clients):
+            payload = cache.encoded('/scan', seq, lambda: convert(scan), encode)
+            pickle.loads(pickle.dumps(payload, pickle.HIGHEST_PROTOCOL))
+    return cache
+
+
+def main():
+    scans = [make_scan(seq) for seq in range(ROUNDS)]
+    assert cached(scans, 4).stats()['conversions'] == ROUNDS
+
+    print("{0} messages of {1} bytes".format(ROUNDS, len(pickle.dumps(convert(scans[0]), pickle.HIGHEST_PROTOCOL))))
+    print("clients | uncached us/message | cached us/message | speedup")
+    for clients in CLIENTS:
+        uncached_time = timeit.timeit(lambda: uncached(scans, clients), number=3) / 3
+        cached_time = timeit.timeit(lambda: cached(scans, clients), number=3) / 3
+        print("{0:7} | {1:19.1f} | {2:17.1f} | {3:7.1f}".format(
+            clients, uncached_time * 1e6 / ROUNDS, cached_time * 1e6 / ROUNDS, uncached_time / cached_time,
+        ))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+from __future__ import absolute_import, division, print_function
+
+"""
+Measures the time spent entering and leaving pyros_ctx, with and without a warm node pool.
+Run with : python pyros/tests/profile_ctx_pool.py
+"""
+
+import time
+
+from pyros_interfaces_mock import PyrosMock
+
+from pyros.server.ctx_server import pyros_ctx, PyrosNodePool
+
+CONTEXT_COUNT = 20
+
+
+def measure(**ctx_kwargs):
+    durations = []
+    for _ in range(CONTEXT_COUNT):
+        start = time.time()
+        with pyros_ctx(node_impl=PyrosMock, **ctx_kwargs) as ctx:
+            ctx.client.topics()  # the node is actually usable
+            durations.append(time.time() - start)
+    return durations
+
+
+def report(label, durations):
+    durations = sorted(durations)
+    print("{0:20} : mean {1:8.1f} ms, median {2:8.1f} ms, max {3:8.1f} ms".format(
+        label,
+        sum(durations) * 1000 / len(durations),
+        durations[len(durations) // 2] * 1000,
+        durations[-1] * 1000,
+    ))
+
+
+def main():
+    report("no pool", measure())
+    for reset in PyrosNodePool.RESETS:
+        with PyrosNodePool(size=2, node_impl=PyrosMock, reset=reset) as pool:
+            report("pool, reset={0}".format(reset), measure(pool=pool))
+
+
+if __name__ == '__main__':
+    main()
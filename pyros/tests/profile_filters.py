@@ -0,0 +1,82 @@
+#!/usr/bin/env python
+from __future__ import absolute_import, division, print_function
+
+"""
+Benchmark of bytes sent and CPU spent to get the matching messages of a topic,
+filtering on the client ( every message is serialized, sent and deserialized ) versus on the node,
+at various selectivities.
+Serialization is pickle, as used by pyzmp between client and node.
+Run with : python pyros/tests/profile_filters.py
+"""
+
+import random
+import timeit
+
+from six.moves import cPickle as pickle
+
+from pyros.protocol.filters import compile_filter
+
+MESSAGE_COUNT = 10000
+
+SELECTIVITIES = (0.01, 0.1, 0.5, 1.0)
+
+
+def make_msg(seq, rng):
+    # Looks like a diagnostic_msgs/DiagnosticStatus, as converted by the node
+    return {
+        'level': rng.random(),  # filtering on it with ['<', 'level', selectivity] keeps that fraction of messages
+        'name': 'motor_{0}'.format(seq % 8),
+        'message': 'temperature nominal',
+        'hardware_id': 'driver_board_3',
+        'values': [{'key': 'temperature_{0}'.format(i), 'value': '{0:.2f}'.format(40 + i)} for i in range(8)],
+    }
+
+
+def client_side(messages, expr):
+    matches = compile_filter(expr)
+    sent = 0
+    kept = []
+    for msg in messages:
+        frame = pickle.dumps(msg, pickle.HIGHEST_PROTOCOL)  # node
+        sent += len(frame)
+        received = pickle.loads(frame)  # client
+        if matches(received):
+            kept.append(received)
+    return sent, kept
+
+
+def node_side(messages, expr):
+    matches = compile_filter(expr)
+    sent = 0
+    kept = []
+    for msg in messages:
+        if matches(msg):  # node
+            frame = pickle.dumps(msg, pickle.HIGHEST_PROTOCOL)
+            sent += len(frame)
+            kept.append(pickle.loads(frame))  # client
+    return sent, kept
+
+
+def main():
+    rng = random.Random(42)
+    messages = [make_msg(i, rng) for i in range(MESSAGE_COUNT)]
+
+    print("{0} messages".format(MESSAGE_COUNT))
+    print("selectivity | client filter : KB sent, us/message | node filter : KB sent, us/message")
+    for selectivity in SELECTIVITIES:
+        expr = ['<', 'level', selectivity]
+        client_bytes, client_kept = client_side(messages, expr)
+        node_bytes, node_kept = node_side(messages, expr)
+        assert client_kept == node_kept
+
+        client_time = timeit.timeit(lambda: client_side(messages, expr), number=5) / 5
+        node_time = timeit.timeit(lambda: node_side(messages, expr), number=5) / 5
+        print("{0:11.0%} | {1:13.1f} {2:11.2f} | {3:11.1f} {4:11.2f}".format(
+            selectivity,
+            client_bytes / 1024, client_time * 1e6 / MESSAGE_COUNT,
+            node_bytes / 1024, node_time * 1e6 / MESSAGE_COUNT,
+        ))
+
+
+if __name__ == '__main__':
+    main()
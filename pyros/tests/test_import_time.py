@@ -0,0 +1,57 @@
+from __future__ import absolute_import, division, print_function
+
+import os
+import subprocess
+import sys
+import unittest
+
+# Budget for importing the command line entry point, in microseconds.
+# Generous, to be stable on slow CI machines, but low enough to catch an eager import of a heavy package.
+IMPORT_TIME_BUDGET_US = 250000
+
+# These are not needed to start a node, and are slow to import.
+DEFERRED_MODULES = ['nose', 'pkg_resources', 'logging.config']
+
+
+def import_times(module):
+    """
+    Imports a module in a fresh interpreter with -X importtime.
+    :return: a dict {module_name: cumulative import time in microseconds}
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))] +
+        ([env['PYTHONPATH']] if env.get('PYTHONPATH') else [])
+    )
+    proc = subprocess.Popen(
+        [sys.executable, '-X', 'importtime', '-c', 'import {0}'.format(module)],
+        stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env,
+    )
+    _, err = proc.communicate()
+    assert proc.returncode == 0, err.decode('utf-8', 'replace')
+    times = {}
+    for line in err.decode('utf-8', 'replace').splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@unittest.skipIf(sys.version_info < (3, 7), "-X importtime requires python 3.7")
+class TestImportTime(unittest.TestCase):
+    def test_main_import_budget(self):
+        times = import_times('pyros.__main__')
+        assert times['pyros.__main__'] < IMPORT_TIME_BUDGET_US, \
+            "importing pyros.__main__ took {0} us, budget is {1} us".format(times['pyros.__main__'], IMPORT_TIME_BUDGET_US)
+
+    def test_main_deferred_imports(self):
+        times = import_times('pyros.__main__')
+        for module in DEFERRED_MODULES:
+            assert module not in times, "{0} should not be imported when importing pyros.__main__".format(module)
+
+
+if __name__ == '__main__':
+
+    import nose
+    nose.runmodule()
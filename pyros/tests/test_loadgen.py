@@ -0,0 +1,104 @@
+from __future__ import absolute_import
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from click.testing import CliRunner
+
+from pyros import loadgen
+from pyros.__main__ import cli
+
+
+class FakeClient(object):
+    def __init__(self, node_name=None):
+        self.node_name = node_name
+        self.param_values = {}
+
+    def topics(self):
+        return {'/chatter': {}}
+
+    def services(self):
+        return {'/echo': {}}
+
+    def params(self):
+        return {}  # no params : param operations are skipped
+
+    def topic_inject(self, name, content):
+        return None
+
+    def topic_extract(self, name):
+        return {'data': 'x'}
+
+    def service_call(self, name, request):
+        raise RuntimeError("service failure")
+
+
+class TestLoadgen(unittest.TestCase):
+
+    def test_parse_mix(self):
+        mix = loadgen.parse_mix(['topic_extract=4', 'service_call'])
+        self.assertEqual(mix['topic_extract'], 4)
+        self.assertEqual(mix['service_call'], 1)
+        self.assertEqual(mix['param_get'], 0)
+        with self.assertRaises(ValueError):
+            loadgen.parse_mix(['unknown=1'])
+
+    def test_percentile(self):
+        values = list(range(101))
+        self.assertEqual(loadgen.percentile(values, 50), 50)
+        self.assertEqual(loadgen.percentile(values, 99), 99)
+        self.assertEqual(loadgen.percentile(values, 100), 100)
+        self.assertIsNone(loadgen.percentile([], 50))
+
+    def test_node_rss(self):
+        self.assertGreater(loadgen.node_rss(os.getpid()), 0)
+
+    def test_run_load(self):
+        report = loadgen.run_load(
+            'fake', clients=2, duration=0.2, node_pid=os.getpid(), sample_interval=0.05, client_factory=FakeClient,
+        )
+        self.assertEqual(report['workers_reported'], 2)
+        self.assertEqual(set(report['operations']), {'topic_inject', 'topic_extract', 'service_call'})
+        self.assertGreater(report['operations']['topic_extract']['throughput'], 0)
+        self.assertEqual(report['operations']['topic_extract']['error_rate'], 0)
+        self.assertEqual(report['operations']['service_call']['error_rate'], 1)
+        self.assertIsNone(report['operations']['service_call']['latency']['p50'])
+        self.assertTrue(report['node_rss'])
+        self.assertTrue(all(s['rss'] > 0 for s in report['node_rss']))
+
+
+class TestLoadgenCommand(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.scenario = os.path.join(self.tmpdir, 'scenario.json')
+        with open(self.scenario, 'w') as scenario_file:
+            json.dump({
+                'topics': [{'name': '/sensor_{i}', 'count': 4, 'rate': 100, 'size': 64}],
+                'services': [{'name': '/svc_{i}', 'count': 2}],
+                'params': [{'name': '/param_{i}', 'count': 4, 'size': 4}],
+            }, scenario_file)
+        self.report = os.path.join(self.tmpdir, 'report.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_loadgen_scenario_node(self):
+        result = CliRunner().invoke(cli, [
+            'loadgen', '--scenario', self.scenario, '--clients', '2', '--duration', '0.5', '--output', self.report,
+        ])
+        self.assertEqual(result.exit_code, 0, result.output)
+        with open(self.report) as report_file:
+            report = json.load(report_file)
+        self.assertEqual(report['node'], 'pyros_mock')
+        self.assertEqual(report['workers_reported'], 2)
+        self.assertEqual(report['total']['error_rate'], 0)
+        self.assertGreater(report['total']['throughput'], 0)
+        self.assertTrue(report['node_rss'])  # the pid comes from the node heartbeat
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
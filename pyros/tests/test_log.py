@@ -0,0 +1,129 @@
+from __future__ import absolute_import
+
+import logging
+import multiprocessing
+import random
+import unittest
+
+from six.moves import queue
+
+from pyros.log import DroppingQueueHandler, QueueLogging, RateLimitFilter, SampleFilter
+
+
+class RecordingHandler(logging.Handler):
+    def __init__(self, level=logging.NOTSET):
+        logging.Handler.__init__(self, level)
+        self.messages = []
+
+    def emit(self, record):
+        self.messages.append(record.getMessage())
+
+
+def make_record(msg, level=logging.DEBUG, lineno=1):
+    return logging.LogRecord('pyros.test', level, 'test_log.py', lineno, msg, None, None)
+
+
+def log_from_child():
+    logging.getLogger('pyros.test_log').warning("from %s", 'child')
+
+
+class TestFilters(unittest.TestCase):
+
+    def test_rate_limit(self):
+        now = [0.0]
+        rate_limit = RateLimitFilter(rate=2, burst=3, clock=lambda: now[0])
+        assert [rate_limit.filter(make_record('m')) for _ in range(5)] == [True, True, True, False, False]
+        assert rate_limit.filter(make_record('other line', lineno=2))  # each line of code has its own budget
+        now[0] = 1.0  # 2 more records per second
+        assert [rate_limit.filter(make_record('m')) for _ in range(3)] == [True, True, False]
+        assert rate_limit.filter(make_record('warning', level=logging.WARNING))
+        assert rate_limit.suppressed == 3
+
+    def test_sample_every_n(self):
+        sample = SampleFilter(n=3)
+        assert [sample.filter(make_record('m')) for _ in range(7)] == [True, False, False, True, False, False, True]
+        assert sample.filter(make_record('error', level=logging.ERROR))
+        assert sample.suppressed == 4
+
+    def test_sample_fraction(self):
+        sample = SampleFilter(fraction=0.1, rng=random.Random(42))
+        passed = sum(sample.filter(make_record('m')) for _ in range(1000))
+        assert 50 < passed < 150
+
+    def test_sample_arguments(self):
+        with self.assertRaises(ValueError):
+            SampleFilter()
+        with self.assertRaises(ValueError):
+            SampleFilter(n=2, fraction=0.5)
+
+
+class TestQueueLogging(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger('pyros.test_log')
+        self.logger.setLevel(logging.DEBUG)
+        self.handler = RecordingHandler()
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+
+    def test_dropping_when_full(self):
+        handler = DroppingQueueHandler(queue.Queue(2))
+        for i in range(5):
+            handler.handle(make_record('m{0}'.format(i)))
+        assert handler.dropped == 3
+
+    def test_routed_to_handlers(self):
+        other = RecordingHandler(level=logging.WARNING)
+        other_logger = logging.getLogger('pyros_other')
+        other_logger.addHandler(other)
+        queued = QueueLogging(['pyros.test_log', 'pyros_other'], multiprocess=False).start()
+        try:
+            self.logger.debug("debug %d", 1)
+            logging.getLogger('pyros.test_log.sub').info("from a child logger")
+            other_logger.warning("warning")
+            other_logger.info("below the handler level")
+            assert self.logger.handlers == [queued.handler]
+        finally:
+            queued.stop()
+            other_logger.removeHandler(other)
+        assert self.handler.messages == ["debug 1", "from a child logger"]
+        assert other.messages == ["warning"]
+        assert self.logger.handlers == [self.handler]
+
+    def test_filtered_before_queueing(self):
+        queued = QueueLogging(['pyros.test_log'], multiprocess=False, filters=[SampleFilter(n=10)]).start()
+        try:
+            for i in range(20):
+                self.logger.debug("message %d", i)
+            self.logger.warning("always")
+        finally:
+            queued.stop()
+        assert self.handler.messages == ["message 0", "message 10", "always"]
+
+    def test_debug_rate(self):
+        self.logger.setLevel(logging.INFO)
+        queued = QueueLogging(['pyros.test_log'], multiprocess=False, debug_rate=1).start()
+        try:
+            assert self.logger.isEnabledFor(logging.DEBUG)
+            for i in range(3):
+                self.logger.debug("message %d", i)
+        finally:
+            queued.stop()
+        assert self.handler.messages == ["message 0"]
+        assert self.logger.level == logging.INFO
+
+    def test_from_forked_process(self):
+        queued = QueueLogging(['pyros.test_log']).start()
+        try:
+            child = multiprocessing.Process(target=log_from_child)
+            child.start()
+            child.join()
+        finally:
+            queued.stop()
+        assert self.handler.messages == ["from child"]
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
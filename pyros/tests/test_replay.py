@@ -0,0 +1,51 @@
+from __future__ import absolute_import
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from click.testing import CliRunner
+
+from pyros.__main__ import cli
+from pyros.client.capture import TrafficRecorder
+
+
+class TestReplayCommand(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.scenario = os.path.join(self.tmpdir, 'scenario.json')
+        with open(self.scenario, 'w') as scenario_file:
+            json.dump({
+                'topics': [{'name': '/sensor_{i}', 'count': 2, 'rate': 100, 'size': 64}],
+                'params': [{'name': '/param_{i}', 'count': 2, 'size': 4}],
+            }, scenario_file)
+        self.capture = os.path.join(self.tmpdir, 'traffic.pyros')
+        self.report = os.path.join(self.tmpdir, 'report.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_replay_scenario_node(self):
+        recorder = TrafficRecorder(self.capture, clock=lambda: 0.0)
+        recorder.record('topics', None, None, 0.0, 0.01, call_kwargs={'send_timeout': 5000, 'recv_timeout': 10000})
+        recorder.record('topic', ('/sensor_0', None), None, 0.0, 0.01)
+        recorder.record('param', ('/param_1', None), None, 0.0, 0.01)
+        recorder.close()
+
+        result = CliRunner().invoke(cli, [
+            'replay', self.capture, '-s', self.scenario, '--speed', '0', '--output', self.report,
+        ])
+        self.assertEqual(result.exit_code, 0, result.output)
+        with open(self.report) as report_file:
+            report = json.load(report_file)
+        self.assertEqual(report['requests'], 3)
+        self.assertEqual(sorted(report['endpoints']), ['param', 'topic', 'topics'])
+        for endpoint in report['endpoints'].values():
+            self.assertEqual(endpoint['errors'], 0)
+
+
+if __name__ == '__main__':
+    import nose
+    nose.runmodule()
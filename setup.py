@@ -192,12 +192,14 @@ setuptools.setup(name='pyros',
         'pyros',
         'pyros.client',
         'pyros.client.tests',
+        'pyros.protocol',
+        'pyros.protocol.tests',
         'pyros.server',
         'pyros.server.tests',
     ],
     entry_points={
         'console_scripts': [
-            'pyros = pyros.__main__:nosemain'
+            'pyros = pyros.__main__:cli'
         ]
     },
     # this is better than using package data ( since behavior is a bit different from distutils... )
@@ -215,6 +217,8 @@ setuptools.setup(name='pyros',
     ],
     extras_require={
       'ros': 'pyros_interfaces_ros',
+      'numpy': 'numpy',
+      'compression': ['lz4', 'zstandard'],
     },
     dependency_links=[
         'git+https://github.com/asmodehn/pyros-rosinterface.git@namespace#egg=pyros_interfaces_ros'